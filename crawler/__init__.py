@@ -1,215 +1,321 @@
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+
 from crawler.sync_repos.sync_coredevice_repo import CoreDeviceRepository
 from crawler.sync_repos.sync_link_repo import LinkRepository
+from crawler.collectors import COLLECTORS, get_collector
+from crawler.neighbors import NeighborIndex
+from crawler.pipeline import STAGED_COMMANDS
+from crawler.polling import optics_port_name
+from crawler.transport_profiles import get_transport_profile
 from app.models.link import Link
 from network.cdp import get_cdp_devices
-from app.schemas.link import LinkCreate
-from network.int import get_show_int_output, parse_show_int_output
+from network.description import get_interface_descriptions
+from network.interface_names import InterfaceIndex, canonical_interface_name, interface_location
 from network.mpls_ldp import get_mpls_ldp_neighbors
 from network.ospf import get_ospf_neighbors
-from network.controllers_optics import get_show_optics_output, parse_show_optics_output
+from network.paramiko_connection_CiscoDevices import CommandError, create_device, iter_lines
+from network.records import InterfaceRecord
 from network.spectrum_container import find_container_from_ip
 from network.trino_getip import get_nihul_ip_by_int_ip, create_connection_instance
 
 
 class LinkService:
-    def __init__(self, ip, username, password, coredevice_id, core_devices, int_ips, spectrum_container_data, count):
+    def __init__(self, ip, username, password, coredevice_id, core_devices, int_ips, spectrum_containers, count,
+                 connection_pool=None, rate_limiter=None, coresite_id=None, interface_cache=None,
+                 change_detector=None, neighbors=None, command_executor=None):
         self.ip = ip
         self.username = username
         self.password = password
         self.coredevice_id = coredevice_id
-        self.core_devices = core_devices
         self.count = count
-        self.int_ips = int_ips
+        # The crawl engine shares one index per cycle; a standalone service builds its own
+        self.neighbors = neighbors if neighbors is not None else NeighborIndex(core_devices, int_ips)
         self.links = {}
         self.link_repository = LinkRepository()
-        self.spectrum_container_data = spectrum_container_data
+        self.spectrum_containers = spectrum_containers
+        self.connection_pool = connection_pool
+        self.rate_limiter = rate_limiter
+        self.coresite_id = coresite_id
+        self.interface_cache = interface_cache
+        self.command_executor = command_executor
+        self.change_detector = change_detector
+        self.collector = get_collector(ip, coresite_id)
+        self.output_hashes = {}
 
-        self.show_int_output = []
         self.show_int_data = []
-        self.show_optics_output = []
         self.show_optics_data = []
         self.cdp_devices = []
         self.ospf_neighbors = []
         self.mpls_ldp_neighbors = []
 
+    def open_session(self):
+        """
+        Return the SSH session for the device: one from the connection pool if the crawler has one,
+        else a new one, with the device's command rate limit and transport profile.
+        """
+        command_limiter = self.rate_limiter.command_bucket(self.ip) if self.rate_limiter is not None else None
+        transport_profile = get_transport_profile(self.ip, self.coresite_id)
+        if self.connection_pool is not None:
+            return self.connection_pool.session(self.ip, self.username, self.password,
+                                                command_limiter=command_limiter, **transport_profile)
+        return create_device(self.ip, self.username, self.password, command_limiter=command_limiter,
+                             **transport_profile)
+
+    def commands(self):
+        """
+        Return a context manager giving the executor the device's commands run on: the crawl
+        engine's, shared by every device, or a pool of the service's own when it runs standalone.
+        """
+        if self.command_executor is not None:
+            return contextlib.nullcontext(self.command_executor)
+        return ThreadPoolExecutor(max_workers=5)
+
     def fetch_data(self):
         """
         Fetch all the required data from the network devices.
+
+        A single SSH session is opened for the device and the commands run concurrently, each
+        on its own channel of that transport, up to the session's channel limit. The session is
+        closed once all commands have returned, or handed back to the connection pool for the
+        next cycle if the crawler has one. With an interface cache, interface detail is polled in
+        two phases (see ``fetch_interface_details``). With a change detector, CDP, OSPF and LDP output
+        that is unchanged since the last cycle is not parsed again.
         """
-        self.show_int_output = get_show_int_output(self.ip, self.username, self.password)
-        self.show_int_data = parse_show_int_output(self.show_int_output)
-        self.show_optics_output = get_show_optics_output(self.ip, self.username, self.password)
-        self.show_optics_data = parse_show_optics_output(self.show_optics_output)
-        self.cdp_devices = get_cdp_devices(self.ip, self.username, self.password)
-        self.ospf_neighbors = get_ospf_neighbors(self.ip, self.username, self.password)
-        self.mpls_ldp_neighbors = get_mpls_ldp_neighbors(self.ip, self.username, self.password)
+        get_show_int_data = self.collector["show_int_data"]
+        get_show_optics_data = self.collector["show_optics_data"]
+        with self.open_session() as device, self.commands() as executor:
+            cdp_devices = executor.submit(get_cdp_devices, self.ip, self.username, self.password, device,
+                                          self.change_detector)
+            ospf_neighbors = executor.submit(get_ospf_neighbors, self.ip, self.username, self.password, device,
+                                             self.change_detector)
+            mpls_ldp_neighbors = executor.submit(get_mpls_ldp_neighbors, self.ip, self.username, self.password, device,
+                                                 self.change_detector)
+            if self.interface_cache is None:
+                show_int_data = executor.submit(get_show_int_data, self.ip, self.username, self.password,
+                                                device=device)
+                show_optics_data = executor.submit(get_show_optics_data, self.ip, self.username, self.password,
+                                                   device=device)
+            else:
+                interface_descriptions = executor.submit(get_interface_descriptions, self.ip, self.username,
+                                                         self.password, device)
+
+            if self.interface_cache is None:
+                self.show_int_data = show_int_data.result()
+                self.show_optics_data = show_optics_data.result()
+            else:
+                self.fetch_interface_details(device, executor, interface_descriptions.result())
+
+            self.cdp_devices = cdp_devices.result()
+            self.ospf_neighbors = ospf_neighbors.result()
+            self.mpls_ldp_neighbors = mpls_ldp_neighbors.result()
+
+    def parses_in_stage(self):
+        """
+        Whether the device's output can be parsed in the crawl engine's parse stage: devices on the
+        CLI collector with full polling. XML is parsed as it streams in, and two-phase polling needs
+        the parsed probe before it knows what to fetch, so both parse while fetching instead.
+        """
+        return self.interface_cache is None and self.collector is COLLECTORS["cli"]
+
+    def fetch_outputs(self):
+        """
+        Fetch the raw output of the ``STAGED_COMMANDS`` over one session, like ``fetch_data``, and
+        return the outputs still to be parsed, keyed by attribute.
+
+        Each output is kept as the undecoded bytes received, in a single copy, and decoded by the
+        parse stage. Unlike ``fetch_data``, which parses output as it streams in, the whole output of
+        every command is held until it is parsed; the crawl engine caps how much of it waits.
+
+        CDP, OSPF and LDP commands that fail leave an empty list, and with a change detector their
+        output that is unchanged since the last cycle gets its previous parse result straight away.
+        """
+        with self.open_session() as device, self.commands() as executor:
+            results = {name: executor.submit(device.read_command_output, command)
+                       for name, (command, _, _) in STAGED_COMMANDS.items()}
+
+            self.output_hashes = {}
+            outputs = {}
+            for name, result in results.items():
+                command, _, neighbor_command = STAGED_COMMANDS[name]
+                try:
+                    output = result.result()
+                except CommandError:
+                    if not neighbor_command:
+                        raise
+                    setattr(self, name, [])
+                    continue
+
+                if neighbor_command and self.change_detector is not None:
+                    digest = self.change_detector.output_hash(iter_lines([output]))
+                    parsed = self.change_detector.cached(self.ip, command, digest)
+                    if parsed is not None:
+                        setattr(self, name, parsed)
+                        continue
+                    self.output_hashes[name] = digest
+                outputs[name] = output
+        return outputs
+
+    def apply_parsed(self, parsed):
+        """Take the parse stage's results for the outputs ``fetch_outputs`` returned."""
+        for name, result in parsed.items():
+            setattr(self, name, result)
+            if name in self.output_hashes:
+                self.change_detector.remember(self.ip, STAGED_COMMANDS[name][0], self.output_hashes[name], result)
+
+    def fetch_interface_details(self, device, executor, interface_descriptions):
+        """
+        Second phase of two-phase polling: fetch 'show interface' and optics only for the interfaces
+        the interface cache selects from the description probe, and reuse cached detail for the rest.
+        """
+        names = self.interface_cache.plan(self.ip, interface_descriptions)
+        get_show_int_data = self.collector["show_int_data"]
+        get_show_optics_data = self.collector["show_optics_data"]
+
+        if names is None:
+            show_int_data = executor.submit(get_show_int_data, self.ip, self.username, self.password, device=device)
+            show_optics_data = executor.submit(get_show_optics_data, self.ip, self.username, self.password,
+                                               device=device)
+            show_int_data = show_int_data.result()
+            show_optics_data = show_optics_data.result()
+        else:
+            show_int_results = [executor.submit(get_show_int_data, self.ip, self.username, self.password, name,
+                                                device=device)
+                                for name in names]
+            locations = [location for location in map(interface_location, names) if location]
+            show_optics_results = [executor.submit(get_show_optics_data, self.ip, self.username, self.password,
+                                                   location, device=device, port=optics_port_name(location))
+                                   for location in locations]
+
+            show_int_data = {}
+            for result in show_int_results:
+                show_int_data.update(result.result())
+            show_optics_data = {}
+            for result in show_optics_results:
+                # A port without optics answers with no output, which parses to an empty record
+                show_optics_data.update((port, data) for port, data in result.result().items() if data)
+
+        self.interface_cache.store(self.ip, interface_descriptions, show_int_data, show_optics_data, names)
+        self.show_int_data, self.show_optics_data = self.interface_cache.snapshot(self.ip)
 
     def sort_and_create_links(self):
         """
         Sort and create the links based on the fetched data.
+
+        Links are ``InterfaceRecord``s, keyed by canonical interface name so that the commands'
+        data merge however each of them spells the interface. The parsed 'show int' records may be
+        cached between cycles, so links are built from copies of them.
         """
+        index = InterfaceIndex(self.show_int_data)
+
         for device in self.cdp_devices:
-            interface_name = device["interface"]
-            if (interface_name, self.coredevice_id) in self.links:
-                self.links[(interface_name, self.coredevice_id)]["link"].cdp = device["device_id"]
+            key = (canonical_interface_name(device["interface"]), self.coredevice_id)
+            if key in self.links:
+                self.links[key]["link"].cdp = device["device_id"]
             else:
-                new_link = LinkCreate(
-                    name=interface_name,
-                    physical_status="",
-                    protocol_status="",
-                    mpls_ldp="",
-                    ospf="",
-                    ospf_interface_address="",
-                    bw="",
-                    description="",
-                    media_type="",
-                    cdp=device["device_id"],
-                    input_rate="",
-                    output_rate="",
-                    tx="",
-                    rx="",
-                    mtu="",
-                    input_errors="",
-                    output_errors="",
-                    crc="",
-                    interface_ip=""  # Added interface_ip field
-                )
-                self.links[(interface_name, self.coredevice_id)] = {"link": new_link, "coredevice_id": self.coredevice_id}
-
-        for name, data in self.show_int_data.items():
-            if (name, self.coredevice_id) in self.links:
-                self.links[(name, self.coredevice_id)]["link"].physical_status = data.get('physical_status', '')
-                self.links[(name, self.coredevice_id)]["link"].protocol_status = data.get('protocol_status', '')
-                self.links[(name, self.coredevice_id)]["link"].description = data.get('description', '')
-                self.links[(name, self.coredevice_id)]["link"].media_type = data.get('media_type', '')
-                self.links[(name, self.coredevice_id)]["link"].mtu = data.get('mtu', '')
-                self.links[(name, self.coredevice_id)]["link"].bw = data.get('bw', '')
-                self.links[(name, self.coredevice_id)]["link"].input_rate = data.get('input_rate', '')
-                self.links[(name, self.coredevice_id)]["link"].output_rate = data.get('output_rate', '')
-                self.links[(name, self.coredevice_id)]["link"].tx = data.get('tx', '')
-                self.links[(name, self.coredevice_id)]["link"].rx = data.get('rx', '')
-                self.links[(name, self.coredevice_id)]["link"].input_errors = data.get('input_errors', '')
-                self.links[(name, self.coredevice_id)]["link"].output_errors = data.get('output_errors', '')
-                self.links[(name, self.coredevice_id)]["link"].crc = data.get('crc', '')
-                self.links[(name, self.coredevice_id)]["link"].interface_ip = data.get('interface_ip', '')  # Added interface_ip
-            elif data.get('description', '') and (name, self.coredevice_id) not in self.links:
-                new_link = LinkCreate(
-                    name=name,
-                    physical_status=data.get('physical_status', ''),
-                    protocol_status=data.get('protocol_status', ''),
-                    mpls_ldp="",
-                    ospf="",
-                    ospf_interface_address="",
-                    bw=data.get('bw', ''),
-                    description=data.get('description', ''),
-                    media_type=data.get('media_type', ''),
-                    cdp="",
-                    input_rate=data.get('input_rate', ''),
-                    output_rate=data.get('output_rate', ''),
-                    tx=data.get('tx', ''),
-                    rx=data.get('rx', ''),
-                    mtu=data.get('mtu', ''),
-                    input_errors=data.get('input_errors', ''),
-                    output_errors=data.get('output_errors', ''),
-                    crc=data.get('crc', ''),
-                    interface_ip=data.get('interface_ip', '')  # Added interface_ip field
-                )
-                self.links[(name, self.coredevice_id)] = {"link": new_link, "coredevice_id": self.coredevice_id}
+                new_link = InterfaceRecord(name=index.name(device["interface"]), cdp=device["device_id"])
+                self.links[key] = {"link": new_link, "coredevice_id": self.coredevice_id}
+
+        for name, record in self.show_int_data.items():
+            key = (canonical_interface_name(name), self.coredevice_id)
+            if key in self.links:
+                # 'show int' has every field of a link but its neighbors, which so far only CDP has set
+                link = self.links[key]["link"]
+                self.links[key]["link"] = replace(record, cdp=link.cdp)
+            elif record.description:
+                self.links[key] = {"link": replace(record), "coredevice_id": self.coredevice_id}
 
         for port, data in self.show_optics_data.items():
-            interface_name = self.get_interface_name(port)
-            if (interface_name, self.coredevice_id) in self.links:
-                self.links[(interface_name, self.coredevice_id)]["link"].tx = str(data.get('actual_tx_power', ''))
-                self.links[(interface_name, self.coredevice_id)]["link"].rx = str(data.get('rx_power', ''))
-                self.links[(interface_name, self.coredevice_id)]["link"].interface_ip = ""  # Placeholder for interface_ip
-            elif interface_name and (interface_name, self.coredevice_id) not in self.links:
-                new_link = LinkCreate(
-                    name=interface_name,
-                    physical_status="",
-                    protocol_status="",
-                    mpls_ldp="",
-                    ospf="",
-                    ospf_interface_address="",
-                    bw="",
-                    description="",
-                    media_type="",
-                    cdp="",
-                    input_rate="",
-                    output_rate="",
-                    tx=str(data.get('actual_tx_power', '')),
-                    rx=str(data.get('rx_power', '')),
-                    mtu="",
-                    input_errors="",
-                    output_errors="",
-                    crc="",
-                    interface_ip=""  # Added interface_ip field
-                )
-                self.links[(interface_name, self.coredevice_id)] = {"link": new_link,
-                                                                    "coredevice_id": self.coredevice_id}
+            interface_name = index.optics_interface(port)
+            if not interface_name:
+                continue
+            key = (canonical_interface_name(interface_name), self.coredevice_id)
+            if key in self.links:
+                self.links[key]["link"].tx = data.get('actual_tx_power')
+                self.links[key]["link"].rx = data.get('rx_power')
+                self.links[key]["link"].interface_ip = ""  # Placeholder for interface_ip
+            else:
+                new_link = InterfaceRecord(name=interface_name, tx=data.get('actual_tx_power'), rx=data.get('rx_power'))
+                self.links[key] = {"link": new_link, "coredevice_id": self.coredevice_id}
 
         for ospf_neighbor in self.ospf_neighbors:
-            if (ospf_neighbor['interface'], self.coredevice_id) in self.links:
-                self.links[(ospf_neighbor['interface'], self.coredevice_id)]["link"].ospf = ospf_neighbor['state']
-                self.links[(ospf_neighbor['interface'], self.coredevice_id)]["link"].ospf_interface_address = ospf_neighbor['interface_address']
+            key = (canonical_interface_name(ospf_neighbor['interface']), self.coredevice_id)
+            if key in self.links:
+                self.links[key]["link"].ospf = ospf_neighbor['state']
+                self.links[key]["link"].ospf_interface_address = ospf_neighbor['interface_address']
 
         for mpls_ldp_neighbor in self.mpls_ldp_neighbors:
             for interface in mpls_ldp_neighbor['ldp_discovery_sources']:
-                if (interface, self.coredevice_id) in self.links:
-                    self.links[(interface, self.coredevice_id)]["link"].mpls_ldp = 'up'
-
-    def get_interface_name(self, port):
-        # Extract the numbers from the port name
-        numbers = [int(''.join([char for char in part if char.isdigit()])) for part in port.split('_')]
-
-        # Find an interface in the show_int_data that has the same numbers
-        for name, _ in self.show_int_data.items():
-            # Remove any non-numeric characters from the interface name
-            interface_name = ''.join(filter(str.isdigit, name))
-
-            # If the interface name contains numbers, compare them to the port numbers
-            if interface_name:
-                interface_numbers = [int(d) for d in interface_name]
-                if len(interface_numbers) == len(numbers) and interface_numbers == numbers:
-                    return name
-
-        return None
+                key = (canonical_interface_name(interface), self.coredevice_id)
+                if key in self.links:
+                    self.links[key]["link"].mpls_ldp = 'up'
 
     def save_to_database(self):
         """
         Save the created links to the database.
+
+        With a change detector, links that are unchanged since the device's previous cycle,
+        neighbor values and counters included, are copied forward from that cycle in bulk, with
+        the neighbor values resolved this cycle, and only the others are created one by one. Links
+        carrying traffic change their rates every cycle, so in practice only down and idle links
+        are copied.
         """
 
+        rows = []
         for value in self.links.values():
             neighbor_coredevice_id = None
             container_name = None
             neighbor_ip = None
             if value["link"].ospf_interface_address:
-                neighbor_ip = None
-
-                filtered_neighbor_ips = list(filter(lambda ip: ip[2] == value["link"].ospf_interface_address, self.int_ips))
-                if len(filtered_neighbor_ips) > 0:
-                    neighbor_ip = filtered_neighbor_ips[0][0]
-                filtered_coredevices = list(filter(lambda device: device.ip == neighbor_ip, self.core_devices))
-                if len(filtered_coredevices) > 0:
-                    neighbor_coredevice_id = filtered_coredevices[0].id
+                neighbor_ip = self.neighbors.neighbor_ip(value["link"].ospf_interface_address)
+                neighbor_coredevice_id = self.neighbors.coredevice_id(neighbor_ip)
 
                 if neighbor_ip:
-                    container_names = find_container_from_ip(neighbor_ip, self.spectrum_container_data)
+                    container_names = find_container_from_ip(neighbor_ip, self.spectrum_containers)
                     if len(container_names) > 0:
                         container_name = container_names[0]
 
-            self.link_repository.create_link(link=value["link"],
-                                             coredevice_id=value["coredevice_id"],
-                                             count=self.count,
-                                             neighbor_coredevice_id=neighbor_coredevice_id,
-                                             container_name=container_name,
-                                             neighbor_ip=neighbor_ip
-                                             )
+            rows.append((value, neighbor_coredevice_id, container_name, neighbor_ip))
+
+        copied = set()
+        if self.change_detector is not None:
+            link_hashes = {value["link"].name: self.change_detector.link_hash(value["link"], *neighbor)
+                           for value, *neighbor in rows}
+            previous_count, unchanged = self.change_detector.unchanged_links(self.coredevice_id, link_hashes)
+            neighbors = {value["link"].name: neighbor for value, *neighbor in rows}
+            copied = self.link_repository.copy_links(self.coredevice_id, {name: neighbors[name] for name in unchanged},
+                                                     previous_count, self.count)
+
+        stored = set(copied)
+        for value, neighbor_coredevice_id, container_name, neighbor_ip in rows:
+            if value["link"].name in copied:
+                continue
+            db_link = self.link_repository.create_link(link=value["link"],
+                                                       coredevice_id=value["coredevice_id"],
+                                                       count=self.count,
+                                                       neighbor_coredevice_id=neighbor_coredevice_id,
+                                                       container_name=container_name,
+                                                       neighbor_ip=neighbor_ip
+                                                       )
+            if db_link is not None:
+                stored.add(value["link"].name)
+
+        if self.change_detector is not None:
+            # Only links that made it into this cycle can be copied from it next time
+            self.change_detector.store_links(self.coredevice_id, self.count,
+                                             {name: link_hashes[name] for name in stored})
+
+    def store_links(self):
+        """
+        Sort and create links from the fetched data, and save them to the database.
+        """
+        self.sort_and_create_links()
+        self.save_to_database()
 
     def process_links(self):
         """
         Fetch data, sort and create links, and save them to the database.
         """
         self.fetch_data()
-        self.sort_and_create_links()
-        self.save_to_database()
+        self.store_links()
@@ -0,0 +1,107 @@
+import hashlib
+import re
+import threading
+from dataclasses import astuple
+
+
+# Fields of CDP, OSPF and MPLS LDP neighbor output that change on every poll while the neighbors
+# stay the same: hold and dead timers, uptimes, message and retransmission counters
+VOLATILE_FIELDS = re.compile(
+    r"Holdtime\s*:\s*\d+ sec"
+    r"|Dead timer due in \S+"
+    r"|Neighbor is up for \S+"
+    r"|Up time: \S+"
+    r"|Msgs sent/rcvd: \d+/\d+"
+    r"|Number of DBD retrans during last exchange \d+"
+    r"|retransmission queue length \d+, number of retransmission \d+"
+    r"|First \S+ Next \S+"
+    r"|Last retransmission scan (?:length|time) is .*"
+    r"|LS Ack list: .*"
+)
+
+
+def content_hash(data):
+    """Return a short digest of ``data`` (bytes) for telling whether it changed since last cycle."""
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class ChangeDetector:
+    """
+    Content hashes kept between crawl cycles, to skip the work for data that did not change.
+
+    Command output is hashed per device and command, leaving out the ``VOLATILE_FIELDS`` that
+    change on every poll. When it is the same as the previous cycle's, the previous parse result
+    is reused instead of parsing it again, so the timer and counter fields of a reused result are
+    the previous cycle's.
+
+    Each link a device stores is hashed together with the neighbor values written for it; links
+    whose hash matches the row stored in the device's previous cycle are copied forward in bulk by
+    the caller instead of being inserted one by one. A link's rates and error counters are part
+    of its hash, so this only saves inserts for links without traffic, such as down or idle ones.
+    """
+
+    def __init__(self):
+        self._outputs = {}
+        self._links = {}
+        self._lock = threading.Lock()
+
+    def parse(self, ip, command, lines, parse):
+        """
+        Return ``parse(lines)`` for a command's output lines, or the previous cycle's result if the
+        output is unchanged. Results are shared between cycles, so callers must not modify them.
+        """
+        lines = list(lines)
+        digest = self.output_hash(lines)
+        result = self.cached(ip, command, digest)
+        if result is None:
+            result = parse(lines)
+            self.remember(ip, command, digest, result)
+        return result
+
+    @staticmethod
+    def output_hash(lines):
+        """Return the hash of a command's output lines, without their ``VOLATILE_FIELDS``."""
+        digest = hashlib.blake2b(digest_size=16)
+        for line in lines:
+            digest.update(VOLATILE_FIELDS.sub("", line).encode("utf-8"))
+            digest.update(b"\n")
+        return digest.digest()
+
+    def cached(self, ip, command, digest):
+        """Return the previous parse result of a command if its output hash was ``digest``, else None."""
+        with self._lock:
+            previous = self._outputs.get((ip, command))
+        if previous is not None and previous[0] == digest:
+            return previous[1]
+        return None
+
+    def remember(self, ip, command, digest, result):
+        """Remember the parse result of a command's output with hash ``digest``."""
+        with self._lock:
+            self._outputs[(ip, command)] = (digest, result)
+
+    @staticmethod
+    def link_hash(link, neighbor_coredevice_id=None, container_name=None, neighbor_ip=None):
+        """Return the hash of a link's ``InterfaceRecord`` and the neighbor values it is stored with."""
+        values = (*astuple(link), neighbor_coredevice_id, container_name, neighbor_ip)
+        return content_hash(repr(values).encode("utf-8"))
+
+    def unchanged_links(self, coredevice_id, link_hashes):
+        """
+        Compare a device's link hashes, keyed by link name, with those it stored last time.
+
+        Returns the crawler cycle the device's links were last stored in and the names of the
+        links that are unchanged since, or ``(None, [])`` if nothing is known about the device.
+        """
+        with self._lock:
+            previous = self._links.get(coredevice_id)
+        if previous is None:
+            return None, []
+
+        count, previous_hashes = previous
+        return count, [name for name, digest in link_hashes.items() if previous_hashes.get(name) == digest]
+
+    def store_links(self, coredevice_id, count, link_hashes):
+        """Remember the hashes of the links a device stored in crawler cycle ``count``."""
+        with self._lock:
+            self._links[coredevice_id] = (count, dict(link_hashes))
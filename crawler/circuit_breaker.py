@@ -0,0 +1,57 @@
+import json
+import os
+import threading
+
+from crawler.config import circuit_breaker_base_cycles, circuit_breaker_max_cycles, circuit_breaker_state_file
+
+
+class DeviceCircuitBreaker:
+    """
+    Remembers devices that recently failed to connect and skips them for a few cycles.
+
+    Each consecutive failure doubles the number of cycles a device is skipped for, from
+    ``base_cycles`` up to ``max_cycles``; a successful fetch resets it. The state is kept in a
+    JSON file so it survives between crawler runs.
+    """
+
+    def __init__(self, state_file=circuit_breaker_state_file, base_cycles=circuit_breaker_base_cycles,
+                 max_cycles=circuit_breaker_max_cycles):
+        self.state_file = state_file
+        self.base_cycles = base_cycles
+        self.max_cycles = max_cycles
+        self.devices = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, state_file=circuit_breaker_state_file):
+        circuit_breaker = cls(state_file)
+        if state_file and os.path.exists(state_file):
+            try:
+                with open(state_file, 'r') as file:
+                    circuit_breaker.devices = json.load(file)
+            except (OSError, ValueError) as e:
+                print(f"Could not load circuit breaker state: {e}")
+        return circuit_breaker
+
+    def save(self):
+        if not self.state_file:
+            return
+        with self._lock:
+            with open(self.state_file, 'w') as file:
+                json.dump(self.devices, file)
+
+    def should_skip(self, ip, cycle):
+        """Return True if the device is still backing off in this cycle."""
+        with self._lock:
+            state = self.devices.get(ip)
+            return state is not None and cycle < state["retry_cycle"]
+
+    def record_failure(self, ip, cycle):
+        with self._lock:
+            failures = self.devices.get(ip, {}).get("failures", 0) + 1
+            skip_cycles = min(self.base_cycles * 2 ** (failures - 1), self.max_cycles)
+            self.devices[ip] = {"failures": failures, "retry_cycle": cycle + skip_cycles + 1}
+
+    def record_success(self, ip):
+        with self._lock:
+            self.devices.pop(ip, None)
@@ -0,0 +1,32 @@
+from crawler.config import device_platforms, xml_collector_platforms
+from network import xml_backend
+from network.controllers_optics import get_show_optics_data
+from network.int import get_show_int_data
+
+# How a device's interface and optics data is collected: parsed from the CLI, or as XML over NETCONF
+COLLECTORS = {
+    "cli": {"show_int_data": get_show_int_data, "show_optics_data": get_show_optics_data},
+    "xml": {"show_int_data": xml_backend.get_show_int_data, "show_optics_data": xml_backend.get_show_optics_data},
+}
+
+
+def get_device_platform(ip, coresite_id=None, platforms=None):
+    """
+    Return the configured platform of a device, or None.
+
+    A platform set for the device's own IP wins over one set for its coresite, which wins over
+    the "default" one.
+    """
+    if platforms is None:
+        platforms = device_platforms
+
+    for key in (ip, f"coresite:{coresite_id}", "default"):
+        if key in platforms:
+            return platforms[key]
+    return None
+
+
+def get_collector(ip, coresite_id=None):
+    """Return the collector for a device: XML for the platforms listed in XML_COLLECTOR_PLATFORMS, else CLI."""
+    platform = get_device_platform(ip, coresite_id)
+    return COLLECTORS["xml" if platform in xml_collector_platforms else "cli"]
@@ -1,3 +1,4 @@
+import json
 import os
 from dotenv import load_dotenv
 
@@ -14,3 +15,57 @@ mpls_ldp_type = os.getenv("KPLS_LDP_TYPE", "Error")
 
 ospf_severity = os.getenv("OSPF_SEVERITY", 10)
 ospf_type = os.getenv("OSPF_TYPE", "Error")
+
+# Crawl engine concurrency: devices with an SSH session in flight, parse processes, and parallel database
+# writers, with the number of devices that may wait between two stages before fetching is held back
+crawl_concurrency = int(os.getenv("CRAWL_CONCURRENCY", 200))
+crawl_parse_workers = int(os.getenv("CRAWL_PARSE_WORKERS", os.cpu_count() or 1))
+crawl_write_workers = int(os.getenv("CRAWL_WRITE_WORKERS", 10))
+crawl_stage_queue_size = int(os.getenv("CRAWL_STAGE_QUEUE_SIZE", 50))
+# Threads running device commands, shared by every device in flight. A device's fetch holds one of the
+# CRAWL_CONCURRENCY fetch threads and runs its commands on these, so at most CRAWL_CONCURRENCY +
+# CRAWL_COMMAND_WORKERS threads fetch at once; each command also waits for a channel of its device's session.
+crawl_command_workers = int(os.getenv("CRAWL_COMMAND_WORKERS", 2 * crawl_concurrency))
+# Raw output bytes that may be held between fetching and parsing before fetching is held back
+crawl_stage_queue_bytes = int(os.getenv("CRAWL_STAGE_QUEUE_BYTES", 512 * 1024 * 1024))
+# 'show int' output longer than this many characters is parsed in chunks of about this size in parallel
+show_int_chunk_size = int(os.getenv("SHOW_INT_CHUNK_SIZE", 2 * 1024 * 1024))
+
+# Seconds between crawl cycles when run_crawler runs continuously; 0 runs a single cycle and exits
+crawl_interval = int(os.getenv("CRAWL_INTERVAL", 0))
+
+# Circuit breaker for unreachable devices: a device that fails is skipped for a number of cycles
+# that doubles with each consecutive failure, starting at the base and capped at the maximum
+circuit_breaker_base_cycles = int(os.getenv("CIRCUIT_BREAKER_BASE_CYCLES", 1))
+circuit_breaker_max_cycles = int(os.getenv("CIRCUIT_BREAKER_MAX_CYCLES", 12))
+circuit_breaker_state_file = os.getenv("CIRCUIT_BREAKER_STATE_FILE", "crawler_circuit_breaker.json")
+
+# Rate limits shared by all crawl workers: commands per second (and burst) sent to one device, and devices
+# of one coresite crawled at the same time. 0 disables a limit.
+device_commands_per_second = float(os.getenv("DEVICE_COMMANDS_PER_SECOND", 5))
+device_command_burst = int(os.getenv("DEVICE_COMMAND_BURST", 5))
+coresite_max_sessions = int(os.getenv("CORESITE_MAX_SESSIONS", 20))
+
+# SSH transport profiles as JSON, keyed by "default", "coresite:<coresite id>" or a device IP, e.g.
+# {"default": {"compress": true}, "coresite:4": {"window_size": 16777216, "max_packet_size": 65536}}
+ssh_transport_profiles = json.loads(os.getenv("SSH_TRANSPORT_PROFILES", "{}"))
+
+# Interface polling: "full" fetches 'show int' and all optics every cycle; "two_phase" probes
+# 'show interface description' first and re-fetches detail only for changed, new or stale interfaces.
+# Each of those costs a 'show interface' and a 'show controllers optics' against the device's command rate
+# limit, so when that costs more than the 2 commands of a full fetch, the full fetch is sent instead. The
+# command cost weighs one command against the output of one interface.
+polling_mode = os.getenv("POLLING_MODE", "full")
+detail_staleness_seconds = int(os.getenv("DETAIL_STALENESS_SECONDS", 1800))
+detail_command_cost = float(os.getenv("DETAIL_COMMAND_COST", 4))
+
+# Device platforms as JSON, keyed like SSH_TRANSPORT_PROFILES by "default", "coresite:<coresite id>" or a
+# device IP, e.g. {"default": "iosxr-cli", "coresite:4": "iosxr"}. Devices on one of XML_COLLECTOR_PLATFORMS
+# have interface and optics data collected as structured XML over NETCONF instead of parsed from the CLI.
+device_platforms = json.loads(os.getenv("DEVICE_PLATFORMS", "{}"))
+xml_collector_platforms = [platform for platform in os.getenv("XML_COLLECTOR_PLATFORMS", "iosxr").split(",")
+                           if platform]
+
+# Change detection between cycles of a continuously running crawler: CDP, OSPF and LDP output that is
+# unchanged is not parsed again, and links that are unchanged are copied forward from the previous cycle
+change_detection = os.getenv("CHANGE_DETECTION", "true").lower() in ("1", "true", "yes")
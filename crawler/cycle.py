@@ -0,0 +1,21 @@
+from crawler.neighbors import NeighborIndex
+
+
+class CycleContext:
+    """
+    The read-only data every device of a crawl cycle shares: the cycle count and the indexes its
+    neighbor links are resolved with.
+
+    Built once per cycle and handed to the crawl engine, which gives the same object to every
+    device's ``LinkService``. Only the indexes are kept, not the inventory rows they were built from.
+    """
+
+    def __init__(self, count, neighbors, spectrum_containers):
+        self.count = count
+        self.neighbors = neighbors
+        self.spectrum_containers = spectrum_containers
+
+    @classmethod
+    def build(cls, count, core_devices, int_ips, spectrum_containers):
+        """Index a cycle's core devices and interface inventory, with its ``SpectrumContainerIndex``."""
+        return cls(count, NeighborIndex(core_devices, int_ips), spectrum_containers)
@@ -0,0 +1,220 @@
+import asyncio
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from crawler import LinkService
+from crawler.config import (crawl_command_workers, crawl_concurrency, crawl_parse_workers, crawl_stage_queue_bytes,
+                            crawl_stage_queue_size, crawl_write_workers, show_int_chunk_size)
+from crawler.pipeline import OutputBudget, parse_outputs
+from network.int import merge_show_int_chunks, parse_show_int_chunk, split_show_int_output
+from network.paramiko_connection_CiscoDevices import is_connection_error
+
+
+class CrawlEngine:
+    """
+    Crawls core devices concurrently from an asyncio event loop, as a pipeline of three stages.
+
+    - Fetch: SSH I/O is blocking paramiko code, so each device's fetch runs in a thread pool
+      behind the loop, with a semaphore bounding how many devices are in flight at once. The
+      devices' commands run on one more thread pool of ``command_workers``, shared by all of them.
+    - Parse: raw output is parsed in a process pool sized to the CPU count, so parsing uses every
+      core and never holds up a fetch slot. Very large 'show int' output is split into chunks
+      parsed side by side.
+    - Write: links are sorted and saved in a smaller thread pool, so the number of concurrent
+      database sessions stays bounded however many devices are being fetched.
+
+    The stages are joined by bounded queues, and the raw output waiting to be parsed is capped
+    at ``queue_bytes``. A fetch keeps its slot until its output is queued, so a slow parse or
+    write stage holds back fetching instead of piling up output in memory.
+
+    Optional collaborators:
+
+    - ``SSHConnectionPool``: device sessions are reused across runs of the same engine.
+    - ``DeviceCircuitBreaker``: devices that recently failed to fetch are skipped.
+    - ``CrawlRateLimiter``: commands per device are rate limited, and only so many devices of
+      each coresite are fetched at once.
+    - ``InterfaceDetailCache``: interface detail is polled in two phases and only fetched again
+      for interfaces that changed.
+    - ``ChangeDetector``: unchanged command output is not parsed again, and unchanged links are
+      copied forward from the previous cycle.
+    """
+
+    def __init__(self, username, password, concurrency=crawl_concurrency, write_workers=crawl_write_workers,
+                 connection_pool=None, circuit_breaker=None, rate_limiter=None, interface_cache=None,
+                 change_detector=None, parse_workers=crawl_parse_workers, queue_size=crawl_stage_queue_size,
+                 queue_bytes=crawl_stage_queue_bytes, show_int_chunk_size=show_int_chunk_size,
+                 command_workers=crawl_command_workers):
+        self.username = username
+        self.password = password
+        self.connection_pool = connection_pool
+        self.circuit_breaker = circuit_breaker
+        self.rate_limiter = rate_limiter
+        self.interface_cache = interface_cache
+        self.change_detector = change_detector
+        self.concurrency = concurrency
+        self.write_workers = write_workers
+        self.parse_workers = parse_workers
+        self.queue_size = queue_size
+        self.queue_bytes = queue_bytes
+        self.show_int_chunk_size = show_int_chunk_size
+        self.command_workers = command_workers
+
+    def run(self, core_devices, context):
+        """
+        Crawl every core device in the cycle of a ``CycleContext`` and return a dict mapping
+        device IP to whether it succeeded.
+        """
+        results = asyncio.run(self.crawl(core_devices, context))
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.save()
+        return results
+
+    async def crawl(self, core_devices, context):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        coresite_slots = {}
+        parse_queue = asyncio.Queue(self.queue_size)
+        write_queue = asyncio.Queue(self.queue_size)
+        output_budget = OutputBudget(self.queue_bytes)
+        results = {}
+        # Parse workers are started from a fork server, not forked from this process and its running SSH threads
+        with ThreadPoolExecutor(max_workers=self.concurrency) as fetch_executor, \
+                ThreadPoolExecutor(max_workers=self.command_workers) as command_executor, \
+                ProcessPoolExecutor(max_workers=self.parse_workers,
+                                    mp_context=multiprocessing.get_context("forkserver")) as parse_executor, \
+                ThreadPoolExecutor(max_workers=self.write_workers) as write_executor:
+            parsers = [asyncio.create_task(self.parse_stage(parse_queue, write_queue, output_budget, parse_executor,
+                                                            results))
+                       for _ in range(self.parse_workers)]
+            writers = [asyncio.create_task(self.write_stage(write_queue, write_executor, results))
+                       for _ in range(self.write_workers)]
+
+            await asyncio.gather(*(
+                self.crawl_core_device(core_device, context, semaphore, coresite_slots, fetch_executor,
+                                       command_executor, parse_queue, write_queue, output_budget, results)
+                for core_device in core_devices
+            ))
+            await self.close_stage(parse_queue, parsers)
+            await self.close_stage(write_queue, writers)
+        return {core_device.ip: results.get(core_device.ip, False) for core_device in core_devices}
+
+    @staticmethod
+    async def close_stage(queue, workers):
+        """Let a stage's workers finish what is queued, then stop them."""
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+
+    def coresite_slot(self, coresite_slots, coresite_id):
+        """Return the semaphore capping concurrent sessions to one coresite's devices."""
+        if self.rate_limiter is None or not self.rate_limiter.coresite_sessions:
+            return contextlib.nullcontext()
+        if coresite_id not in coresite_slots:
+            coresite_slots[coresite_id] = asyncio.Semaphore(self.rate_limiter.coresite_sessions)
+        return coresite_slots[coresite_id]
+
+    async def crawl_core_device(self, core_device, context, semaphore, coresite_slots, fetch_executor,
+                                command_executor, parse_queue, write_queue, output_budget, results):
+        """
+        Fetch stage: fetch a device's data and queue it for parsing, or straight for writing if it
+        was parsed while fetching (see ``LinkService.parses_in_stage``).
+        """
+        loop = asyncio.get_running_loop()
+        ip = core_device.ip
+        count = context.count
+
+        if self.circuit_breaker is not None and self.circuit_breaker.should_skip(ip, count):
+            print(f"Skipping core device with IP {ip}: it failed recently and is backing off")
+            results[ip] = False
+            return
+
+        try:
+            # The concurrency slot is held until the output is queued, which is where back-pressure comes from
+            async with self.coresite_slot(coresite_slots, core_device.coresite_id), semaphore:
+                # Built in the slot, so only so many devices' services and database sessions exist at once
+                link_service = LinkService(ip, self.username, self.password, core_device.id, None, None,
+                                           context.spectrum_containers, count, connection_pool=self.connection_pool,
+                                           rate_limiter=self.rate_limiter, coresite_id=core_device.coresite_id,
+                                           interface_cache=self.interface_cache,
+                                           change_detector=self.change_detector, neighbors=context.neighbors,
+                                           command_executor=command_executor)
+                if link_service.parses_in_stage():
+                    outputs = await loop.run_in_executor(fetch_executor, link_service.fetch_outputs)
+                else:
+                    await loop.run_in_executor(fetch_executor, link_service.fetch_data)
+                    outputs = None
+
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.record_success(ip)
+                if outputs is None:
+                    await write_queue.put(link_service)
+                else:
+                    size = sum(map(len, outputs.values()))
+                    await output_budget.acquire(size)
+                    await parse_queue.put((link_service, outputs, size))
+        except Exception as e:
+            # Only an unreachable or unresponsive device backs off; errors on our side must not skip healthy ones
+            if self.circuit_breaker is not None and is_connection_error(e):
+                self.circuit_breaker.record_failure(ip, count)
+            print(f"Error occurred for core device with IP {ip}: {str(e)}")
+            results[ip] = False
+
+    async def parse_stage(self, parse_queue, write_queue, output_budget, parse_executor, results):
+        """
+        Parse stage: parse queued output in the process pool, give its room in ``output_budget``
+        back and queue the device for writing.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await parse_queue.get()
+            if item is None:
+                return
+
+            link_service, outputs, size = item
+            try:
+                link_service.apply_parsed(await self.parse(outputs, parse_executor))
+            except Exception as e:
+                print(f"Error occurred for core device with IP {link_service.ip}: {str(e)}")
+                results[link_service.ip] = False
+                continue
+            finally:
+                # The raw output is not needed once parsed, even while the device waits to be written
+                del outputs, item
+                await output_budget.release(size)
+            await write_queue.put(link_service)
+
+    async def parse(self, outputs, parse_executor):
+        """
+        Parse a device's raw outputs in the process pool. 'show int' output over ``show_int_chunk_size``
+        bytes is decoded here, split at interface headers and its chunks parsed in parallel with the
+        other outputs.
+        """
+        loop = asyncio.get_running_loop()
+        show_int_output = outputs.get("show_int_data")
+        if self.parse_workers < 2 or show_int_output is None or len(show_int_output) <= self.show_int_chunk_size:
+            return await loop.run_in_executor(parse_executor, parse_outputs, outputs)
+
+        outputs = {name: output for name, output in outputs.items() if name != "show_int_data"}
+        show_int_output = show_int_output.decode("utf-8")
+        parsed, *chunk_records = await asyncio.gather(
+            loop.run_in_executor(parse_executor, parse_outputs, outputs),
+            *(loop.run_in_executor(parse_executor, parse_show_int_chunk, chunk)
+              for chunk in split_show_int_output(show_int_output, self.show_int_chunk_size)))
+        parsed["show_int_data"] = merge_show_int_chunks(chunk_records)
+        return parsed
+
+    async def write_stage(self, write_queue, write_executor, results):
+        """Write stage: sort and save queued devices' links."""
+        loop = asyncio.get_running_loop()
+        while True:
+            link_service = await write_queue.get()
+            if link_service is None:
+                return
+
+            try:
+                await loop.run_in_executor(write_executor, link_service.store_links)
+                print(f"Crawler finished for core device with IP {link_service.ip}")
+                results[link_service.ip] = True
+            except Exception as e:
+                print(f"Error occurred for core device with IP {link_service.ip}: {str(e)}")
+                results[link_service.ip] = False
@@ -0,0 +1,26 @@
+class NeighborIndex:
+    """
+    Lookups for resolving a link's OSPF neighbor address to the neighbor device, built once per
+    crawl cycle from the interface inventory and the core devices and shared by every device's
+    ``LinkService``.
+
+    The inventory rows are (ipv4, device_id, int_ip), newest first, so an interface address
+    resolves to its most recent row.
+    """
+
+    def __init__(self, core_devices, int_ips):
+        self.int_ips = {}
+        for ipv4, device_id, int_ip in int_ips:
+            self.int_ips.setdefault(int_ip, (ipv4, device_id))
+        self.core_devices = {}
+        for core_device in core_devices:
+            self.core_devices.setdefault(core_device.ip, core_device.id)
+
+    def neighbor_ip(self, interface_address):
+        """Return the management IP of the device an interface address belongs to, or None."""
+        neighbor = self.int_ips.get(interface_address)
+        return neighbor[0] if neighbor else None
+
+    def coredevice_id(self, ip):
+        """Return the id of the core device with management IP ``ip``, or None if it is not one."""
+        return self.core_devices.get(ip)
@@ -0,0 +1,51 @@
+import asyncio
+
+from network.cdp import parse_cdp_devices
+from network.controllers_optics import parse_show_optics_output
+from network.int import parse_show_int_output
+from network.mpls_ldp import parse_mpls_ldp_neighbors
+from network.ospf import parse_ospf_neighbors
+
+# Commands whose raw output the crawl engine's parse stage handles, keyed by the LinkService attribute
+# their parse result goes in: (command, parser, neighbor command). Neighbor commands leave an empty
+# list when they fail and are skipped by the change detector when unchanged; the others fail the device.
+STAGED_COMMANDS = {
+    "cdp_devices": ("sh cdp n d", parse_cdp_devices, True),
+    "ospf_neighbors": ("show ip ospf nei det", parse_ospf_neighbors, True),
+    "mpls_ldp_neighbors": ("show mpls ldp neighbor", parse_mpls_ldp_neighbors, True),
+    "show_int_data": ("show int", parse_show_int_output, False),
+    "show_optics_data": ("show controllers optics *", parse_show_optics_output, False),
+}
+
+
+def parse_outputs(outputs):
+    """
+    Parse raw command outputs, as UTF-8 bytes keyed by ``STAGED_COMMANDS`` attribute. Runs in the
+    parse stage's worker processes, so it only takes and returns plain data.
+    """
+    return {name: STAGED_COMMANDS[name][1](output.decode("utf-8")) for name, output in outputs.items()}
+
+
+class OutputBudget:
+    """
+    Caps the bytes of raw output held between the crawl engine's fetch and parse stages.
+
+    A device takes room for its output before queueing it for parsing and gives it back once it
+    is parsed, so fetching is held back while too much output waits. A device whose output alone
+    is larger than the budget is let through once nothing else is held.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self, size):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.used == 0 or self.used + size <= self.limit)
+            self.used += size
+
+    async def release(self, size):
+        async with self._condition:
+            self.used -= size
+            self._condition.notify_all()
@@ -0,0 +1,134 @@
+import threading
+import time
+
+from crawler.config import detail_command_cost, detail_staleness_seconds
+from network.interface_names import canonical_interface_name, interface_location
+
+
+# 'show int' and 'show controllers optics *'
+FULL_FETCH_COMMANDS = 2
+
+
+def optics_port_name(location):
+    """Return the optics port name for an interface location, e.g. "Optics0_0_0_1" for "0/0/0/1"."""
+    return f"Optics{location.replace('/', '_')}"
+
+
+class InterfaceDetailCache:
+    """
+    Interface state and detail kept between crawl cycles for two-phase polling.
+
+    Each cycle starts with the cheap 'show interface description' probe. Only interfaces whose
+    status, protocol or description changed since the last probe, that are new, or whose detail
+    is older than ``staleness`` seconds have their 'show interface' and optics fetched again; the
+    others, linked or not, reuse the cached detail. On the first cycle a device is seen, or when
+    fetching the selected interfaces would cost more than the full 'show int' and 'show
+    controllers optics *', those are fetched instead.
+
+    Costs are counted in interfaces' worth of output: each command costs ``command_cost`` on top
+    of the output it returns, so the per-interface fetch wins for a few interfaces and the full
+    fetch once enough of them are selected, whatever the size of the device.
+    """
+
+    def __init__(self, staleness=detail_staleness_seconds, command_cost=detail_command_cost):
+        self.staleness = staleness
+        self.command_cost = command_cost
+        self._devices = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _probe(interface_descriptions):
+        return {
+            canonical_interface_name(interface["interface"]):
+                (interface["status"], interface["protocol"], interface["description"])
+            for interface in interface_descriptions
+        }
+
+    def plan(self, ip, interface_descriptions):
+        """
+        Return the full names of the interfaces whose detail must be fetched this cycle, or None
+        if the device should get a full fetch.
+        """
+        with self._lock:
+            device = self._devices.get(ip)
+        if device is None:
+            return None
+
+        now = time.time()
+        probe = self._probe(interface_descriptions)
+        details = device["details"]
+        names = set(probe) | set(details)
+
+        selected = [
+            name for name in names
+            if name not in details
+            or probe.get(name) != device["probe"].get(name)
+            or now - details[name]["fetched_at"] > self.staleness
+        ]
+        if self._cost(selected) > self._full_fetch_cost(names):
+            return None
+        return sorted(selected)
+
+    def _cost(self, names):
+        """Return the cost of fetching the detail of the interfaces ``names`` one by one."""
+        return self._commands(names) * self.command_cost + len(names)
+
+    def _full_fetch_cost(self, names):
+        """Return the cost of the full fetch of a device with the interfaces ``names``."""
+        return FULL_FETCH_COMMANDS * self.command_cost + len(names)
+
+    @staticmethod
+    def _commands(names):
+        """
+        Return the number of commands fetching the detail of the interfaces ``names`` takes: a
+        'show interface' for each, and a 'show controllers optics' for each with a port location.
+        """
+        return len(names) + sum(1 for name in names if interface_location(name))
+
+    def store(self, ip, interface_descriptions, show_int_data, show_optics_data, names=None):
+        """
+        Cache freshly fetched detail for a device.
+
+        ``names`` lists the interfaces that were fetched; without it the data comes from a full
+        fetch and replaces everything cached for the device.
+        """
+        now = time.time()
+        fetched = {}
+        for name in (show_int_data if names is None else names):
+            if name not in show_int_data:
+                continue
+            location = interface_location(name)
+            port = optics_port_name(location) if location else None
+            fetched[name] = {
+                "fetched_at": now,
+                "data": show_int_data[name],
+                "optics": (port, show_optics_data[port]) if port in show_optics_data else None,
+            }
+
+        with self._lock:
+            device = self._devices.get(ip)
+            if names is None or device is None:
+                details = fetched
+            else:
+                details = dict(device["details"])
+                # Interfaces that were asked for but returned nothing no longer exist on the device
+                for name in names:
+                    details.pop(name, None)
+                details.update(fetched)
+            self._devices[ip] = {"probe": self._probe(interface_descriptions), "details": details}
+
+    def snapshot(self, ip):
+        """Return the cached ``(show_int_data, show_optics_data)`` of a device, as the parsers produce them."""
+        with self._lock:
+            device = self._devices.get(ip)
+        if device is None:
+            return {}, {}
+
+        show_int_data = {}
+        show_optics_data = {}
+        for name, detail in device["details"].items():
+            show_int_data[name] = detail["data"]
+            if detail["optics"] is not None:
+                port, optics = detail["optics"]
+                show_optics_data[port] = optics
+        return show_int_data, show_optics_data
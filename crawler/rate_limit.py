@@ -0,0 +1,58 @@
+import threading
+import time
+
+from crawler.config import device_commands_per_second, device_command_burst, coresite_max_sessions
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket: ``rate`` tokens are added per second, up to ``capacity``.
+
+    ``acquire`` blocks the calling thread until a token is available.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class CrawlRateLimiter:
+    """
+    Rate limits shared by every crawl worker, to stay under the devices' CoPP and AAA limits.
+
+    Each device gets a token bucket capping the commands per second sent to it, kept for the
+    life of the limiter so the limit holds across cycles. ``coresite_max_sessions`` caps how
+    many devices of one coresite the crawl engine has sessions open to at the same time.
+    """
+
+    def __init__(self, commands_per_second=device_commands_per_second, command_burst=device_command_burst,
+                 coresite_sessions=coresite_max_sessions):
+        self.commands_per_second = commands_per_second
+        self.command_burst = command_burst
+        self.coresite_sessions = coresite_sessions
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def command_bucket(self, ip):
+        """Return the token bucket for a device's commands, or None if commands are not limited."""
+        if not self.commands_per_second:
+            return None
+        with self._lock:
+            if ip not in self._buckets:
+                self._buckets[ip] = TokenBucket(self.commands_per_second, self.command_burst)
+            return self._buckets[ip]
@@ -3,7 +3,7 @@ import os
 import pickle
 import threading
 
-from sqlalchemy import text
+from sqlalchemy import insert, literal, select, text
 
 from app.database import get_db
 from app.models.core_device import CoreDevice
@@ -15,6 +15,7 @@ from app.repositories.crawler_cycle_repository import CrawlerCycleRepository
 from app.schemas.link import LinkCreate, LinkBase
 from sqlalchemy.exc import IntegrityError
 
+from network.records import InterfaceRecord
 from network.spectrum_topology import export_map
 
 from app.models.alert import Alert
@@ -175,7 +176,7 @@ class LinkRepository:
     def get_link(self, link_id: int):
         return self.db.query(Link).filter(Link.id == link_id).first()
 
-    def create_link(self, link: LinkCreate, coredevice_id: int, count: int, neighbor_coredevice_id: int = None,
+    def create_link(self, link: InterfaceRecord, coredevice_id: int, count: int, neighbor_coredevice_id: int = None,
                     container_name: str = None, neighbor_ip: str = None):
         db_coredevice = self.db.query(CoreDevice).filter(CoreDevice.id == coredevice_id).first()
 
@@ -211,25 +212,7 @@ class LinkRepository:
                 self.db.commit()
 
             db_link = Link(
-                name=link.name,
-                physical_status=link.physical_status,
-                protocol_status=link.protocol_status,
-                mpls_ldp=link.mpls_ldp,
-                ospf=link.ospf,
-                ospf_interface_address=link.ospf_interface_address,
-                bw=link.bw,
-                description=link.description,
-                media_type=link.media_type,
-                cdp=link.cdp,
-                input_rate=link.input_rate,
-                output_rate=link.output_rate,
-                tx=link.tx,
-                rx=link.rx,
-                mtu=link.mtu,
-                input_errors=link.input_errors,
-                output_errors=link.output_errors,
-                crc=link.crc,
-                interface_ip=link.interface_ip,  # Added interface_ip
+                **link.columns(),
                 coredevice=db_coredevice,
                 neighbor_coredevice=neighbor_coredevice or None,
                 neighbor_site=db_site or None,
@@ -245,25 +228,7 @@ class LinkRepository:
                 self.db.rollback()
         elif db_coredevice:
             db_link = Link(
-                name=link.name,
-                physical_status=link.physical_status,
-                protocol_status=link.protocol_status,
-                mpls_ldp=link.mpls_ldp,
-                ospf=link.ospf,
-                ospf_interface_address=link.ospf_interface_address,
-                bw=link.bw,
-                description=link.description,
-                media_type=link.media_type,
-                cdp=link.cdp,
-                input_rate=link.input_rate,
-                output_rate=link.output_rate,
-                tx=link.tx,
-                rx=link.rx,
-                mtu=link.mtu,
-                input_errors=link.input_errors,
-                output_errors=link.output_errors,
-                crc=link.crc,
-                interface_ip=link.interface_ip,  # Added interface_ip
+                **link.columns(),
                 coredevice=db_coredevice,
                 neighbor_coredevice=neighbor_coredevice or None,
                 neighbor_site=None,
@@ -279,6 +244,63 @@ class LinkRepository:
                 self.db.rollback()
         return None
 
+    def copy_links(self, coredevice_id: int, links, from_count: int, count: int):
+        """
+        Copy a core device's links from crawler cycle ``from_count`` to cycle ``count`` with an
+        INSERT ... SELECT per set of neighbor values, and return the names of the links that were
+        copied.
+
+        ``links`` maps link names to the (neighbor core device id, container name, neighbor IP)
+        resolved for them this cycle. These replace the previous rows' neighbor columns, so a
+        neighbor or site reassigned since is written even when the link itself is unchanged. Links
+        whose container has no site yet are left to ``create_link``, which creates it.
+        """
+        groups = {}
+        for name, neighbor in links.items():
+            groups.setdefault(tuple(neighbor), []).append(name)
+        if not groups:
+            return set()
+
+        now = datetime.utcnow()
+        neighbor_columns = ("neighbor_coredevice_id", "neighbor_site_id", "neighbor_ip")
+        copied_columns = [column for column in Link.__table__.columns
+                          if column.name not in ("id", "crawler_cycle", "created_at", "updated_at", *neighbor_columns)]
+        names = []
+        try:
+            for (neighbor_coredevice_id, container_name, neighbor_ip), group in groups.items():
+                neighbor_site_id = None
+                if container_name:
+                    neighbor_site_id = self.db.query(Site.id).filter(Site.name == container_name).scalar()
+                    if neighbor_site_id is None:
+                        continue
+                previous_links = select(
+                    *copied_columns,
+                    literal(neighbor_coredevice_id, Link.neighbor_coredevice_id.type),
+                    literal(neighbor_site_id, Link.neighbor_site_id.type),
+                    literal(neighbor_ip, Link.neighbor_ip.type),
+                    literal(count), literal(now), literal(now),
+                ).where(
+                    Link.coredevice_id == coredevice_id,
+                    Link.crawler_cycle == from_count,
+                    Link.name.in_(group),
+                )
+                self.db.execute(insert(Link).from_select(
+                    [*(column.name for column in copied_columns), *neighbor_columns, "crawler_cycle", "created_at",
+                     "updated_at"],
+                    previous_links))
+                names.extend(group)
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+            return set()
+        if not names:
+            return set()
+
+        # A link may be missing from the previous cycle, e.g. if its rows were cleared since
+        copied = self.db.query(Link.name).filter(Link.coredevice_id == coredevice_id, Link.crawler_cycle == count,
+                                                 Link.name.in_(names)).all()
+        return {name for name, in copied}
+
     def update_link(self, link_id: int, link: LinkCreate, site_id: int):
         db_link = self.db.query(Link).filter(Link.id == link_id).first()
         db_site = self.db.query(Site).filter(Site.id == site_id).first()
@@ -0,0 +1,21 @@
+from crawler.config import ssh_transport_profiles
+
+# SessionSSH arguments a transport profile may set
+PROFILE_SETTINGS = ("compress", "window_size", "max_packet_size")
+
+
+def get_transport_profile(ip, coresite_id=None, profiles=None):
+    """
+    Return the SSH transport settings for a device as ``SessionSSH`` keyword arguments.
+
+    The "default" profile is applied first, then the device's coresite profile, then the
+    profile for the device's own IP, each overriding the settings of the one before.
+    """
+    if profiles is None:
+        profiles = ssh_transport_profiles
+
+    settings = {}
+    for key in ("default", f"coresite:{coresite_id}", ip):
+        settings.update(profiles.get(key, {}))
+
+    return {name: value for name, value in settings.items() if name in PROFILE_SETTINGS}
@@ -1,8 +1,17 @@
 import re
-from network.paramiko_connection_CiscoDevices import create_device
+from network.paramiko_connection_CiscoDevices import CommandError, device_session
 
+# Regular expressions to extract device information
+CDP_BLOCK_SEPARATOR = re.compile(r"-{20}")
+DEVICE_ID_PATTERN = re.compile(r"Device ID: (.*)")
+IP_ADDRESS_PATTERN = re.compile(r"IP address: (.*)")
+PLATFORM_PATTERN = re.compile(r"Platform: (.*),")
+INTERFACE_PATTERN = re.compile(r"Interface: (.*)")
+PORT_ID_PATTERN = re.compile(r"Port ID \(outgoing port\): (.*)")
+CDP_FIELD_PATTERNS = (DEVICE_ID_PATTERN, IP_ADDRESS_PATTERN, PLATFORM_PATTERN, INTERFACE_PATTERN, PORT_ID_PATTERN)
 
-def get_cdp_devices(ip, username, password):
+
+def get_cdp_devices(ip, username, password, device=None, output_cache=None):
     """
     Retrieves a list of CDP devices from a Cisco router.
 
@@ -10,70 +19,90 @@ def get_cdp_devices(ip, username, password):
     - ip (str): The IP address of the Cisco router.
     - username (str): The username to use for SSH authentication.
     - password (str): The password to use for SSH authentication.
+    - device (SessionSSH, optional): An open session to run the command on instead of creating one.
+    - output_cache (ChangeDetector, optional): Returns the previous parse result when the output is unchanged.
 
     Returns:
     - A list of dictionaries containing information about each CDP device.
     """
 
-    # Create an SSH session
-    device = create_device(ip, username, password)
-
-    # Execute the command to retrieve CDP devices
+    # Run the command, reusing the caller's session if given, and parse the output as it arrives. With an
+    # output cache the output is hashed once complete, and only parsed if it changed since the last cycle.
     command = "sh cdp n d"
-    output = device.execute_command(command)
-
-    # If the command was not executed successfully, return an empty list
-    if output is None:
-        return []
-
-    # Initialize an empty list to store the CDP devices
-    cdp_devices = []
-
-    # Regular expressions to extract device information
-    device_id_pattern = r"Device ID: (.*)"
-    ip_address_pattern = r"IP address: (.*)"
-    platform_pattern = r"Platform: (.*),"
-    interface_pattern = r"Interface: (.*)"
-    port_id_pattern = r"Port ID \(outgoing port\): (.*)"
-
-    # Split the output into blocks separated by the "-------------------------" line
-    blocks = re.split(r"-{20}", output)
-
-    # Iterate over the blocks to extract device information
-    for block in blocks:
-        device_info = {}
-
-        # Extract device ID
-        match = re.search(device_id_pattern, block)
-        if match:
-            device_info["device_id"] = match.group(1).strip()
-
-        # Extract IP address
-        matches = re.findall(ip_address_pattern, block)
-        if matches:
-            device_info["ipv4_address"] = matches[0].strip()
-
-        # Extract platform and capabilities
-        match = re.search(platform_pattern, block)
-        if match:
-            parts = match.group(1).split(", ")
-            device_info["platform"] = parts[0].strip()
-            if len(parts) > 1:
-                device_info["capabilities"] = parts[1].strip()
-
-        # Extract interface and port ID
-        match = re.search(interface_pattern, block)
-        if match:
-            device_info["interface"] = match.group(1).split(',')[0].strip()
-        match = re.search(port_id_pattern, block)
-        if match:
-            device_info["port_id"] = match.group(1).strip()
-
-        # Add the device to the list if it has a device ID
-        if "device_id" in device_info:
-            cdp_devices.append(device_info)
-
-    # Close the SSH session
-    device.close_connection()
-
-    return cdp_devices
+    with device_session(ip, username, password, device) as device:
+        try:
+            lines = device.iter_command_lines(command)
+            if output_cache is not None:
+                return output_cache.parse(ip, command, lines, lambda lines: list(iter_cdp_devices(lines)))
+            return list(iter_cdp_devices(lines))
+        except CommandError:
+            # If the command was not executed successfully, return an empty list
+            return []
+
+
+def parse_cdp_devices(output):
+    """
+    Parse the output of 'show cdp neighbors detail' into a list of CDP devices.
+
+    Args:
+    - output (str): The command output.
+
+    Returns:
+    - A list of dictionaries containing information about each CDP device.
+    """
+    return list(iter_cdp_devices(output.splitlines()))
+
+
+def _cdp_device(block):
+    """Build a CDP device from the first match of each pattern in a block, or None without a device ID."""
+    if DEVICE_ID_PATTERN not in block:
+        return None
+    device_info = {"device_id": block[DEVICE_ID_PATTERN].group(1).strip()}
+
+    # Extract IP address, the first one listed if there are several
+    if IP_ADDRESS_PATTERN in block:
+        device_info["ipv4_address"] = block[IP_ADDRESS_PATTERN].group(1).strip()
+
+    # Extract platform and capabilities
+    if PLATFORM_PATTERN in block:
+        parts = block[PLATFORM_PATTERN].group(1).split(", ")
+        device_info["platform"] = parts[0].strip()
+        if len(parts) > 1:
+            device_info["capabilities"] = parts[1].strip()
+
+    # Extract interface and port ID
+    if INTERFACE_PATTERN in block:
+        device_info["interface"] = block[INTERFACE_PATTERN].group(1).split(',')[0].strip()
+    if PORT_ID_PATTERN in block:
+        device_info["port_id"] = block[PORT_ID_PATTERN].group(1).strip()
+
+    return device_info
+
+
+def iter_cdp_devices(lines):
+    """
+    Parse 'show cdp neighbors detail' output from an iterable of lines and yield each CDP device
+    as soon as its block ends.
+
+    Blocks are separated by a "-------------------------" line. Only the first match of each
+    field in a block is kept, and a block without a device ID is skipped.
+    """
+    block = {}
+    for line in lines:
+        # A separator ends the current block; whatever follows it on the line starts the next one
+        pieces = CDP_BLOCK_SEPARATOR.split(line)
+        for index, piece in enumerate(pieces):
+            if index:
+                device_info = _cdp_device(block)
+                if device_info is not None:
+                    yield device_info
+                block = {}
+            for pattern in CDP_FIELD_PATTERNS:
+                if pattern not in block:
+                    match = pattern.search(piece)
+                    if match:
+                        block[pattern] = match
+
+    device_info = _cdp_device(block)
+    if device_info is not None:
+        yield device_info
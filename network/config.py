@@ -1,3 +1,45 @@
+import os
+
 INTERFACE_STATES = ["up", "down", "administratively down"]
 OSPF_STATES = ["full", "2-way", "exstart", "exchange", "loading", "down"]
-MPLS_STATES = ["up", "down", "not connected"]
\ No newline at end of file
+MPLS_STATES = ["up", "down", "not connected"]
+
+# Port that device SSH sessions connect to
+SSH_PORT = int(os.getenv("SSH_PORT", 22))
+
+# SSH connection pool: keepalive interval and maximum idle age in seconds, and sessions allowed per device
+SSH_KEEPALIVE_INTERVAL = int(os.getenv("SSH_KEEPALIVE_INTERVAL", 30))
+SSH_POOL_MAX_IDLE = int(os.getenv("SSH_POOL_MAX_IDLE", 900))
+SSH_POOL_MAX_PER_HOST = int(os.getenv("SSH_POOL_MAX_PER_HOST", 2))
+
+# SSH timeouts in seconds: TCP connect, SSH banner, authentication, and inactivity while reading command output
+SSH_CONNECT_TIMEOUT = int(os.getenv("SSH_CONNECT_TIMEOUT", 10))
+SSH_BANNER_TIMEOUT = int(os.getenv("SSH_BANNER_TIMEOUT", 15))
+SSH_AUTH_TIMEOUT = int(os.getenv("SSH_AUTH_TIMEOUT", 15))
+SSH_COMMAND_TIMEOUT = int(os.getenv("SSH_COMMAND_TIMEOUT", 120))
+
+# Channels a single SSH session may have open at once, with per-device overrides for platforms
+# that limit concurrent sessions, given as "ip=limit,ip=limit"
+SSH_MAX_CHANNELS = int(os.getenv("SSH_MAX_CHANNELS", 5))
+SSH_MAX_CHANNELS_OVERRIDES = {
+    ip.strip(): int(limit)
+    for ip, limit in (item.split("=") for item in os.getenv("SSH_MAX_CHANNELS_OVERRIDES", "").split(",") if item.strip())
+}
+
+# Jump host that device SSH connections are tunnelled through; leave SSH_JUMP_HOST empty to connect directly
+SSH_JUMP_HOST = os.getenv("SSH_JUMP_HOST", "")
+SSH_JUMP_PORT = int(os.getenv("SSH_JUMP_PORT", 22))
+SSH_JUMP_USERNAME = os.getenv("SSH_JUMP_USERNAME", "")
+SSH_JUMP_PASSWORD = os.getenv("SSH_JUMP_PASSWORD", "")
+
+# Command output recording and replay. When SSH_RECORD_DIR is set, every command's raw output is archived
+# there; when SSH_REPLAY_DIR is set, devices are served from such an archive instead of over SSH, with
+# SSH_REPLAY_LATENCY seconds of simulated delay per command and SSH_REPLAY_CYCLE choosing the recorded
+# cycle (the latest one when unset)
+SSH_RECORD_DIR = os.getenv("SSH_RECORD_DIR", "")
+SSH_REPLAY_DIR = os.getenv("SSH_REPLAY_DIR", "")
+SSH_REPLAY_LATENCY = float(os.getenv("SSH_REPLAY_LATENCY", 0))
+SSH_REPLAY_CYCLE = int(os.getenv("SSH_REPLAY_CYCLE")) if os.getenv("SSH_REPLAY_CYCLE") else None
+
+# Print payload and on-the-wire byte counts for every command, to tune transport profiles
+SSH_LOG_TRANSFER_STATS = os.getenv("SSH_LOG_TRANSFER_STATS", "").lower() in ("1", "true", "yes")
@@ -1,101 +1,119 @@
 import re
-from network.paramiko_connection_CiscoDevices import create_device
+from network.paramiko_connection_CiscoDevices import device_session
 
-def get_show_optics_output(ip, username, password):
-    """Get the 'show controllers optics' command output from the network device."""
-    connection = create_device(ip, username, password)
-    output = connection.execute_command("show controllers optics *")
+def get_show_optics_output(ip, username, password, device=None):
+    """Get the 'show controllers optics' command output from the network device, reusing ``device`` if given."""
+    with device_session(ip, username, password, device) as connection:
+        output = connection.execute_command("show controllers optics *")
     return output
 
-def parse_show_optics_output(output):
-    """Parse the 'show controllers optics' command output and extract relevant data."""
-    data = {}
-    lines = output.splitlines()
-    current_port = None
+def get_show_optics_data(ip, username, password, location=None, device=None, port=None):
+    """
+    Run 'show controllers optics *', or 'show controllers optics <location>' for a single port
+    (e.g. '0/0/0/1', parsed as ``port``), and parse the output as it streams in. Raises
+    ``CommandError`` if the command fails.
+    """
+    command = f"show controllers optics {location}" if location else "show controllers optics *"
+    with device_session(ip, username, password, device) as connection:
+        return dict(iter_show_optics_records(connection.iter_command_lines(command), port=port))
+
+# Precompiled patterns for 'show controllers optics', each only tried on lines containing its literal text,
+# and the type of the value they capture: measurements are kept as floats
+OPTICS_PORT_PATTERN = re.compile(r"Port:.*Optics(\d+)_(\d+)_(\d+)_(\d+)")
+OPTICS_FIELDS = [
+    ("Controller State: ", 'controller_state', re.compile(r"Controller State: (Up|Down)"), str),
+    ("Transport Admin State: ", 'transport_admin_state',
+     re.compile(r"Transport Admin State: (In Service|Out of Service)"), str),
+    ("Laser State: ", 'laser_state', re.compile(r"Laser State: (On|Off)"), str),
+    ("LED State: ", 'led_state', re.compile(r"LED State: (Green|Red|Yellow)"), str),
+    ("Optics Type: ", 'optics_type', re.compile(r"Optics Type: (.*)"), str),
+    ("Wavelength = ", 'wavelength', re.compile(r"Wavelength = (\d+\.\d+) nm"), float),
+    ("Detected Alarms: ", 'detected_alarms', re.compile(r"Detected Alarms: (None|.*$)"), str),
+    ("Laser Bias Current = ", 'laser_bias_current', re.compile(r"Laser Bias Current = (\d+\.\d+) mA"), float),
+    ("Actual TX Power = ", 'actual_tx_power', re.compile(r"Actual TX Power = (-?\d+\.\d+) dBm"), float),
+    ("RX Power = ", 'rx_power', re.compile(r"RX Power = (-?\d+\.\d+) dBm"), float),
+    ("Temperature = ", 'temperature', re.compile(r"Temperature = (\d+\.\d+) Celsius"), float),
+    ("Voltage = ", 'voltage', re.compile(r"Voltage = (\d+\.\d+) V"), float),
+]
+THRESHOLD_HEADER_PATTERN = re.compile(r"Parameter.*High Alarm.*Low Alarm.*High Warning.*Low Warning")
+THRESHOLD_ROW_PATTERN = re.compile(r"(.*)\s+(\d+\.\d+)\s+(\d+\.\d+)\s+(\d+\.\d+)\s+(\d+\.\d+)")
+VENDOR_DETAILS_PATTERN = re.compile(r"Form Factor.*: (.*)")
+VENDOR_DETAIL_PATTERN = re.compile(r"(.*)\s*:\s*(.*)")
+# The row patterns start with a greedy (.*), so they are matched from the start of the line: that finds the
+# same groups as searching, without retrying from every position on lines that do not match
+
+# Number of lines after the table header and after 'Form Factor' read as threshold rows and vendor details
+THRESHOLD_ROWS = 5
+VENDOR_DETAIL_ROWS = 10
+
+
+def parse_show_optics_output(output, port=None):
+    """
+    Parse the 'show controllers optics' command output and extract relevant data.
+
+    ``port`` names the port for output of a single port that has no 'Port:' line of its own.
+    """
+    return dict(iter_show_optics_records(output.splitlines(), port=port))
+
+
+def iter_show_optics_records(lines, port=None):
+    """
+    Parse 'show controllers optics' output from an iterable of lines and yield ``(port, data)``
+    for each port as soon as the next one starts.
+
+    The output is walked once as a state machine: a 'Port:' line starts a port, the threshold
+    table header and 'Form Factor' open a section that reads the following rows, and every line
+    is also checked for the single-line fields, running only the patterns whose literal text it
+    contains. A new 'Port:' line closes any open section.
+    """
+    port_names = set()
+    current_port = port
+    record = None
+    if port:
+        port_names.add(port)
+        record = {}
+    section = None
+    section_rows = 0
     for line in lines:
-        if re.search(r"Port:.*Optics\d+_\d+_\d+_\d+", line):
-            match = re.search(r"Port:.*Optics(\d+)_(\d+)_(\d+)_(\d+)", line)
-            if match:
-                port_number = f"Optics{match.group(1)}_{match.group(2)}_{match.group(3)}_{match.group(4)}"
-                if port_number not in data:
-                    data[port_number] = {}
-                    current_port = port_number
-        if re.search(r"Controller State: (Up|Down)", line):
-            match = re.search(r"Controller State: (Up|Down)", line)
-            if match:
-                data[current_port]['controller_state'] = match.group(1)
-        if re.search(r"Transport Admin State: (In Service|Out of Service)", line):
-            match = re.search(r"Transport Admin State: (In Service|Out of Service)", line)
-            if match:
-                data[current_port]['transport_admin_state'] = match.group(1)
-        if re.search(r"Laser State: (On|Off)", line):
-            match = re.search(r"Laser State: (On|Off)", line)
-            if match:
-                data[current_port]['laser_state'] = match.group(1)
-        if re.search(r"LED State: (Green|Red|Yellow)", line):
-            match = re.search(r"LED State: (Green|Red|Yellow)", line)
-            if match:
-                data[current_port]['led_state'] = match.group(1)
-        if re.search(r"Optics Type: (.*)", line):
-            match = re.search(r"Optics Type: (.*)", line)
-            if match:
-                data[current_port]['optics_type'] = match.group(1)
-        if re.search(r"Wavelength = (\d+\.\d+) nm", line):
-            match = re.search(r"Wavelength = (\d+\.\d+) nm", line)
-            if match:
-                data[current_port]['wavelength'] = match.group(1)
-        if re.search(r"Detected Alarms: (None|.*$)", line):
-            match = re.search(r"Detected Alarms: (None|.*$)", line)
-            if match:
-                data[current_port]['detected_alarms'] = match.group(1)
-        if re.search(r"Laser Bias Current = (\d+\.\d+) mA", line):
-            match = re.search(r"Laser Bias Current = (\d+\.\d+) mA", line)
-            if match:
-                data[current_port]['laser_bias_current'] = match.group(1)
-        if re.search(r"Actual TX Power = (-?\d+\.\d+) dBm", line):
-            match = re.search(r"Actual TX Power = (-?\d+\.\d+) dBm", line)
-            if match:
-                data[current_port]['actual_tx_power'] = match.group(1)
-        if re.search(r"RX Power = (-?\d+\.\d+) dBm", line):
-            match = re.search(r"RX Power = (-?\d+\.\d+) dBm", line)
-            if match:
-                data[current_port]['rx_power'] = match.group(1)
-        if re.search(r"Parameter.*High Alarm.*Low Alarm.*High Warning.*Low Warning", line):
-            # Start parsing threshold values
-            threshold_values = {}
-            for i in range(5):
-                line = lines[lines.index(line) + i + 1]
-                match = re.search(r"(.*)\s+(\d+\.\d+)\s+(\d+\.\d+)\s+(\d+\.\d+)\s+(\d+\.\d+)", line)
+        match = OPTICS_PORT_PATTERN.search(line) if "Port:" in line else None
+        if match:
+            port_number = f"Optics{match.group(1)}_{match.group(2)}_{match.group(3)}_{match.group(4)}"
+            if port_number not in port_names:
+                if record is not None:
+                    yield current_port, record
+                port_names.add(port_number)
+                current_port, record = port_number, {}
+            section = None
+
+        if section is not None:
+            if section == 'threshold_values':
+                match = THRESHOLD_ROW_PATTERN.match(line)
                 if match:
-                    parameter = match.group(1)
-                    high_alarm = match.group(2)
-                    low_alarm = match.group(3)
-                    high_warning = match.group(4)
-                    low_warning = match.group(5)
-                    threshold_values[parameter] = {
-                        'high_alarm': high_alarm,
-                        'low_alarm': low_alarm,
-                        'high_warning': high_warning,
-                        'low_warning': low_warning
+                    record[section][match.group(1)] = {
+                        'high_alarm': match.group(2),
+                        'low_alarm': match.group(3),
+                        'high_warning': match.group(4),
+                        'low_warning': match.group(5)
                     }
-            data[current_port]['threshold_values'] = threshold_values
-        if re.search(r"Temperature = (\d+\.\d+) Celsius", line):
-            match = re.search(r"Temperature = (\d+\.\d+) Celsius", line)
-            if match:
-                data[current_port]['temperature'] = match.group(1)
-        if re.search(r"Voltage = (\d+\.\d+) V", line):
-            match = re.search(r"Voltage = (\d+\.\d+) V", line)
-            if match:
-                data[current_port]['voltage'] = match.group(1)
-        if re.search(r"Form Factor.*: (.*)", line):
-            # Start parsing transceiver vendor details
-            transceiver_vendor_details = {}
-            for i in range(10):
-                line = lines[lines.index(line) + i + 1]
-                match = re.search(r"(.*)\s*:\s*(.*)", line)
+            else:
+                match = VENDOR_DETAIL_PATTERN.match(line)
                 if match:
-                    key = match.group(1)
-                    value = match.group(2)
-                    transceiver_vendor_details[key] = value
-            data[current_port]['transceiver_vendor_details'] = transceiver_vendor_details
-    return data
+                    record[section][match.group(1)] = match.group(2)
+            section_rows -= 1
+            if not section_rows:
+                section = None
+
+        for literal, key, pattern, convert in OPTICS_FIELDS:
+            if literal in line:
+                match = pattern.search(line)
+                if match:
+                    record[key] = convert(match.group(1))
+
+        if "Parameter" in line and THRESHOLD_HEADER_PATTERN.search(line):
+            section, section_rows = 'threshold_values', THRESHOLD_ROWS
+            record[section] = {}
+        elif "Form Factor" in line and VENDOR_DETAILS_PATTERN.search(line):
+            section, section_rows = 'transceiver_vendor_details', VENDOR_DETAIL_ROWS
+            record[section] = {}
+    if record is not None:
+        yield current_port, record
@@ -1,7 +1,7 @@
-from network.paramiko_connection_CiscoDevices import create_device
+from network.paramiko_connection_CiscoDevices import CommandError, device_session
 
 
-def get_interface_descriptions(ip, username, password):
+def get_interface_descriptions(ip, username, password, device=None):
     """
     Retrieves a list of interface descriptions from a Cisco router.
 
@@ -9,59 +9,83 @@ def get_interface_descriptions(ip, username, password):
     - ip (str): The IP address of the Cisco router.
     - username (str): The username to use for SSH authentication.
     - password (str): The password to use for SSH authentication.
+    - device (SessionSSH, optional): An open session to run the command on instead of creating one.
 
     Returns:
     - A list of dictionaries containing interface information, including name, status, protocol, and description.
     """
 
-    # Create an SSH session
-    device = create_device(ip, username, password)
-
-    # Execute the command to retrieve interface descriptions
+    # Run the command, reusing the caller's session if given, and parse the output as it arrives
     command = "show interface description"
-    output = device.execute_command(command)
+    with device_session(ip, username, password, device) as device:
+        try:
+            return list(iter_interface_descriptions(device.iter_command_lines(command)))
+        except CommandError:
+            # If the command was not executed successfully, return an empty list
+            return []
 
-    # If the command was not executed successfully, return an empty list
-    if output is None:
-        return []
 
-    # Initialize an empty list to store the interface descriptions
-    interfaces = []
+def parse_interface_descriptions(output):
+    """
+    Parse the output of 'show interface description' into a list of interface descriptions.
 
-    # Split the output into lines
-    lines = output.splitlines()
+    Args:
+    - output (str): The command output.
 
-    # Skip the header lines
-    start_idx = 0
-    for i, line in enumerate(lines):
-        if "Interface" in line:
-            start_idx = i + 1
-            break
+    Returns:
+    - A list of dictionaries containing interface information, including name, status, protocol, and description.
+    """
+    return list(iter_interface_descriptions(output.splitlines()))
 
-    # Iterate over the lines to extract interface information
-    for line in lines[start_idx:]:
-        # Ignore blank lines
-        if not line.strip():
-            continue
 
-        # Split the line into columns
-        columns = line.split()
+def _interface_description(line):
+    # Split the line into columns
+    columns = line.split()
 
-        if len(columns) < 4:
-            continue
+    if len(columns) < 4:
+        return None
 
-        # Create a dictionary to store the interface information
-        interface = {
-            "interface": columns[0],
-            "status": columns[1],
-            "protocol": columns[2],
-            "description": " ".join(columns[3:])
-        }
+    # Create a dictionary to store the interface information
+    return {
+        "interface": columns[0],
+        "status": columns[1],
+        "protocol": columns[2],
+        "description": " ".join(columns[3:])
+    }
 
-        # Add the interface to the list
-        interfaces.append(interface)
 
-    # Close the SSH session
-    device.close_connection()
+def iter_interface_descriptions(lines):
+    """
+    Parse 'show interface description' output from an iterable of lines and yield each interface
+    as its line arrives.
+
+    Lines up to the "Interface" header are skipped. They are held back until the header shows
+    up, since output without a header is parsed from its first line.
+    """
+    header_lines = []
+    in_table = False
+
+    for line in lines:
+        if not in_table:
+            # Skip the header lines
+            if "Interface" in line:
+                in_table = True
+                header_lines = []
+            else:
+                header_lines.append(line)
+            continue
+
+        # Ignore blank lines
+        if not line.strip():
+            continue
+
+        interface = _interface_description(line)
+        if interface is not None:
+            yield interface
 
-    return interfaces
+    # Without a header line, every line is an interface line
+    for line in header_lines:
+        if line.strip():
+            interface = _interface_description(line)
+            if interface is not None:
+                yield interface
@@ -1,82 +1,160 @@
 import re
-from network.paramiko_connection_CiscoDevices import create_device
+from network.paramiko_connection_CiscoDevices import device_session
+from network.records import InterfaceRecord
 
 
-def get_show_int_output(ip, username, password):
-    """Get the 'show int' command output from the network device."""
-    connection = create_device(ip, username, password)
-    output = connection.execute_command("show int")
+def get_show_int_output(ip, username, password, device=None):
+    """Get the 'show int' command output from the network device, reusing ``device`` if given."""
+    with device_session(ip, username, password, device) as connection:
+        output = connection.execute_command("show int")
     return output
 
+def get_show_int_data(ip, username, password, interface=None, device=None):
+    """
+    Run 'show int', or 'show interface <interface>' for a single interface, and parse the output
+    as it streams in into a dict of ``InterfaceRecord`` by name. Raises ``CommandError`` if the
+    command fails.
+    """
+    command = f"show interface {interface}" if interface else "show int"
+    with device_session(ip, username, password, device) as connection:
+        return dict(iter_show_int_records(connection.iter_command_lines(command)))
+
+# Precompiled patterns for 'show int', each only tried on lines containing its literal text
+INTERFACE_STATUS_PATTERN = re.compile(r"is (up|down|administratively down)")
+INTERFACE_HEADER_PATTERN = re.compile(r" " + INTERFACE_STATUS_PATTERN.pattern)
+PROTOCOL_STATUS_PATTERN = re.compile(r"line protocol is (up|down|administratively down)")
+MEDIA_TYPE_PATTERN = re.compile(r"media type is (.*),")
+INTERNET_ADDRESS_PATTERN = re.compile(r"internet address is ((?:\d{1,3}\.){3}\d{1,3})", re.IGNORECASE)
+DESCRIPTION_PATTERN = re.compile(r"Description: (.*)")
+MTU_PATTERN = re.compile(r"MTU (\d+) bytes")
+BW_PATTERN = re.compile(r"BW (\d+) Kbit")
+RATE_PATTERN = re.compile(r"(?:30 second|5 minute) (input|output) rate (\d+) bits/sec, (?:\d+) packets/sec")
+INPUT_ERRORS_PATTERN = re.compile(r"(\d+) input errors")
+OUTPUT_ERRORS_PATTERN = re.compile(r"(\d+) output errors")
+CRC_PATTERN = re.compile(r"(\d+) CRC")
+# Lines that may be interface headers, for splitting large outputs into chunks
+HEADER_LINE_PATTERN = re.compile(r"^.*" + INTERFACE_HEADER_PATTERN.pattern, re.MULTILINE)
+
+
 def parse_show_int_output(output):
     """Parse the 'show int' command output and extract relevant data."""
-    data = {}
-    lines = output.splitlines()
+    return dict(iter_show_int_records(output.splitlines()))
+
+
+def split_show_int_output(output, chunk_size):
+    """
+    Split 'show int' output into chunks of about ``chunk_size`` characters that each start at an
+    interface header, so they can be parsed separately with ``parse_show_int_chunk`` and put
+    back together with ``merge_show_int_chunks``.
+    """
+    chunks = []
+    start = 0
+    position = chunk_size
+    while position < len(output):
+        match = HEADER_LINE_PATTERN.search(output, position)
+        if match is None:
+            break
+        # The pattern works on newline-separated lines; only split where the parser sees a header too
+        line_end = output.find("\n", match.start())
+        line = output[match.start():line_end if line_end != -1 else len(output)].splitlines()[0]
+        if not INTERFACE_HEADER_PATTERN.search(line):
+            position = match.end()
+            continue
+        chunks.append(output[start:match.start()])
+        start = match.start()
+        position = start + chunk_size
+    chunks.append(output[start:])
+    return chunks
+
+
+def parse_show_int_chunk(chunk):
+    """Parse a chunk of 'show int' output into a list of ``(interface name, InterfaceRecord)``."""
+    return list(iter_show_int_records(chunk.splitlines()))
+
+
+def merge_show_int_chunks(chunk_records):
+    """
+    Merge the records of consecutive 'show int' chunks into the dict ``parse_show_int_output``
+    gives for the whole output.
+
+    A header of an interface seen in an earlier chunk does not start a new record: like in a
+    single pass, its lines belong to the record being read at that point, so they are merged into
+    it, later values winning.
+    """
+    records = {}
     current_interface = None
-    for line in lines:
-        if re.search(r".* is (up|down|administratively down)", line):
-            interface_name = line.split()[0]
-            if interface_name not in data:
-                data[interface_name] = {}
+    for chunk in chunk_records:
+        for interface_name, record in chunk:
+            if interface_name in records:
+                records[current_interface].update(record)
+            else:
+                records[interface_name] = record
                 current_interface = interface_name
-            match = re.search(r"is (up|down|administratively down)", line)
-            if match:
-                data[current_interface]['physical_status'] = match.group(1)
-        if re.search(r"line protocol is (up|down|administratively down)", line):
-            match = re.search(r"line protocol is (up|down|administratively down)", line)
+    return records
+
+
+def iter_show_int_records(lines):
+    """
+    Parse 'show int' output from an iterable of lines and yield ``(interface name, InterfaceRecord)``
+    for each interface as soon as the next one starts.
+
+    Every line is read once: cheap substring checks pick the few fields it can hold, and only
+    their precompiled patterns are run on it.
+    """
+    interface_names = set()
+    current_interface = None
+    record = None
+    for line in lines:
+        if " is " in line:
+            if INTERFACE_HEADER_PATTERN.search(line):
+                interface_name = line.split()[0]
+                if interface_name not in interface_names:
+                    if record is not None:
+                        yield current_interface, record
+                    interface_names.add(interface_name)
+                    current_interface, record = interface_name, InterfaceRecord(interface_name)
+                record.physical_status = INTERFACE_STATUS_PATTERN.search(line).group(1)
+            match = PROTOCOL_STATUS_PATTERN.search(line)
             if match:
-                data[current_interface]['protocol_status'] = match.group(1)
-        if re.search(r"Description: (.*)", line):
-            match = re.search(r"Description: (.*)", line)
+                record.protocol_status = match.group(1)
+            match = INTERNET_ADDRESS_PATTERN.search(line)
             if match:
-                data[current_interface]['description'] = match.group(1)
-        if re.search(r"Full-duplex", line):
+                record.interface_ip = match.group(1)
+        if "Description: " in line:
+            record.description = DESCRIPTION_PATTERN.search(line).group(1)
+        if "Full-duplex" in line:
             words = line.split(', ')
             if len(words) > 3:
-                data[current_interface]['media_type'] = words[2]
-        if re.search(r"media type is (.*),", line):
-            match = re.search(r"media type is (.*),", line)
+                record.media_type = words[2]
+        if "media type is " in line:
+            # Checked after Full-duplex so that an explicit media type on the same line wins
+            match = MEDIA_TYPE_PATTERN.search(line)
             if match:
-                data[current_interface]['media_type'] = match.group(1)
-        if re.search(r"MTU (\d+) bytes", line):
-            match = re.search(r"MTU (\d+) bytes", line)
+                record.media_type = match.group(1)
+        if "MTU " in line:
+            match = MTU_PATTERN.search(line)
             if match:
-                data[current_interface]['mtu'] = match.group(1)
-        if re.search(r"BW (\d+) Kbit", line):
-            match = re.search(r"BW (\d+) Kbit", line)
+                record.mtu = int(match.group(1))
+        if "BW " in line:
+            match = BW_PATTERN.search(line)
             if match:
-                data[current_interface]['bw'] = match.group(1)
-        if re.search(r"30 second input rate", line):
-            match = re.search(r"30 second input rate (\d+) bits/sec, (\d+) packets/sec", line)
+                record.bw = int(match.group(1))
+        if " rate " in line:
+            for match in RATE_PATTERN.finditer(line):
+                if match.group(1) == "input":
+                    record.input_rate = int(match.group(2))
+                else:
+                    record.output_rate = int(match.group(2))
+        if " errors" in line:
+            match = INPUT_ERRORS_PATTERN.search(line)
             if match:
-                data[current_interface]['input_rate'] = f"{match.group(1)}"
-        if re.search(r"30 second output rate", line):
-            match = re.search(r"30 second output rate (\d+) bits/sec, (\d+) packets/sec", line)
+                record.input_errors = int(match.group(1))
+            match = OUTPUT_ERRORS_PATTERN.search(line)
             if match:
-                data[current_interface]['output_rate'] = f"{match.group(1)}"
-        if re.search(r"5 minute input rate", line):
-            match = re.search(r"5 minute input rate (\d+) bits/sec, (\d+) packets/sec", line)
+                record.output_errors = int(match.group(1))
+        if " CRC" in line:
+            match = CRC_PATTERN.search(line)
             if match:
-                data[current_interface]['input_rate'] = f"{match.group(1)}"
-        if re.search(r"5 minute output rate", line):
-            match = re.search(r"5 minute output rate (\d+) bits/sec, (\d+) packets/sec", line)
-            if match:
-                data[current_interface]['output_rate'] = f"{match.group(1)}"
-        if re.search(r"(\d+) input errors", line):
-            match = re.search(r"(\d+) input errors", line)
-            if match:
-                data[current_interface]['input_errors'] = match.group(1)
-        if re.search(r"(\d+) output errors", line):
-            match = re.search(r"(\d+) output errors", line)
-            if match:
-                data[current_interface]['output_errors'] = match.group(1)
-        if re.search(r"(\d+) CRC", line):
-            match = re.search(r"(\d+) CRC", line)
-            if match:
-                data[current_interface]['crc'] = match.group(1)
-
-        # Added parsing for Internet address
-        match = re.search(r"internet address is ((?:\d{1,3}\.){3}\d{1,3})", line.lower())
-        if match:
-            data[current_interface]['interface_ip'] = match.group(1)
-    return data
+                record.crc = int(match.group(1))
+    if record is not None:
+        yield current_interface, record
@@ -0,0 +1,85 @@
+import re
+
+# Abbreviations IOS-XR uses in brief outputs such as "show interface description", and their full names
+INTERFACE_ABBREVIATIONS = {
+    "Gi": "GigabitEthernet",
+    "Te": "TenGigE",
+    "TF": "TwentyFiveGigE",
+    "Fo": "FortyGigE",
+    "Fi": "FiftyGigE",
+    "Hu": "HundredGigE",
+    "TH": "TwoHundredGigE",
+    "FH": "FourHundredGigE",
+    "BE": "Bundle-Ether",
+    "BV": "BVI",
+    "Lo": "Loopback",
+    "Mg": "MgmtEth",
+    "Nu": "Null",
+    "tt": "tunnel-te",
+    "ti": "tunnel-ip",
+}
+
+INTERFACE_NAME_PATTERN = re.compile(r"([A-Za-z][A-Za-z-]*?)(\d.*)")
+PHYSICAL_LOCATION_PATTERN = re.compile(r"[A-Za-z][A-Za-z-]*?(\d+(?:/\d+)+)")
+OPTICS_PORT_NAME_PATTERN = re.compile(r"Optics(\d+(?:_\d+)+)")
+
+
+def expand_interface_name(name):
+    """Return the full form of an interface name, e.g. "Te0/0/0/1.100" -> "TenGigE0/0/0/1.100"."""
+    match = INTERFACE_NAME_PATTERN.fullmatch(name)
+    if not match:
+        return name
+    prefix, rest = match.groups()
+    return INTERFACE_ABBREVIATIONS.get(prefix, prefix) + rest
+
+
+def interface_location(name):
+    """
+    Return the rack/slot/instance/port location of a physical interface, e.g. "0/0/0/1" for
+    "TenGigE0/0/0/1", or None for subinterfaces and logical interfaces such as bundles.
+    """
+    match = PHYSICAL_LOCATION_PATTERN.fullmatch(name)
+    return match.group(1) if match else None
+
+
+def canonical_interface_name(name):
+    """
+    Return the key an interface is matched on across commands, whichever form they print it in:
+    its full name, e.g. "TenGigE0/0/0/1" for " Te0/0/0/1".
+    """
+    return expand_interface_name(name.strip())
+
+
+def location_numbers(location):
+    """Return a location such as "0/0/0/1", or "0_0_0_1" as optics ports spell it, as a tuple of ints."""
+    return tuple(int(part) for part in re.split(r"[/_]", location))
+
+
+class InterfaceIndex:
+    """
+    The interfaces of one device, looked up by canonical name or by location.
+
+    Built once from the names 'show int' gives, so that joining other commands' data onto them is
+    a dict lookup however the other command spells the interface.
+    """
+
+    def __init__(self, names):
+        self.names = {}
+        self.locations = {}
+        for name in names:
+            self.names.setdefault(canonical_interface_name(name), name)
+            location = interface_location(name)
+            if location:
+                self.locations.setdefault(location_numbers(location), name)
+
+    def name(self, name):
+        """Return the 'show int' name of an interface given in any form, or its canonical name if unknown."""
+        canonical_name = canonical_interface_name(name)
+        return self.names.get(canonical_name, canonical_name)
+
+    def optics_interface(self, port):
+        """Return the name of the interface an optics port such as "Optics0_0_0_1" belongs to, or None."""
+        match = OPTICS_PORT_NAME_PATTERN.fullmatch(port)
+        if not match:
+            return None
+        return self.locations.get(location_numbers(match.group(1)))
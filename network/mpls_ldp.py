@@ -1,7 +1,7 @@
-from network.paramiko_connection_CiscoDevices import create_device
+from network.paramiko_connection_CiscoDevices import CommandError, device_session
 
 
-def get_mpls_ldp_neighbors(ip, username, password):
+def get_mpls_ldp_neighbors(ip, username, password, device=None, output_cache=None):
     """
     Retrieves a list of MPLS LDP neighbors from a Cisco router.
 
@@ -9,41 +9,85 @@ def get_mpls_ldp_neighbors(ip, username, password):
     - ip (str): The IP address of the Cisco router.
     - username (str): The username to use for SSH authentication.
     - password (str): The password to use for SSH authentication.
+    - device (SessionSSH, optional): An open session to run the command on instead of creating one.
+    - output_cache (ChangeDetector, optional): Returns the previous parse result when the output is unchanged.
 
     Returns:
     - A list of dictionaries containing information about each LDP neighbor.
     """
 
-    # Create an SSH session
-    device = create_device(ip, username, password)
-
-    # Execute the command to retrieve LDP neighbors
+    # Run the command, reusing the caller's session if given, and parse the output as it arrives. With an
+    # output cache the output is hashed once complete, and only parsed if it changed since the last cycle.
     command = "show mpls ldp neighbor"
-    output = device.execute_command(command)
+    with device_session(ip, username, password, device) as device:
+        try:
+            lines = device.iter_command_lines(command)
+            if output_cache is not None:
+                return output_cache.parse(ip, command, lines, lambda lines: list(iter_mpls_ldp_neighbors(lines)))
+            return list(iter_mpls_ldp_neighbors(lines))
+        except CommandError:
+            # If the command was not executed successfully, return an empty list
+            return []
 
-    # If the command was not executed successfully, return an empty list
-    if output is None:
-        return []
 
-    # Initialize an empty list to store the LDP neighbors
-    ldp_neighbors = []
+def parse_mpls_ldp_neighbors(output):
+    """
+    Parse the output of 'show mpls ldp neighbor' into a list of LDP neighbors.
 
-    # Split the output into lines
-    lines = output.splitlines()
+    Args:
+    - output (str): The command output.
+
+    Returns:
+    - A list of dictionaries containing information about each LDP neighbor.
+    """
+    return list(iter_mpls_ldp_neighbors(output.splitlines()))
+
+
+def iter_mpls_ldp_neighbors(lines):
+    """
+    Parse 'show mpls ldp neighbor' output from an iterable of lines and yield each LDP neighbor
+    as soon as the next one starts.
+
+    The "LDP Discovery Sources:" and "Addresses bound to this peer:" headers open a section that
+    collects the IPv4 entries listed under them, up to the "IPv6:" line.
+    """
 
     # Initialize a variable to store the current neighbor
     neighbor_info = {}
     neighbor_info["ldp_discovery_sources"] = []
     neighbor_info["addresses"] = []
 
+    # The list being collected ("ldp_discovery_sources" or "addresses") and where its section is:
+    # "header" expects the "IPv4:" line, "first" the first entry line, "entries" reads up to "IPv6:"
+    section = None
+    section_state = None
+
     # Iterate over the lines to extract neighbor information
-    i = 0
-    while i < len(lines):
+    for line in lines:
+        if section is not None:
+            if section_state == "header":
+                if "IPv4:" in line:
+                    neighbor_info[section] = line.split(":")[1].strip().split()[1:]
+                    # Discovery sources listed below an empty "IPv4: (n)" line start on the next line
+                    if section == "ldp_discovery_sources" and len(neighbor_info[section]) == 0:
+                        section_state = "first"
+                    else:
+                        section_state = "entries"
+                else:
+                    section = None
+            elif section_state == "first":
+                neighbor_info[section] = line.strip().split()
+                section_state = "entries"
+            elif "IPv6:" in line:
+                section = None
+            else:
+                neighbor_info[section].extend(line.strip().split())
+            continue
+
         # Check if the line contains neighbor information
-        line = lines[i]
         if "Peer LDP Identifier" in line:
             if neighbor_info:
-                ldp_neighbors.append(neighbor_info)
+                yield neighbor_info
                 neighbor_info = {}
                 neighbor_info["ldp_discovery_sources"] = []
                 neighbor_info["addresses"] = []
@@ -64,38 +108,10 @@ def get_mpls_ldp_neighbors(ip, username, password):
         elif "Up time:" in line:
             neighbor_info["up_time"] = line.split(":")[1].strip()
         elif "LDP Discovery Sources:" in line:
-            i += 1
-            line = lines[i]
-            if "IPv4:" in line:
-                neighbor_info["ldp_discovery_sources"] = line.split(":")[1].strip().split()[1:]
-                if len(neighbor_info["ldp_discovery_sources"]) == 0:
-                    i += 1
-                    line = lines[i]
-                    neighbor_info["ldp_discovery_sources"] = line.strip().split()
-                i += 1
-                line = lines[i]
-                while "IPv6:" not in line and i < len(lines) - 1:
-                    neighbor_info["ldp_discovery_sources"].extend(line.strip().split())
-                    i += 1
-                    line = lines[i]
+            section, section_state = "ldp_discovery_sources", "header"
         elif "Addresses bound to this peer:" in line:
-            i += 1
-            line = lines[i]
-            if "IPv4:" in line:
-                neighbor_info["addresses"] = line.split(":")[1].strip().split()[1:]
-                i += 1
-                line = lines[i]
-                while "IPv6:" not in line and i < len(lines) - 1:
-                    neighbor_info["addresses"].extend(line.strip().split())
-                    i += 1
-                    line = lines[i]
-        i += 1
-
-    # Add the last neighbor to the list
-    if neighbor_info:
-        ldp_neighbors.append(neighbor_info)
+            section, section_state = "addresses", "header"
 
-    # Close the SSH session
-    device.close_connection()
-
-    return ldp_neighbors
+    # Yield the last neighbor
+    if neighbor_info:
+        yield neighbor_info
@@ -1,8 +1,48 @@
-from network.paramiko_connection_CiscoDevices import create_device
+from network.paramiko_connection_CiscoDevices import CommandError, device_session
 import re
 
 
-def get_ospf_neighbors(ip, username, password):
+def _interface_name(value):
+    return value.split(',')[0].strip()
+
+
+IPV4_ADDRESS = r"\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}"
+
+# Start of a neighbor block
+NEIGHBOR_PATTERN = re.compile(rf"Neighbor\s+({IPV4_ADDRESS}),\s+interface\s+address\s+({IPV4_ADDRESS})")
+
+# Fields of a neighbor block as (keyword on the line, pattern, (key, conversion) per group), in the
+# order they are applied. "Options is " also matches the "LLS Options is " line.
+NEIGHBOR_FIELDS = [
+    ("In the area ", re.compile(r"In the area (.*) via interface (.*)"),
+     (("area", str), ("interface", _interface_name))),
+    ("Neighbor priority is ", re.compile(r"Neighbor priority is (\d+), State is (\w+), (\d+) state changes"),
+     (("priority", int), ("state", str), ("state_changes", int))),
+    ("DR is ", re.compile(rf"DR is ({IPV4_ADDRESS}) BDR is ({IPV4_ADDRESS})"), (("DR", str), ("BDR", str))),
+    ("Options is ", re.compile(r"Options is (0x[0-9a-fA-F]+)"), (("options", str),)),
+    ("LLS Options is ", re.compile(r"LLS Options is (0x[0-9a-fA-F]+) \((\w+)\)"),
+     (("LLS_options", str), ("LLS_options_mode", str))),
+    ("Dead timer due in ", re.compile(r"Dead timer due in (\d{2}:\d{2}:\d{2})"), (("dead_timer", str),)),
+    ("Neighbor is up for ", re.compile(r"Neighbor is up for (.+)"), (("uptime", str),)),
+    ("Number of DBD retrans ", re.compile(r"Number of DBD retrans during last exchange (\d+)"),
+     (("DBD_retrans", int),)),
+    ("Index ", re.compile(r"Index (\d+)/(\d+), retransmission queue length (\d+), number of retransmission (\d+)"),
+     (("index", int), ("index_total", int), ("retrans_queue_length", int), ("number_retrans", int))),
+    ("First ", re.compile(r"First (\d+)\(\d+\)/(\d+)\(\d+\) Next (\d+)\(\d+\)/(\d+)\(\d+\)"),
+     (("first", int), ("first_total", int), ("next", int), ("next_total", int))),
+    ("Last retransmission scan length ", re.compile(r"Last retransmission scan length (\d+), maximum is (\d+)"),
+     (("last_retransmission_scan_length", int), ("last_retransmission_scan_length_max", int))),
+    ("Last retransmission scan time is ",
+     re.compile(r"Last retransmission scan time is (\d+) msec, maximum is (\d+) msec"),
+     (("last_retransmission_scan_time", int), ("last_retransmission_scan_time_max", int))),
+    ("LS Ack list: ", re.compile(r"LS Ack list: NSR-sync pending (\d+), high water mark (\d+)"),
+     (("LS_Ack_pending", int), ("LS_Ack_high_water_mark", int))),
+    ("Neighbor BFD status: ", re.compile(r"Neighbor BFD status: (\w+)"), (("BFD_status", str),)),
+    ("Neighbor Interface ID: ", re.compile(r"Neighbor Interface ID: (\d+)"), (("neighbor_interface_id", int),)),
+]
+
+
+def get_ospf_neighbors(ip, username, password, device=None, output_cache=None):
     """
     Retrieves a list of OSPF neighbors from a Cisco router.
 
@@ -10,27 +50,46 @@ def get_ospf_neighbors(ip, username, password):
     - ip (str): The IP address of the Cisco router.
     - username (str): The username to use for SSH authentication.
     - password (str): The password to use for SSH authentication.
+    - device (SessionSSH, optional): An open session to run the command on instead of creating one.
+    - output_cache (ChangeDetector, optional): Returns the previous parse result when the output is unchanged.
 
     Returns:
     - A list of dictionaries containing information about each OSPF neighbor.
     """
 
-    # Create an SSH session
-    device = create_device(ip, username, password)
-
-    # Execute the command to retrieve OSPF neighbors
+    # Run the command, reusing the caller's session if given, and parse the output as it arrives. With an
+    # output cache the output is hashed once complete, and only parsed if it changed since the last cycle.
     command = "show ip ospf nei det"
-    output = device.execute_command(command)
+    with device_session(ip, username, password, device) as device:
+        try:
+            lines = device.iter_command_lines(command)
+            if output_cache is not None:
+                return output_cache.parse(ip, command, lines, lambda lines: list(iter_ospf_neighbors(lines)))
+            return list(iter_ospf_neighbors(lines))
+        except CommandError:
+            # If the command was not executed successfully, return an empty list
+            return []
 
-    # If the command was not executed successfully, return an empty list
-    if output is None:
-        return []
 
-    # Initialize an empty list to store the OSPF neighbors
-    ospf_neighbors = []
+def parse_ospf_neighbors(output):
+    """
+    Parse the output of 'show ip ospf neighbor detail' into a list of OSPF neighbors.
 
-    # Split the output into lines
-    lines = output.splitlines()
+    Args:
+    - output (str): The command output.
+
+    Returns:
+    - A list of dictionaries containing information about each OSPF neighbor.
+    """
+
+    return list(iter_ospf_neighbors(output.splitlines()))
+
+
+def iter_ospf_neighbors(lines):
+    """
+    Parse 'show ip ospf neighbor detail' output from an iterable of lines and yield each OSPF
+    neighbor as soon as the next one starts.
+    """
 
     # Initialize a dictionary to store the current neighbor's information
     neighbor_info = {}
@@ -40,96 +99,23 @@ def get_ospf_neighbors(ip, username, password):
         line = line.strip()
 
         # Check if the line contains the start of a neighbor block
-        match = re.search(
-            r"Neighbor\s+(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}),\s+interface\s+address\s+(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})",
-            line)
+        match = NEIGHBOR_PATTERN.search(line) if "Neighbor" in line else None
         if match:
             if neighbor_info:
-                ospf_neighbors.append(neighbor_info)
+                yield neighbor_info
                 neighbor_info = {}
             neighbor_info["neighbor_id"] = match.group(1)
             neighbor_info["interface_address"] = match.group(2)
             in_neighbor_block = True
         elif in_neighbor_block:
-            # Check if the line contains the interface information
-            match = re.search(r"In the area (.*) via interface (.*)", line)
-            if match:
-                neighbor_info["area"] = match.group(1)
-                interface_name = match.group(2).split(',')[0].strip()
-                neighbor_info["interface"] = interface_name
-            # Check if the line contains the neighbor priority information
-            match = re.search(r"Neighbor priority is (\d+), State is (\w+), (\d+) state changes", line)
-            if match:
-                neighbor_info["priority"] = int(match.group(1))
-                neighbor_info["state"] = match.group(2)
-                neighbor_info["state_changes"] = int(match.group(3))
-            # Check if the line contains the DR and BDR information
-            match = re.search(r"DR is (\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}) BDR is (\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})", line)
-            if match:
-                neighbor_info["DR"] = match.group(1)
-                neighbor_info["BDR"] = match.group(2)
-            # Check if the line contains the options information
-            match = re.search(r"Options is (0x[0-9a-fA-F]+)", line)
-            if match:
-                neighbor_info["options"] = match.group(1)
-            match = re.search(r"LLS Options is (0x[0-9a-fA-F]+) \((\w+)\)", line)
-            if match:
-                neighbor_info["LLS_options"] = match.group(1)
-                neighbor_info["LLS_options_mode"] = match.group(2)
-            # Check if the line contains the dead timer information
-            match = re.search(r"Dead timer due in (\d{2}:\d{2}:\d{2})", line)
-            if match:
-                neighbor_info["dead_timer"] = match.group(1)
-            # Check if the line contains the uptime information
-            match = re.search(r"Neighbor is up for (.+)", line)
-            if match:
-                neighbor_info["uptime"] = match.group(1)
-            # Check if the line contains the DBD retrans information
-            match = re.search(r"Number of DBD retrans during last exchange (\d+)", line)
-            if match:
-                neighbor_info["DBD_retrans"] = int(match.group(1))
-            # Check if the line contains the index and retrans queue length information
-            match = re.search(r"Index (\d+)/(\d+), retransmission queue length (\d+), number of retransmission (\d+)", line)
-            if match:
-                neighbor_info["index"] = int(match.group(1))
-                neighbor_info["index_total"] = int(match.group(2))
-                neighbor_info["retrans_queue_length"] = int(match.group(3))
-                neighbor_info["number_retrans"] = int(match.group(4))
-            # Check if the line contains the first and next information
-            match = re.search(r"First (\d+)\(\d+\)/(\d+)\(\d+\) Next (\d+)\(\d+\)/(\d+)\(\d+\)", line)
-            if match:
-                neighbor_info["first"] = int(match.group(1))
-                neighbor_info["first_total"] = int(match.group(2))
-                neighbor_info["next"] = int(match.group(3))
-                neighbor_info["next_total"] = int(match.group(4))
-            # Check if the line contains the last retransmission scan information
-            match = re.search(r"Last retransmission scan length (\d+), maximum is (\d+)", line)
-            if match:
-                neighbor_info["last_retransmission_scan_length"] = int(match.group(1))
-                neighbor_info["last_retransmission_scan_length_max"] = int(match.group(2))
-            match = re.search(r"Last retransmission scan time is (\d+) msec, maximum is (\d+) msec", line)
-            if match:
-                neighbor_info["last_retransmission_scan_time"] = int(match.group(1))
-                neighbor_info["last_retransmission_scan_time_max"] = int(match.group(2))
-            # Check if the line contains the LS Ack list information
-            match = re.search(r"LS Ack list: NSR-sync pending (\d+), high water mark (\d+)", line)
-            if match:
-                neighbor_info["LS_Ack_pending"] = int(match.group(1))
-                neighbor_info["LS_Ack_high_water_mark"] = int(match.group(2))
-            # Check if the line contains the BFD status information
-            match = re.search(r"Neighbor BFD status: (\w+)", line)
-            if match:
-                neighbor_info["BFD_status"] = match.group(1)
-            # Check if the line contains the neighbor interface ID information
-            match = re.search(r"Neighbor Interface ID: (\d+)", line)
-            if match:
-                neighbor_info["neighbor_interface_id"] = int(match.group(1))
-
-    # Add the last neighbor to the list
-    if neighbor_info:
-        ospf_neighbors.append(neighbor_info)
+            # Only the patterns whose keyword is on the line are run; a line can carry several fields
+            for keyword, pattern, fields in NEIGHBOR_FIELDS:
+                if keyword in line:
+                    match = pattern.search(line)
+                    if match:
+                        for (key, convert), value in zip(fields, match.groups()):
+                            neighbor_info[key] = convert(value)
 
-    # Close the SSH session
-    device.close_connection()
-
-    return ospf_neighbors
+    # Yield the last neighbor
+    if neighbor_info:
+        yield neighbor_info
@@ -1,15 +1,117 @@
+import codecs
+import socket
+import threading
 import time
+from contextlib import contextmanager
+
 import paramiko
 
+from network.config import SSH_AUTH_TIMEOUT, SSH_BANNER_TIMEOUT, SSH_COMMAND_TIMEOUT, SSH_CONNECT_TIMEOUT, \
+    SSH_MAX_CHANNELS, SSH_MAX_CHANNELS_OVERRIDES, SSH_JUMP_HOST, SSH_JUMP_PORT, SSH_JUMP_USERNAME, \
+    SSH_JUMP_PASSWORD, SSH_KEEPALIVE_INTERVAL, SSH_REPLAY_DIR, SSH_REPLAY_LATENCY, SSH_REPLAY_CYCLE, SSH_PORT, \
+    SSH_LOG_TRANSFER_STATS
+from network.recording import CommandArchive, get_recorder
+
 AuthenticationException = paramiko.AuthenticationException
 
+# Maximum number of bytes read from a channel per recv call
+RECV_BUFFER_SIZE = 65536
+
+# The characters str.splitlines() breaks lines at
+LINE_BREAKS = "\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+
+
+class CommandError(Exception):
+    """A command failed to run or its output could not be read."""
+
+
+# Errors of the connection to a device: refused, unreachable or timed out sockets, and SSH failures
+CONNECTION_ERRORS = (OSError, EOFError, paramiko.SSHException)
+
+
+def is_connection_error(error):
+    """
+    Return True if ``error`` means the device could not be reached or stopped answering, rather
+    than a failure on our side such as a parser bug. A ``CommandError`` is judged by its cause.
+    """
+    while isinstance(error, CommandError) and error.__cause__ is not None:
+        error = error.__cause__
+    return isinstance(error, CONNECTION_ERRORS)
+
+
+def iter_lines(chunks, encoding="utf-8"):
+    """
+    Decode byte ``chunks`` incrementally and yield the text's lines, without line breaks, as
+    ``str.splitlines()`` would split the whole decoded text.
+
+    Only the unfinished last line is held between chunks, and characters split across chunks
+    are reassembled by the incremental decoder.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pending = ""
+    for chunk in chunks:
+        pending += decoder.decode(chunk)
+        lines = pending.splitlines(keepends=True)
+        # The last line may continue in the next chunk; a trailing "\r" may be the start of "\r\n"
+        pending = lines.pop() if lines and (lines[-1][-1] not in LINE_BREAKS or lines[-1][-1] == "\r") else ""
+        for line in lines:
+            yield line.rstrip(LINE_BREAKS)
+    pending += decoder.decode(b"", final=True)
+    yield from pending.splitlines()
+
+
+class CountingSocket:
+    """Wraps the socket (or tunnel channel) under an SSH transport and counts the bytes it carries."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def __getattr__(self, name):
+        return getattr(self.sock, name)
+
+    def send(self, data):
+        sent = self.sock.send(data)
+        self.bytes_sent += sent
+        return sent
+
+    def recv(self, size):
+        data = self.sock.recv(size)
+        self.bytes_received += len(data)
+        return data
+
 
 class SessionSSH:
-    def __init__(self, hostname, username, password, port=22, immediately_connect=True):
+    def __init__(self, hostname, username, password, port=SSH_PORT, immediately_connect=True, keepalive_interval=0,
+                 timeout=SSH_CONNECT_TIMEOUT, banner_timeout=SSH_BANNER_TIMEOUT, auth_timeout=SSH_AUTH_TIMEOUT,
+                 command_timeout=SSH_COMMAND_TIMEOUT, max_channels=None, bastion=None,
+                 command_limiter=None, compress=False, window_size=None, max_packet_size=None,
+                 log_transfer_stats=SSH_LOG_TRANSFER_STATS):
         self.hostname = hostname
         self.username = username
         self.password = password
         self.port = port
+        self.keepalive_interval = keepalive_interval
+        self.timeout = timeout
+        self.banner_timeout = banner_timeout
+        self.auth_timeout = auth_timeout
+        self.command_timeout = command_timeout
+        self.max_channels = max_channels or SSH_MAX_CHANNELS_OVERRIDES.get(hostname, SSH_MAX_CHANNELS)
+        self.bastion = bastion
+        self.command_limiter = command_limiter
+        self.compress = compress
+        self.window_size = window_size
+        self.max_packet_size = max_packet_size
+        self.log_transfer_stats = log_transfer_stats
+
+        # Bytes carried by the current transport, and the last transfer of each command
+        self.sock = None
+        self.command_stats = {}
+
+        # Commands may run concurrently from several threads, each on its own channel
+        self._channel_slots = threading.BoundedSemaphore(self.max_channels)
+        self._connect_lock = threading.Lock()
 
         self.ssh_client = None
         if immediately_connect:
@@ -18,24 +120,143 @@ class SessionSSH:
     def __repr__(self):
         return f"SessionSSH object for: {self.hostname}"
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close_connection()
+
     def connect(self):
         self.ssh_client = paramiko.SSHClient()
         self.ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
 
-        self.ssh_client.connect(self.hostname, self.port, self.username, self.password)
+        # Tunnel through the jump host's transport instead of opening a TCP connection of our own
+        if self.bastion is not None:
+            sock = self.bastion.open_channel(self.hostname, self.port, self.timeout)
+        else:
+            sock = socket.create_connection((self.hostname, self.port), timeout=self.timeout)
+        self.sock = CountingSocket(sock)
 
-    def execute_command(self, command):
-        if not self.ssh_client or not self.ssh_client.get_transport().is_active():
-            self.connect()
+        self.ssh_client.connect(self.hostname, self.port, self.username, self.password, timeout=self.timeout,
+                                banner_timeout=self.banner_timeout, auth_timeout=self.auth_timeout, sock=self.sock,
+                                compress=self.compress)
+
+        if self.keepalive_interval:
+            self.ssh_client.get_transport().set_keepalive(self.keepalive_interval)
+
+    def is_active(self):
+        """Return True if the session has a live, authenticated transport."""
+        if not self.ssh_client:
+            return False
+        transport = self.ssh_client.get_transport()
+        return transport is not None and transport.is_active() and transport.is_authenticated()
+
+    def iter_command_chunks(self, command):
+        """
+        Run ``command`` on a new channel and yield its raw output in chunks as they arrive.
+
+        ``recv`` blocks until the device sends data and returns an empty chunk once the
+        channel reaches EOF, so the output is drained completely without polling. A device
+        that stays silent for ``command_timeout`` seconds raises ``socket.timeout``. At most
+        ``max_channels`` commands run at once; further callers wait for a free channel, and
+        for a token from ``command_limiter`` if the session has one.
+        """
+        return self._iter_channel_chunks(command, lambda channel: channel.exec_command(command))
+
+    def iter_netconf_chunks(self, name, messages):
+        """
+        Open the device's NETCONF subsystem on a new channel, send ``messages`` (the client hello,
+        the RPCs and a closing close-session) and yield the raw replies in chunks as they arrive.
+
+        The device closes the channel after the close-session, so the replies are drained the
+        same way as command output. ``name`` identifies the request in transfer stats and recordings.
+        """
+        def start(channel):
+            channel.invoke_subsystem("netconf")
+            channel.sendall(messages.encode("utf-8"))
+
+        return self._iter_channel_chunks(f"netconf {name}", start)
+
+    def _iter_channel_chunks(self, command, start):
+        with self._channel_slots:
+            with self._connect_lock:
+                if not self.ssh_client or not self.ssh_client.get_transport().is_active():
+                    self.connect()
+
+            if self.command_limiter is not None:
+                self.command_limiter.acquire()
+
+            channel = self.ssh_client.get_transport().open_session(window_size=self.window_size,
+                                                                   max_packet_size=self.max_packet_size,
+                                                                   timeout=self.timeout)
+            channel.settimeout(self.command_timeout)
+            # Sessions outlive crawl cycles in the connection pool, so record into the cycle running now
+            recorder = get_recorder()
+            recording = bytearray() if recorder is not None else None
+            payload_bytes = 0
+            wire_bytes_at_start = self.sock.bytes_received
+            started_at = time.monotonic()
+            try:
+                start(channel)
+
+                while True:
+                    chunk = channel.recv(RECV_BUFFER_SIZE)
+                    if not chunk:
+                        break
+                    payload_bytes += len(chunk)
+                    if recording is not None:
+                        recording += chunk
+                    yield chunk
+            finally:
+                channel.close()
+
+            self._record_transfer(command, payload_bytes, self.sock.bytes_received - wire_bytes_at_start,
+                                  time.monotonic() - started_at)
+            if recording is not None:
+                recorder.record(self.hostname, command, recording)
+
+    def _record_transfer(self, command, payload_bytes, wire_bytes, seconds):
+        """
+        Keep the byte counts of a command's transfer. Wire bytes are what the transport received
+        while the command ran, so they include other channels' traffic when commands overlap.
+        """
+        self.command_stats[command] = {"payload_bytes": payload_bytes, "wire_bytes": wire_bytes, "seconds": seconds}
+        if self.log_transfer_stats:
+            print(f"{self.hostname} '{command}': {payload_bytes} bytes of output, {wire_bytes} bytes on the wire "
+                  f"in {seconds:.2f} seconds")
+
+    def iter_command_lines(self, command):
+        """
+        Run ``command`` and yield its output line by line as it arrives, so it can be parsed while
+        the rest is still being transferred. Raises ``CommandError`` if the command fails.
+        """
+        try:
+            yield from iter_lines(self.iter_command_chunks(command))
+        except Exception as e:
+            print(f"Error executing command: {str(e)}")
+            raise CommandError(str(e)) from e
 
+    def read_command_output(self, command):
+        """
+        Run ``command`` and return its whole raw output as a ``bytearray``, without decoding it,
+        for output that is parsed elsewhere. Raises ``CommandError`` if the command fails.
+        """
         try:
-            channel = self.ssh_client.get_transport().open_session()
-            channel.exec_command(command)
+            output = bytearray()
+            for chunk in self.iter_command_chunks(command):
+                output += chunk
+            return output
+        except Exception as e:
+            print(f"Error executing command: {str(e)}")
+            raise CommandError(str(e)) from e
 
-            while not channel.exit_status_ready():
-                time.sleep(0.2)
+    def execute_command(self, command):
+        try:
+            output = bytearray()
+            for chunk in self.iter_command_chunks(command):
+                output += chunk
 
-            return channel.recv(6450000).decode('utf-8')
+            return output.decode('utf-8')
 
         except Exception as e:
             print(f"Error executing command: {str(e)}")
@@ -49,5 +270,117 @@ class SessionSSH:
             print('SSH connection is not active.')
 
 
-def create_device(ip, username, password):
-    return SessionSSH(hostname=ip, username=username, password=password)
+class ReplaySession(SessionSSH):
+    """
+    A stand-in for ``SessionSSH`` that serves recorded command output from a ``CommandArchive``.
+
+    No connection is made; each command waits ``latency`` seconds and then streams the recording
+    in ``RECV_BUFFER_SIZE`` chunks, like a device would. Commands without a recording fail the
+    same way a failed command on a live device does.
+    """
+
+    def __init__(self, hostname, username, password, archive, cycle=None, latency=0, **kwargs):
+        kwargs.pop("immediately_connect", None)
+        super().__init__(hostname, username, password, immediately_connect=False, **kwargs)
+        self.archive = archive
+        self.cycle = cycle
+        self.latency = latency
+
+    def __repr__(self):
+        return f"ReplaySession object for: {self.hostname}"
+
+    def connect(self):
+        pass
+
+    def is_active(self):
+        return True
+
+    def _iter_channel_chunks(self, command, start):
+        with self._channel_slots:
+            if self.command_limiter is not None:
+                self.command_limiter.acquire()
+            if self.latency:
+                time.sleep(self.latency)
+            yield from self.archive.iter_chunks(self.hostname, command, self.cycle, RECV_BUFFER_SIZE)
+
+    def close_connection(self):
+        pass
+
+
+class BastionTransport:
+    """
+    A single SSH connection to a jump host, shared by every device session in the process.
+
+    Each device connection is a ``direct-tcpip`` channel on this one transport, so reaching a
+    device through the jump host costs no extra handshake with the jump host itself. The
+    connection is opened lazily and re-established if it drops.
+    """
+
+    def __init__(self, hostname, username, password, port=22, keepalive_interval=SSH_KEEPALIVE_INTERVAL):
+        self.session = SessionSSH(hostname=hostname, username=username, password=password, port=port,
+                                  immediately_connect=False, keepalive_interval=keepalive_interval)
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"BastionTransport object for: {self.session.hostname}"
+
+    def open_channel(self, hostname, port, timeout=None):
+        """Open a ``direct-tcpip`` channel from the jump host to ``hostname:port``."""
+        with self._lock:
+            if not self.session.is_active():
+                self.session.connect()
+            transport = self.session.ssh_client.get_transport()
+
+        return transport.open_channel("direct-tcpip", (hostname, port), ("127.0.0.1", 0), timeout=timeout)
+
+    def close_connection(self):
+        with self._lock:
+            self.session.close_connection()
+
+
+_bastion = None
+_bastion_lock = threading.Lock()
+
+
+def get_bastion():
+    """Return the process-wide jump host transport, or None when SSH_JUMP_HOST is not configured."""
+    global _bastion
+    if not SSH_JUMP_HOST:
+        return None
+
+    with _bastion_lock:
+        if _bastion is None:
+            _bastion = BastionTransport(SSH_JUMP_HOST, SSH_JUMP_USERNAME, SSH_JUMP_PASSWORD, port=SSH_JUMP_PORT)
+        return _bastion
+
+
+def create_device(ip, username, password, **kwargs):
+    """
+    Return a session for a device: a ``ReplaySession`` when SSH_REPLAY_DIR is set, otherwise a
+    live ``SessionSSH`` that records its output when recording has been started.
+    """
+    if SSH_REPLAY_DIR:
+        return ReplaySession(ip, username, password, CommandArchive(SSH_REPLAY_DIR), cycle=SSH_REPLAY_CYCLE,
+                             latency=SSH_REPLAY_LATENCY, **kwargs)
+
+    return SessionSSH(hostname=ip, username=username, password=password, bastion=get_bastion(), **kwargs)
+
+
+@contextmanager
+def device_session(ip, username, password, device=None):
+    """
+    Yield an SSH session for a device.
+
+    If ``device`` is given it is reused as is and left open, so a caller holding one
+    session can run several commands over the same transport. Otherwise a new session
+    is created and closed when the block exits.
+    """
+    if device is not None:
+        yield device
+        return
+
+    device = create_device(ip, username, password)
+    try:
+        yield device
+    finally:
+        device.close_connection()
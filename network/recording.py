@@ -0,0 +1,99 @@
+import gzip
+import os
+import re
+import threading
+
+from network.config import SSH_RECORD_DIR
+
+
+class CommandArchive:
+    """
+    An on-disk archive of raw command output, one gzip file per device, command and cycle.
+
+    Files are laid out as ``<root>/<cycle>/<device ip>/<command>.txt.gz`` so a single cycle can
+    be copied around or pruned as a directory.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def __repr__(self):
+        return f"CommandArchive for: {self.root}"
+
+    @staticmethod
+    def _slug(value):
+        return re.sub(r"[^A-Za-z0-9.]+", "_", value).strip("_")
+
+    def path(self, ip, command, cycle):
+        return os.path.join(self.root, str(cycle), self._slug(ip), f"{self._slug(command)}.txt.gz")
+
+    def cycles(self):
+        """Return the recorded cycle numbers, oldest first."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(int(name) for name in os.listdir(self.root) if name.isdigit())
+
+    def write(self, ip, command, cycle, data):
+        path = self.path(ip, command, cycle)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary file first so a reader never sees a half-written recording
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(temp_path, "wb") as file:
+            file.write(data)
+        os.replace(temp_path, path)
+
+    def find(self, ip, command, cycle=None):
+        """
+        Return the path of a recording, or None if there is none.
+
+        Without a ``cycle`` the most recent cycle that recorded this command for the device is used.
+        """
+        cycles = [cycle] if cycle is not None else reversed(self.cycles())
+        for recorded_cycle in cycles:
+            path = self.path(ip, command, recorded_cycle)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def iter_chunks(self, ip, command, cycle=None, chunk_size=65536):
+        """Yield a recording's raw output in chunks of at most ``chunk_size`` bytes."""
+        path = self.find(ip, command, cycle)
+        if path is None:
+            raise FileNotFoundError(f"No recording of '{command}' for {ip}")
+
+        with gzip.open(path, "rb") as file:
+            while True:
+                chunk = file.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+
+class CommandRecorder:
+    """Records every command's raw output for one crawl cycle into a ``CommandArchive``."""
+
+    def __init__(self, archive, cycle):
+        self.archive = archive
+        self.cycle = cycle
+
+    def record(self, ip, command, data):
+        try:
+            self.archive.write(ip, command, self.cycle, bytes(data))
+        except OSError as e:
+            print(f"Error recording '{command}' for {ip}: {str(e)}")
+
+
+_recorder = None
+
+
+def start_recording(cycle, record_dir=SSH_RECORD_DIR):
+    """Record command output for ``cycle`` from now on, if a recording directory is configured."""
+    global _recorder
+    _recorder = CommandRecorder(CommandArchive(record_dir), cycle) if record_dir else None
+    return _recorder
+
+
+def get_recorder():
+    """Return the active ``CommandRecorder``, or None when recording is off."""
+    return _recorder
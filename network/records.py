@@ -0,0 +1,56 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(slots=True)
+class InterfaceRecord:
+    """
+    An interface of a core device as 'show int' describes it, which the crawler completes with
+    its CDP, OSPF, MPLS LDP and optics data into a link.
+
+    Fields that were not found are None. Counters, rates and sizes are ints and optics powers
+    are floats (dBm); they only become strings when the record is written (see ``columns``).
+    """
+    name: str
+    physical_status: Optional[str] = None
+    protocol_status: Optional[str] = None
+    mpls_ldp: Optional[str] = None
+    ospf: Optional[str] = None
+    ospf_interface_address: Optional[str] = None
+    bw: Optional[int] = None
+    description: Optional[str] = None
+    media_type: Optional[str] = None
+    cdp: Optional[str] = None
+    input_rate: Optional[int] = None
+    output_rate: Optional[int] = None
+    tx: Optional[float] = None
+    rx: Optional[float] = None
+    mtu: Optional[int] = None
+    input_errors: Optional[int] = None
+    output_errors: Optional[int] = None
+    crc: Optional[int] = None
+    interface_ip: Optional[str] = None
+
+    def update(self, other):
+        """Copy the fields ``other`` found over this record's, as if read later in the same output."""
+        for field in RECORD_FIELDS:
+            value = getattr(other, field)
+            if value is not None:
+                setattr(self, field, value)
+
+    def columns(self):
+        """Return the record as the string columns of a ``Link`` row, with missing fields empty."""
+        columns = {"name": self.name}
+        for field in RECORD_FIELDS:
+            value = getattr(self, field)
+            if value is None:
+                columns[field] = ""
+            elif isinstance(value, float):
+                columns[field] = f"{value:.2f}"
+            else:
+                columns[field] = str(value)
+        return columns
+
+
+# Every field but the name, which identifies the record
+RECORD_FIELDS = tuple(field for field in InterfaceRecord.__dataclass_fields__ if field != "name")
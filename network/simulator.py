@@ -0,0 +1,639 @@
+import argparse
+import ipaddress
+import random
+import re
+import selectors
+import socket
+import threading
+import time
+
+import paramiko
+from xml.sax.saxutils import escape
+
+from network.controllers_optics import parse_show_optics_output
+from network.int import parse_show_int_output
+from network.xml_backend import INTERFACE_NS, NETCONF_BASE, NETCONF_EOM, OPTICS_NS
+
+# Physical interfaces of a simulated device, cycled through in this order
+INTERFACE_TYPES = [("TenGigE", "Te"), ("HundredGigE", "Hu")]
+
+# Media type of the simulated physical interfaces, all LR optics, as 'show int' prints it
+MEDIA_TYPES = {"TenGigE": "10GBASE-LR", "HundredGigE": "100GBASE-LR4"}
+
+_STARTED_AT = time.monotonic()
+
+
+class VirtualDevice:
+    """
+    A simulated IOS-XR core router that renders the output of the commands the crawler issues.
+
+    Devices are chained in a ring: physical interface 0 connects to the next device and
+    physical interface 1 to the previous one, with matching CDP, OSPF and LDP neighbors, so the
+    crawler resolves real neighbor links between them. Everything is derived from ``index`` and
+    ``seed``, so a device renders the same output on every run.
+    """
+
+    def __init__(self, index, ip, fleet_size, fleet_ips, interfaces=8, subinterfaces=0, seed=0):
+        self.index = index
+        self.ip = ip
+        self.fleet_size = fleet_size
+        self.fleet_ips = fleet_ips
+        self.interfaces = max(interfaces, 2)
+        self.subinterfaces = subinterfaces
+        self.seed = seed
+        self.hostname = f"sim-core-{index:05d}"
+
+        self.commands = {
+            "show int": self.show_int,
+            "show interface description": self.show_interface_description,
+            "show controllers optics *": self.show_controllers_optics,
+            "sh cdp n d": self.show_cdp_neighbors_detail,
+            "show ip ospf nei det": self.show_ospf_neighbors_detail,
+            "show mpls ldp neighbor": self.show_mpls_ldp_neighbor,
+        }
+
+    def __repr__(self):
+        return f"VirtualDevice {self.hostname} at {self.ip}"
+
+    def _random(self, *salt):
+        return random.Random(":".join(str(part) for part in (self.seed, self.index) + salt))
+
+    def _state(self, port, sub=0):
+        return "up" if self._random("state", port, sub).random() > 0.05 else "down"
+
+    def _interface(self, port):
+        name, short_name = INTERFACE_TYPES[port % len(INTERFACE_TYPES)]
+        location = f"0/0/0/{port}"
+        return f"{name}{location}", f"{short_name}{location}", location
+
+    def _neighbor(self, port):
+        """Return (neighbor index, local address, neighbor address) for the ring links, else None."""
+        if self.fleet_size < 2 or port > 1:
+            return None
+        if port == 0:
+            link = self.index
+            neighbor = (self.index + 1) % self.fleet_size
+            return neighbor, self._link_address(link, 1), self._link_address(link, 2)
+        link = (self.index - 1) % self.fleet_size
+        neighbor = (self.index - 1) % self.fleet_size
+        return neighbor, self._link_address(link, 2), self._link_address(link, 1)
+
+    @staticmethod
+    def _link_address(link, host):
+        return str(ipaddress.IPv4Address("10.0.0.0") + link * 4 + host)
+
+    def render(self, command):
+        """Return the output for ``command``, or None if the device does not know it."""
+        command = " ".join(command.split())
+        if command in self.commands:
+            return self.commands[command]()
+        if command.startswith("show interface "):
+            return self.show_interface(command[len("show interface "):])
+        if command.startswith("show controllers optics "):
+            return self.show_controllers_optics_port(command[len("show controllers optics "):])
+        return None
+
+    def _find_interface(self, name):
+        """Return (port, subinterface) for a long or short interface name, or None if there is none."""
+        base, _, sub = name.partition(".")
+        for port in range(self.interfaces):
+            if base in self._interface(port)[:2]:
+                if not sub:
+                    return port, 0
+                if sub.isdigit() and 1 <= int(sub) <= self.subinterfaces:
+                    return port, int(sub)
+        return None
+
+    def show_int(self):
+        lines = []
+        for port in range(self.interfaces):
+            for sub in range(self.subinterfaces + 1):
+                lines.extend(self._show_int_lines(port, sub))
+        return "\n".join(lines) + "\n"
+
+    def show_interface(self, name):
+        interface = self._find_interface(name)
+        if interface is None:
+            return None
+        return "\n".join(self._show_int_lines(*interface)) + "\n"
+
+    def _show_int_lines(self, port, sub=0):
+        name, _, _ = self._interface(port)
+        rnd = self._random("int", port)
+        if sub:
+            # Subinterfaces draw their counters from the parent's generator, after the parent and earlier siblings
+            for _ in range(sub):
+                self._show_int_block(name, rnd, "up", "", None, 0)
+            return self._show_int_block(f"{name}.{sub}", rnd, self._state(port, sub), f"vlan-{sub}", None, 1000000,
+                                        subinterface=True)
+        neighbor = self._neighbor(port)
+        address = neighbor[1] if neighbor else None
+        bandwidth = 10000000 if "TenGigE" in name else 100000000
+        return self._show_int_block(name, rnd, self._state(port), f"to-{self._neighbor_name(port)}", address,
+                                    bandwidth)
+
+    def _neighbor_name(self, port):
+        neighbor = self._neighbor(port)
+        return f"sim-core-{neighbor[0]:05d}" if neighbor else f"customer-{self.index}-{port}"
+
+    @staticmethod
+    def _show_int_block(name, rnd, state, description, address, bandwidth, subinterface=False):
+        input_rate = rnd.randrange(0, 10 ** 9)
+        output_rate = rnd.randrange(0, 10 ** 9)
+        lines = [
+            f"{name} is {state}, line protocol is {state} ",
+            "  Interface state transitions: 1",
+            f"  Hardware is {'VLAN sub-interface(s)' if subinterface else name.rstrip('0123456789/')}, "
+            f"address is 0011.2233.{rnd.randrange(0x10000):04x}",
+            f"  Description: {description}",
+        ]
+        if address:
+            lines.append(f"  Internet address is {address}/30")
+        lines.append(f"  MTU 9216 bytes, BW {bandwidth} Kbit (Max: {bandwidth} Kbit)")
+        lines.append("     reliability 255/255, txload 0/255, rxload 0/255")
+        lines.append("  Encapsulation ARPA,")
+        if not subinterface:
+            lines.append(f"  Full-duplex, {bandwidth // 1000}Mb/s, {MEDIA_TYPES[name.rstrip('0123456789/')]}, "
+                         f"link type is force-up")
+            lines.append("  output flow control is off, input flow control is off")
+        lines.extend([
+            "  Last link flapped 1w2d",
+            "  Last input 00:00:00, output 00:00:00",
+            "  Last clearing of \"show interface\" counters never",
+            f"  5 minute input rate {input_rate} bits/sec, {input_rate // 8000} packets/sec",
+            f"  5 minute output rate {output_rate} bits/sec, {output_rate // 8000} packets/sec",
+            f"     {rnd.randrange(10 ** 9)} packets input, {rnd.randrange(10 ** 12)} bytes, 0 total input drops",
+            "     0 drops for unrecognized upper-level protocol",
+            f"     {rnd.randrange(100)} input errors, {rnd.randrange(10)} CRC, 0 frame, 0 overrun, 0 ignored, 0 abort",
+            f"     {rnd.randrange(10 ** 9)} packets output, {rnd.randrange(10 ** 12)} bytes, 0 total output drops",
+            f"     {rnd.randrange(10)} output errors, 0 underruns, 0 applique, 0 resets",
+            "",
+        ])
+        return lines
+
+    def show_interface_description(self):
+        lines = [
+            "Interface          Status      Protocol    Description",
+            "-" * 80,
+        ]
+        for port in range(self.interfaces):
+            _, short_name, _ = self._interface(port)
+            state = self._state(port)
+            lines.append(f"{short_name:<18} {state:<11} {state:<11} to-{self._neighbor_name(port)}")
+            for sub in range(1, self.subinterfaces + 1):
+                state = self._state(port, sub)
+                lines.append(f"{short_name + '.' + str(sub):<18} {state:<11} {state:<11} vlan-{sub}")
+        return "\n".join(lines) + "\n"
+
+    def show_controllers_optics(self):
+        lines = []
+        for port in range(self.interfaces):
+            _, _, location = self._interface(port)
+            lines.extend(["", f" Port: Optics{location.replace('/', '_')}"])
+            lines.extend(self._optics_lines(port))
+        return "\n".join(lines) + "\n"
+
+    def show_controllers_optics_port(self, location):
+        for port in range(self.interfaces):
+            if self._interface(port)[2] == location:
+                return "\n".join([""] + self._optics_lines(port)) + "\n"
+        return None
+
+    def _optics_lines(self, port):
+        rnd = self._random("optics", port)
+        return [
+            " Controller State: Up",
+            " Transport Admin State: In Service",
+            " Laser State: On",
+            " LED State: Green",
+            " Optics Status",
+            "         Optics Type:  SFP+ 10G LR",
+            "         Wavelength = 1310.00 nm",
+            "         Alarm Status:",
+            "         -------------",
+            "         Detected Alarms: None",
+            f"         Laser Bias Current = {rnd.uniform(20, 60):.1f} mA",
+            f"         Actual TX Power = {rnd.uniform(-3, 1):.2f} dBm",
+            f"         RX Power = {rnd.uniform(-9, 0):.2f} dBm",
+            "         Performance Monitoring: Disable",
+            "         THRESHOLD VALUES",
+            "         ----------------",
+            "         Parameter                 High Alarm  Low Alarm  High Warning  Low Warning",
+            "         ------------------------  ----------  ---------  ------------  -----------",
+            "         Rx Power Threshold(dBm)          1.50       14.40          0.50        10.40",
+            "         Tx Power Threshold(dBm)          1.50        8.20          0.50         7.20",
+            "         LBC Threshold(mA)               70.00        5.00         68.00         8.00",
+            "         Temp. Threshold(celsius)        75.00        5.00         70.00         0.00",
+            "         Voltage Threshold(volt)          3.63        2.97          3.46         3.13",
+            f"         Temperature = {rnd.uniform(25, 45):.2f} Celsius",
+            "         Voltage = 3.30 V",
+            " Transceiver Vendor Details",
+            "         Form Factor            : SFP+",
+            "         Optics type            : SFP+ 10G LR",
+            "         Name                   : CISCO-FINISAR",
+            "         OUI Number             : 00.90.65",
+            "         Part Number            : FTLX1471D3BCL-CS",
+            "         Rev Number             : A",
+            f"         Serial Number          : FNS{self.index:05d}{port:03d}",
+            "         PID                    : SFP-10G-LR",
+            "         VID                    : V03",
+            "         Date Code(yy/mm/dd)    : 18/03/17",
+        ]
+
+    def netconf_reply(self, request):
+        """
+        Return the NETCONF reply to a <get> of the interface or optics operational data, built
+        from the same values the CLI commands print, or an <rpc-error> for anything else.
+        """
+        key = re.search(r"<(?:interface-)?name>(.*?)</(?:interface-)?name>", request)
+        if INTERFACE_NS in request:
+            output = self.show_interface(key.group(1)) if key else self.show_int()
+            interfaces = parse_show_int_output(output) if output else {}
+            body = "".join(self._interface_xml(name, record) for name, record in interfaces.items())
+            data = f'<interfaces xmlns="{INTERFACE_NS}"><interface-xr>{body}</interface-xr></interfaces>'
+        elif OPTICS_NS in request:
+            location = key.group(1)[len("Optics"):] if key else None
+            output = self.show_controllers_optics_port(location) if location else self.show_controllers_optics()
+            ports = {}
+            if output:
+                port = f"Optics{location.replace('/', '_')}" if location else None
+                ports = parse_show_optics_output(output, port=port)
+            body = "".join(self._optics_xml(port, data) for port, data in ports.items())
+            data = f'<optics-oper xmlns="{OPTICS_NS}"><optics-ports>{body}</optics-ports></optics-oper>'
+        else:
+            return (f'<rpc-reply message-id="1" xmlns="{NETCONF_BASE}"><rpc-error><error-type>application'
+                    f'</error-type><error-message>unknown model</error-message></rpc-error></rpc-reply>')
+        return f'<rpc-reply message-id="1" xmlns="{NETCONF_BASE}"><data>{data}</data></rpc-reply>'
+
+    @staticmethod
+    def _interface_xml(name, record):
+        states = {"up": "im-state-up", "administratively down": "im-state-admin-down"}
+        return (
+            f"<interface><interface-name>{name}</interface-name>"
+            f"<state>{states.get(record.physical_status, 'im-state-down')}</state>"
+            f"<line-state>{states.get(record.protocol_status, 'im-state-down')}</line-state>"
+            f"<description>{escape(record.description or '')}</description>"
+            + (f"<media-type>im-attr-media-{record.media_type.lower()}</media-type>" if record.media_type else "") +
+            f"<mtu>{record.mtu}</mtu><bandwidth>{record.bw}</bandwidth>"
+            f"<data-rates><input-data-rate>{record.input_rate // 1000}</input-data-rate>"
+            f"<output-data-rate>{record.output_rate // 1000}</output-data-rate></data-rates>"
+            f"<interface-statistics><full-interface-stats><input-errors>{record.input_errors}</input-errors>"
+            f"<output-errors>{record.output_errors}</output-errors><crc-errors>{record.crc}</crc-errors>"
+            f"</full-interface-stats></interface-statistics>"
+            + (f"<ip-information><ip-address>{record.interface_ip}</ip-address></ip-information>"
+               if record.interface_ip else "")
+            + "</interface>"
+        )
+
+    @staticmethod
+    def _optics_xml(port, data):
+        admin_state = "tas-ui-is" if data['transport_admin_state'] == "In Service" else "tas-ui-oos"
+        return (
+            f"<optics-port><name>Optics{port[len('Optics'):].replace('_', '/')}</name><optics-info>"
+            f"<transport-admin-state>{admin_state}</transport-admin-state>"
+            f"<controller-state>optics-state-{data['controller_state'].lower()}</controller-state>"
+            f"<laser-state>{data['laser_state'].lower()}</laser-state>"
+            f"<led-state>{data['led_state'].lower()}-on</led-state>"
+            f"<optics-type>optics-grey</optics-type>"
+            f"<optics-type-str>{escape(data['optics_type'].strip())}</optics-type-str>"
+            f"<temperature>{round(data['temperature'] * 100)}</temperature>"
+            f"<voltage>{round(data['voltage'] * 100)}</voltage>"
+            f"<lane-data><lane-index>1</lane-index><transmit-power>{round(data['actual_tx_power'] * 100)}"
+            f"</transmit-power><receive-power>{round(data['rx_power'] * 100)}</receive-power></lane-data>"
+            f"</optics-info></optics-port>"
+        )
+
+    def _ring_neighbors(self):
+        for port in range(2):
+            neighbor = self._neighbor(port)
+            if neighbor:
+                yield port, neighbor
+
+    def show_cdp_neighbors_detail(self):
+        lines = []
+        for port, (neighbor, _, neighbor_address) in self._ring_neighbors():
+            name, _, _ = self._interface(port)
+            remote_name, _, _ = VirtualDevice(neighbor, "", self.fleet_size, self.fleet_ips,
+                                              self.interfaces)._interface(1 - port)
+            lines.extend([
+                "-------------------------",
+                f"Device ID: sim-core-{neighbor:05d}",
+                f"SysName : sim-core-{neighbor:05d}",
+                "Entry address(es): ",
+                f"  IP address: {neighbor_address}",
+                "Platform: cisco ASR9K Series,  Capabilities: Router ",
+                f"Interface: {name}",
+                f"Port ID (outgoing port): {remote_name}",
+                f"Holdtime : {180 - int(time.time()) % 60} sec",
+                "",
+            ])
+        return "\n".join(lines) + "\n"
+
+    def show_ospf_neighbors_detail(self):
+        lines = []
+        for port, (neighbor, _, neighbor_address) in self._ring_neighbors():
+            name, _, _ = self._interface(port)
+            lines.extend([
+                f" Neighbor {self.fleet_ips[neighbor]}, interface address {neighbor_address}",
+                f"    In the area 0 via interface {name} ",
+                "    Neighbor priority is 1, State is FULL, 6 state changes",
+                "    DR is 0.0.0.0 BDR is 0.0.0.0",
+                "    Options is 0x52",
+                "    LLS Options is 0x1 (LR)",
+                f"    Dead timer due in 00:00:{40 - int(time.time()) % 10:02d}",
+                f"    Neighbor is up for {_uptime()}",
+                "    Number of DBD retrans during last exchange 0",
+                "    Index 1/1, retransmission queue length 0, number of retransmission 0",
+                "    First 0(0)/0(0) Next 0(0)/0(0)",
+                "    Last retransmission scan length is 0, maximum is 0",
+                "    Last retransmission scan time is 0 msec, maximum is 0 msec",
+                "",
+            ])
+        return "\n".join(lines) + "\n"
+
+    def show_mpls_ldp_neighbor(self):
+        lines = []
+        for port, (neighbor, _, neighbor_address) in self._ring_neighbors():
+            name, _, _ = self._interface(port)
+            neighbor_ip = self.fleet_ips[neighbor]
+            lines.extend([
+                "",
+                f"Peer LDP Identifier: {neighbor_ip}:0",
+                f"  TCP connection: {neighbor_ip}:646 - {self.ip}:{46000 + port}",
+                "  Graceful Restart: No",
+                "  Session Holdtime: 180 sec",
+                f"  State: Oper; Msgs sent/rcvd: {_messages()}/{_messages() - 4}; Downstream-Unsolicited",
+                f"  Up time: {_uptime()}",
+                "  LDP Discovery Sources:",
+                "    IPv4: (1)",
+                f"      {name}",
+                "    IPv6: (0)",
+                "  Addresses bound to this peer:",
+                "    IPv4: (2)",
+                f"      {neighbor_ip}     {neighbor_address}",
+                "    IPv6: (0)",
+            ])
+        return "\n".join(lines) + "\n"
+
+
+class _DeviceServer(paramiko.ServerInterface):
+    def __init__(self, fleet, device):
+        self.fleet = fleet
+        self.device = device
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_auth_password(self, username, password):
+        if self.fleet.username is None or (username, password) == (self.fleet.username, self.fleet.password):
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_subsystem_request(self, channel, name):
+        if name != "netconf":
+            return False
+        threading.Thread(target=self.fleet.respond_netconf, args=(self.device, channel), daemon=True).start()
+        return True
+
+    def check_channel_exec_request(self, channel, command):
+        threading.Thread(target=self.fleet.respond, args=(self.device, channel, command.decode("utf-8")),
+                         daemon=True).start()
+        return True
+
+
+class SimulatedFleet:
+    """
+    A local fleet of simulated Cisco SSH servers for load testing the crawler.
+
+    Each virtual device gets its own loopback address (``127.1.0.1``, ``127.1.0.2``, ...) and
+    listens on it on the shared ``port``; the device a connection is for is taken from the
+    address it was made to. Only connections between loopback addresses are accepted. Point the
+    crawler's core devices at ``device_ips`` and set ``SSH_PORT`` to ``port`` to crawl the fleet.
+
+    Without ``username`` any credentials are accepted, so nothing listens beyond the devices'
+    own addresses. A fleet too large for a socket per device can opt into a single socket bound
+    to ``bind_address`` instead, e.g. "0.0.0.0", which listens on every interface of the host.
+
+    ``latency`` adds a delay in seconds before each command's output, and ``interfaces`` and
+    ``subinterfaces`` set how many physical interfaces each device has and how many
+    subinterfaces each of them carries, which together set the output sizes.
+    """
+
+    def __init__(self, devices=100, port=2222, latency=0.0, interfaces=8, subinterfaces=0, username=None,
+                 password=None, first_ip="127.1.0.1", seed=0, host_key=None, bind_address=None):
+        self.port = port
+        self.bind_address = bind_address
+        self.latency = latency
+        self.username = username
+        self.password = password
+        self.host_key = host_key or paramiko.RSAKey.generate(2048)
+
+        first = ipaddress.IPv4Address(first_ip)
+        self.device_ips = [str(first + index) for index in range(devices)]
+        self.devices = {
+            ip: VirtualDevice(index, ip, devices, self.device_ips, interfaces, subinterfaces, seed)
+            for index, ip in enumerate(self.device_ips)
+        }
+
+        self._sockets = []
+        self._thread = None
+        self._transports = set()
+        self._lock = threading.Lock()
+        self._running = threading.Event()
+
+    def __repr__(self):
+        return f"SimulatedFleet of {len(self.devices)} devices on port {self.port}"
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        addresses = self.device_ips if self.bind_address is None else [self.bind_address]
+        if self.bind_address is not None and self.username is None:
+            print(f"Warning: accepting any credentials on {self.bind_address}:{self.port}")
+        for address in addresses:
+            listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            listener.bind((address, self.port))
+            listener.listen(1024)
+            listener.setblocking(False)
+            # Port 0 takes a free port for the first address; the other devices share it
+            self.port = listener.getsockname()[1]
+            self._sockets.append(listener)
+
+        self._running.set()
+        self._thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running.clear()
+        if self._thread:
+            self._thread.join()
+        for listener in self._sockets:
+            listener.close()
+        self._sockets = []
+        with self._lock:
+            transports = list(self._transports)
+            self._transports.clear()
+        for transport in transports:
+            transport.close()
+
+    def _accept_loop(self):
+        with selectors.DefaultSelector() as selector:
+            for listener in self._sockets:
+                selector.register(listener, selectors.EVENT_READ)
+            while self._running.is_set():
+                for key, _ in selector.select(timeout=0.5):
+                    try:
+                        client, (peer_ip, _) = key.fileobj.accept()
+                    except (BlockingIOError, InterruptedError):
+                        continue
+                    except OSError:
+                        return
+                    client.setblocking(True)
+
+                    device = self.devices.get(client.getsockname()[0])
+                    if device is None or not ipaddress.IPv4Address(peer_ip).is_loopback:
+                        client.close()
+                        continue
+
+                    threading.Thread(target=self._serve, args=(client, device), daemon=True).start()
+
+    def _serve(self, client, device):
+        transport = paramiko.Transport(client)
+        transport.add_server_key(self.host_key)
+        # Like a real router, offer zlib compression to clients that ask for it
+        transport.use_compression(True)
+        with self._lock:
+            self._transports.add(transport)
+        try:
+            transport.start_server(server=_DeviceServer(self, device))
+            # Channels are answered from their exec request; accepted channels are only held on to here,
+            # since paramiko closes a channel once nothing references it
+            channels = []
+            while transport.is_active() and self._running.is_set():
+                channel = transport.accept(timeout=1)
+                channels = [open_channel for open_channel in channels if not open_channel.closed]
+                if channel is not None:
+                    channels.append(channel)
+        except (paramiko.SSHException, EOFError, OSError):
+            pass
+        finally:
+            transport.close()
+            with self._lock:
+                self._transports.discard(transport)
+
+    def respond(self, device, channel, command):
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+
+            output = device.render(command)
+            if output is None:
+                channel.sendall_stderr(f"% Invalid input detected at '^' marker: {command}\n".encode())
+                channel.send_exit_status(1)
+            else:
+                channel.sendall(output.encode("utf-8"))
+                channel.send_exit_status(0)
+            _close_after_eof(channel)
+        except (paramiko.SSHException, EOFError, OSError):
+            pass
+        finally:
+            _close_channel(channel)
+
+    def respond_netconf(self, device, channel):
+        """Answer a NETCONF session: the hello, each <get> in turn, and the close-session."""
+        try:
+            channel.settimeout(30)
+            channel.sendall(f'<hello xmlns="{NETCONF_BASE}"><capabilities><capability>{NETCONF_BASE}'
+                            f'</capability></capabilities><session-id>1</session-id></hello>'.encode() + NETCONF_EOM)
+            received = b""
+            closing = False
+            while not closing:
+                data = channel.recv(65536)
+                if not data:
+                    break
+                received += data
+                *messages, received = received.split(NETCONF_EOM)
+                for message in messages:
+                    message = message.decode("utf-8")
+                    if "<hello" in message:
+                        continue
+                    if "<close-session" in message:
+                        reply, closing = f'<rpc-reply message-id="2" xmlns="{NETCONF_BASE}"><ok/></rpc-reply>', True
+                    else:
+                        if self.latency:
+                            time.sleep(self.latency)
+                        reply = device.netconf_reply(message)
+                    channel.sendall(reply.encode("utf-8") + NETCONF_EOM)
+            _close_after_eof(channel)
+        except (paramiko.SSHException, EOFError, OSError):
+            pass
+        finally:
+            _close_channel(channel)
+
+
+def _uptime():
+    # Neighbor uptimes and message counters grow between polls, like on a real router
+    up = int(time.monotonic() - _STARTED_AT)
+    return f"{up // 3600:02d}:{up % 3600 // 60:02d}:{up % 60:02d}"
+
+
+def _messages():
+    return 10_000 + int((time.monotonic() - _STARTED_AT) * 3)
+
+
+def _close_after_eof(channel):
+    # Closing straight away can beat the reply to the channel request and fail it on the client, so
+    # send EOF and leave the close to the client once it has read everything
+    channel.shutdown_write()
+    channel.settimeout(30)
+    channel.recv(1)
+
+
+def _close_channel(channel):
+    # The client may already have dropped the connection after reading to EOF
+    try:
+        channel.close()
+    except (paramiko.SSHException, EOFError, OSError):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fleet of simulated Cisco core routers over SSH.")
+    parser.add_argument("--devices", type=int, default=100)
+    parser.add_argument("--port", type=int, default=2222)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds of delay before each command's output")
+    parser.add_argument("--interfaces", type=int, default=8, help="physical interfaces per device")
+    parser.add_argument("--subinterfaces", type=int, default=0, help="subinterfaces per physical interface")
+    parser.add_argument("--username")
+    parser.add_argument("--password")
+    parser.add_argument("--first-ip", default="127.1.0.1")
+    parser.add_argument("--bind", help="listen on a single socket bound to this address, e.g. 0.0.0.0, instead of "
+                                       "on each device's loopback address")
+    args = parser.parse_args()
+
+    fleet = SimulatedFleet(devices=args.devices, port=args.port, latency=args.latency, interfaces=args.interfaces,
+                           subinterfaces=args.subinterfaces, username=args.username, password=args.password,
+                           first_ip=args.first_ip, bind_address=args.bind)
+    with fleet:
+        print(f"Serving {len(fleet.device_ips)} devices from {fleet.device_ips[0]} to {fleet.device_ips[-1]} "
+              f"on port {fleet.port}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -7,49 +7,124 @@ URL = 'https://{domain}/spectrum/restful/devices?attr=0x129e7&attr=0x12d7f&throt
 USERNAME = '{username}'
 PASSWORD = '{password}'
 NAMESPACE = '{http://www.ca.com/spectrum/restful/schema/response}'
+MODEL_TAG = f'{NAMESPACE}model'
+ATTRIBUTE_TAG = f'{NAMESPACE}attribute'
+ADDRESS_ATTRIBUTE = '0x12d7f'
+LOCATION_ATTRIBUTE = '0x129e7'
 
 def get_spectrum_container_data():
+    """
+    Request the Spectrum devices. The body is streamed, so it is only read as the response is
+    indexed (see ``SpectrumContainerIndex.from_response``).
+    """
     try:
-        response = requests.get(URL, auth=HTTPBasicAuth(USERNAME, PASSWORD), verify=False)
+        response = requests.get(URL, auth=HTTPBasicAuth(USERNAME, PASSWORD), verify=False, stream=True)
         response.raise_for_status()
         return response
     except requests.RequestException as e:
         print(f"Request failed: {e}")
         return []
 
+class SpectrumContainerIndex:
+    """
+    The Spectrum containers of device addresses, parsed once from the Spectrum devices response.
+
+    Containers are looked up by exact IP address, or by the first three octets of the address
+    for a partial address such as "10.1.2". Each address maps to a tuple of container names,
+    in the order Spectrum lists them, and container names are shared between addresses, so the
+    index stays small however many devices sit in a container.
+    """
+
+    def __init__(self, by_ip=None, by_prefix=None):
+        self.by_ip = by_ip or {}
+        self.by_prefix = by_prefix or {}
+
+    @classmethod
+    def from_response(cls, spectrum_container_data):
+        """
+        Build the index from a Spectrum devices response, parsing the body as it is read from the
+        connection; a failed request gives an empty index.
+        """
+        if not spectrum_container_data:
+            return cls()
+        # Let urllib3 undo any gzip content encoding, as reading ``content`` would
+        spectrum_container_data.raw.decode_content = True
+        try:
+            return cls.from_xml(spectrum_container_data.raw)
+        finally:
+            spectrum_container_data.close()
+
+    @classmethod
+    def from_xml(cls, source):
+        """
+        Build the index from a Spectrum devices XML file or file object, parsed model by model.
+        Each model is removed from the tree once read, so only the model being read is held in
+        memory.
+        """
+        by_ip = {}
+        by_prefix = {}
+        names = {}
+        # Elements open at the current point of the document, so that a model's parent is known
+        parents = []
+        for event, element in ET.iterparse(source, events=("start", "end")):
+            if event == "start":
+                parents.append(element)
+                continue
+            parents.pop()
+            if element.tag != MODEL_TAG:
+                continue
+
+            address = location = None
+            for attribute in element.iter(ATTRIBUTE_TAG):
+                if attribute.get("id") == ADDRESS_ATTRIBUTE and address is None:
+                    address = attribute.text
+                elif attribute.get("id") == LOCATION_ATTRIBUTE and location is None:
+                    location = attribute.text
+            if parents:
+                parents[-1].remove(element)
+            if not address or not location:
+                continue
+
+            name = location.split(':')[-1]
+            name = names.setdefault(name, name)
+            containers = by_ip.setdefault(address, [])
+            if name not in containers:
+                containers.append(name)
+            octets = address.split('.')
+            if len(octets) == 4:
+                containers = by_prefix.setdefault('.'.join(octets[:3]), [])
+                if name not in containers:
+                    containers.append(name)
+
+        return cls({address: tuple(containers) for address, containers in by_ip.items()},
+                   {prefix: tuple(containers) for prefix, containers in by_prefix.items()})
+
+    def find(self, ip_address: str) -> list:
+        """Return the containers of an IP address, or of the addresses a three-octet prefix covers."""
+        if len(ip_address.split('.')) == 3:
+            return list(self.by_prefix.get(ip_address, ()))
+        return list(self.by_ip.get(ip_address, ()))
+
+
 def find_container_from_ip(ip_address: str, spectrum_container_data=None) -> list:
     """
     Find container from IP address.
 
     Args:
     - ip_address (str): IP address to search for.
+    - spectrum_container_data: A ``SpectrumContainerIndex``, or a Spectrum devices response to
+      index, whose body is read by indexing it. Fetched from Spectrum if not given.
 
     Returns:
     - list: List of containers associated with the IP address.
     """
 
-    if not spectrum_container_data:
-        spectrum_container_data = get_spectrum_container_data()
-
-    root = ET.fromstring(spectrum_container_data.text)
-    containers = set()
-
-    for model in root.findall(f'.//{NAMESPACE}model'):
-        attribute = model.find(f'.//{NAMESPACE}attribute[@id="0x12d7f"]')
-        location = model.find(f'.//{NAMESPACE}attribute[@id="0x129e7"]')
-
-        if attribute is not None and location is not None:
-            try:
-                if len(ip_address.split('.')) == 3:
-                    ip_segment = ip_address + '.'
-                    if ip_segment in attribute.text:
-                        containers.add(location.text.split(':')[-1])
-                elif attribute.text == ip_address:
-                    containers.add(location.text.split(':')[-1])
-            except IndexError:
-                pass
+    if not isinstance(spectrum_container_data, SpectrumContainerIndex):
+        if not spectrum_container_data:
+            spectrum_container_data = get_spectrum_container_data()
+        spectrum_container_data = SpectrumContainerIndex.from_response(spectrum_container_data)
 
-    return list(containers)
+    return spectrum_container_data.find(ip_address)
 
 def spec_test(ip: str) -> None:
     """
@@ -0,0 +1,135 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from network.config import SSH_KEEPALIVE_INTERVAL, SSH_POOL_MAX_IDLE, SSH_POOL_MAX_PER_HOST
+from network.paramiko_connection_CiscoDevices import create_device
+
+
+class SSHConnectionPool:
+    """
+    A long-lived pool of authenticated SSH sessions keyed by device IP and session settings.
+
+    Sessions are returned to the pool after use instead of being closed, so the next crawl
+    cycle reuses the same transport rather than renegotiating it. Transports send keepalives
+    while idle, sessions idle for longer than ``max_idle`` seconds or whose transport has died
+    are evicted, and at most ``max_per_host`` sessions are checked out per device at a time.
+
+    A session is only reused under the transport settings it was opened with, such as a
+    transport profile's compression or window size. The command limiter is not fixed at
+    connect time, so each checkout gives the session the one it was asked for.
+    """
+
+    def __init__(self, keepalive_interval=SSH_KEEPALIVE_INTERVAL, max_idle=SSH_POOL_MAX_IDLE,
+                 max_per_host=SSH_POOL_MAX_PER_HOST):
+        self.keepalive_interval = keepalive_interval
+        self.max_idle = max_idle
+        self.max_per_host = max_per_host
+
+        self._lock = threading.Lock()
+        self._idle = {}
+        self._host_slots = {}
+
+    def _host_slot(self, ip):
+        with self._lock:
+            if ip not in self._host_slots:
+                self._host_slots[ip] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_slots[ip]
+
+    def _is_expired(self, last_used, now):
+        return now - last_used > self.max_idle
+
+    @staticmethod
+    def _key(ip, kwargs):
+        """Return the key of the idle sessions that may serve a checkout of ``ip`` with ``kwargs``."""
+        return ip, frozenset((name, value) for name, value in kwargs.items() if name != "command_limiter")
+
+    def _take_idle(self, key):
+        """Pop the most recently used healthy idle session for ``key``, closing any stale ones."""
+        stale = []
+        session = None
+        now = time.monotonic()
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                candidate, last_used = idle.pop()
+                if not self._is_expired(last_used, now) and candidate.is_active():
+                    session = candidate
+                    break
+                stale.append(candidate)
+
+        for candidate in stale:
+            candidate.close_connection()
+        return session
+
+    def acquire(self, ip, username, password, **kwargs):
+        """
+        Check out a session for ``ip``, reusing an idle one when possible.
+
+        Blocks while ``max_per_host`` sessions for the device are already checked out. Extra
+        keyword arguments are passed to ``create_device`` when a new session is needed, and only
+        idle sessions opened with the same ones are reused.
+        """
+        slot = self._host_slot(ip)
+        slot.acquire()
+        try:
+            key = self._key(ip, kwargs)
+            session = self._take_idle(key)
+            if session is None:
+                session = create_device(ip, username, password, keepalive_interval=self.keepalive_interval, **kwargs)
+            else:
+                session.command_limiter = kwargs.get("command_limiter")
+            session.pool_key = key
+            return session
+        except Exception:
+            slot.release()
+            raise
+
+    def release(self, session, discard=False):
+        """Return a session to the pool, or close it if ``discard`` is set or its transport is dead."""
+        try:
+            if discard or not session.is_active():
+                session.close_connection()
+            else:
+                with self._lock:
+                    self._idle.setdefault(session.pool_key, []).append((session, time.monotonic()))
+        finally:
+            self._host_slot(session.hostname).release()
+
+    @contextmanager
+    def session(self, ip, username, password, **kwargs):
+        """Check out a session for the duration of a ``with`` block."""
+        session = self.acquire(ip, username, password, **kwargs)
+        try:
+            yield session
+        except Exception:
+            self.release(session, discard=True)
+            raise
+        self.release(session)
+
+    def evict_idle(self):
+        """Close idle sessions that have expired or whose transport is no longer active."""
+        stale = []
+        now = time.monotonic()
+        with self._lock:
+            for key, idle in self._idle.items():
+                keep = []
+                for session, last_used in idle:
+                    if self._is_expired(last_used, now) or not session.is_active():
+                        stale.append(session)
+                    else:
+                        keep.append((session, last_used))
+                self._idle[key] = keep
+
+        for session in stale:
+            session.close_connection()
+        return len(stale)
+
+    def close_all(self):
+        """Close every idle session in the pool."""
+        with self._lock:
+            sessions = [session for idle in self._idle.values() for session, _ in idle]
+            self._idle.clear()
+
+        for session in sessions:
+            session.close_connection()
@@ -0,0 +1,243 @@
+from xml.etree.ElementTree import XMLPullParser
+from xml.sax.saxutils import escape
+
+from network.paramiko_connection_CiscoDevices import CommandError, device_session
+from network.records import InterfaceRecord
+
+# NETCONF 1.0 end-of-message marker; the client hello only offers base:1.0 so the device frames with it
+NETCONF_EOM = b"]]>]]>"
+NETCONF_BASE = "urn:ietf:params:xml:ns:netconf:base:1.0"
+NETCONF_HELLO = (f'<?xml version="1.0" encoding="UTF-8"?><hello xmlns="{NETCONF_BASE}"><capabilities>'
+                 f'<capability>{NETCONF_BASE}</capability></capabilities></hello>]]>]]>')
+NETCONF_GET = (f'<rpc message-id="1" xmlns="{NETCONF_BASE}"><get><filter type="subtree">{{filter}}</filter></get>'
+               f'</rpc>]]>]]>')
+NETCONF_CLOSE = f'<rpc message-id="2" xmlns="{NETCONF_BASE}"><close-session/></rpc>]]>]]>'
+
+# IOS-XR operational models for the data 'show int' and 'show controllers optics' print
+INTERFACE_NS = "http://cisco.com/ns/yang/Cisco-IOS-XR-pfi-im-cmd-oper"
+OPTICS_NS = "http://cisco.com/ns/yang/Cisco-IOS-XR-controller-optics-oper"
+INTERFACES_FILTER = (f'<interfaces xmlns="{INTERFACE_NS}"><interface-xr><interface>{{key}}</interface></interface-xr>'
+                     f'</interfaces>')
+OPTICS_FILTER = (f'<optics-oper xmlns="{OPTICS_NS}"><optics-ports><optics-port>{{key}}<optics-info/></optics-port>'
+                 f'</optics-ports></optics-oper>')
+
+# Enumerations of the models, as the CLI parsers read what 'show int' and 'show controllers optics' print.
+# Optics states the CLI parsers do not pick up either, such as an administratively down controller, are left out.
+INTERFACE_STATES = {
+    "im-state-up": "up",
+    "im-state-admin-down": "administratively down",
+}
+# Address the model reports for an interface without one, where 'show int' prints none
+NO_ADDRESS = "0.0.0.0"
+MEDIA_TYPE_PREFIX = "im-attr-media-"
+UNKNOWN_MEDIA_TYPES = {"im-attr-media-other", "im-attr-media-unknown"}
+OPTICS_CONTROLLER_STATES = {"optics-state-up": "Up", "optics-state-down": "Down"}
+OPTICS_ADMIN_STATES = {"tas-ui-is": "In Service", "tas-ui-oos": "Out of Service"}
+OPTICS_LASER_STATES = {"on": "On", "off": "Off"}
+OPTICS_LED_STATES = {
+    "green-on": "Green", "green-flashing": "Green",
+    "yellow-on": "Yellow", "yellow-flashing": "Yellow",
+    "red-on": "Red", "red-flashing": "Red",
+}
+
+
+def netconf_get_messages(filter_xml):
+    """Return the client hello, a <get> with ``filter_xml`` and a close-session, ready to send."""
+    return NETCONF_HELLO + NETCONF_GET.format(filter=filter_xml) + NETCONF_CLOSE
+
+
+def iter_netconf_reply(chunks):
+    """
+    Yield the bytes of the first reply after the device's hello from a stream of NETCONF 1.0
+    messages, as they arrive. The rest of the stream is drained without being yielded, so the
+    channel runs to its end.
+
+    The end-of-message marker may be split across chunks, so the last few bytes of each chunk are
+    held back until the next one shows whether they start a marker.
+    """
+    held_back = len(NETCONF_EOM) - 1
+    state = "hello"
+    pending = b""
+    for chunk in chunks:
+        if state == "done":
+            continue
+        pending += chunk
+        if state == "hello":
+            end = pending.find(NETCONF_EOM)
+            if end == -1:
+                pending = pending[-held_back:]
+                continue
+            state = "reply"
+            pending = pending[end + len(NETCONF_EOM):]
+        end = pending.find(NETCONF_EOM)
+        if end != -1:
+            yield pending[:end]
+            state = "done"
+        elif len(pending) > held_back:
+            yield pending[:-held_back]
+            pending = pending[-held_back:]
+    if state == "reply" and pending:
+        yield pending
+
+
+def iter_xml_records(chunks, namespace, record_tag, parent_tag, build):
+    """
+    Parse an XML reply with an incremental pull parser and yield ``build(element)`` for every
+    ``record_tag`` element directly under ``parent_tag`` as soon as it is complete. Finished
+    elements are cleared, so only the record being read is held in memory.
+    """
+    record_tag = f"{{{namespace}}}{record_tag}"
+    parent_tag = f"{{{namespace}}}{parent_tag}"
+    parser = XMLPullParser(events=("start", "end"))
+    path = []
+
+    def parse(events):
+        for event, element in events:
+            if event == "start":
+                path.append(element.tag)
+                continue
+            path.pop()
+            if element.tag == record_tag and path and path[-1] == parent_tag:
+                record = build(element)
+                element.clear()
+                if record is not None:
+                    yield record
+            elif element.tag == "{%s}rpc-error" % NETCONF_BASE:
+                raise CommandError(element.findtext(f"{{{NETCONF_BASE}}}error-message", "NETCONF request failed"))
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from parse(parser.read_events())
+    parser.close()
+    yield from parse(parser.read_events())
+
+
+def _text(element, path, namespace):
+    value = element.findtext("/".join(f"{{{namespace}}}{part}" for part in path.split("/")))
+    return value.strip() if value is not None else None
+
+
+def _interface_record(element):
+    """Build ``(name, InterfaceRecord)`` for an interface, with the values 'show int' parsing gives."""
+    def text(path):
+        return _text(element, path, INTERFACE_NS)
+
+    name = text("interface-name")
+    if not name:
+        return None
+
+    record = InterfaceRecord(name)
+    if text("state") is not None:
+        record.physical_status = INTERFACE_STATES.get(text("state"), "down")
+    if text("line-state") is not None:
+        record.protocol_status = INTERFACE_STATES.get(text("line-state"), "down")
+    if text("description"):
+        record.description = text("description")
+    if text("ip-information/ip-address") not in (None, "", NO_ADDRESS):
+        record.interface_ip = text("ip-information/ip-address")
+    media_type = text("media-type")
+    if media_type and media_type not in UNKNOWN_MEDIA_TYPES:
+        # e.g. "im-attr-media-10gbase-lr" -> "10GBASE-LR"
+        record.media_type = media_type.removeprefix(MEDIA_TYPE_PREFIX).upper()
+    # Counters are under the container named by stats-type; basic statistics have no CRC count
+    stats = f"interface-statistics/{text('interface-statistics/stats-type') or 'full'}-interface-stats"
+    fields = {
+        'mtu': "mtu",
+        'bw': "bandwidth",
+        'input_errors': f"{stats}/input-errors",
+        'output_errors': f"{stats}/output-errors",
+        'crc': f"{stats}/crc-errors",
+    }
+    for field, path in fields.items():
+        value = text(path)
+        if value:
+            setattr(record, field, int(value))
+    # The model reports data rates in kbit/s where 'show int' prints bits/sec
+    for field, path in (('input_rate', "data-rates/input-data-rate"), ('output_rate', "data-rates/output-data-rate")):
+        value = text(path)
+        if value:
+            setattr(record, field, int(value) * 1000)
+    return name, record
+
+
+def _hundredths(value):
+    return int(value) / 100
+
+
+def _optics_record(element):
+    """Build ``(port, data)`` for an optics port, with the keys and values optics parsing gives."""
+    def text(path):
+        return _text(element, path, OPTICS_NS)
+
+    name = text("name")
+    if not name:
+        return None
+
+    data = {}
+    states = (
+        ('controller_state', "optics-info/controller-state", OPTICS_CONTROLLER_STATES),
+        ('transport_admin_state', "optics-info/transport-admin-state", OPTICS_ADMIN_STATES),
+        ('laser_state', "optics-info/laser-state", OPTICS_LASER_STATES),
+        ('led_state', "optics-info/led-state", OPTICS_LED_STATES),
+    )
+    for key, path, names in states:
+        value = names.get(text(path))
+        if value:
+            data[key] = value
+    # optics-type only tells grey from DWDM optics; the string is what the CLI prints
+    if text("optics-info/optics-type-str"):
+        data['optics_type'] = text("optics-info/optics-type-str")
+    # Power is reported in 0.01 dBm for each lane; single-lane optics only have the first one
+    for key, path in (('actual_tx_power', "optics-info/lane-data/transmit-power"),
+                      ('rx_power', "optics-info/lane-data/receive-power")):
+        value = text(path)
+        if value:
+            data[key] = _hundredths(value)
+    # Temperature is reported in 0.01 degrees Celsius and voltage in 0.01 V
+    for key, path in (('temperature', "optics-info/temperature"), ('voltage', "optics-info/voltage")):
+        value = text(path)
+        if value:
+            data[key] = _hundredths(value)
+    return f"Optics{name[len('Optics'):].replace('/', '_')}", data
+
+
+def get_show_int_data(ip, username, password, interface=None, device=None):
+    """
+    Fetch the interface data of 'show int', or of a single interface, over NETCONF and parse the
+    XML reply as it streams in. Returns the same dict of ``InterfaceRecord`` as
+    ``network.int.get_show_int_data``. Raises ``CommandError`` if the request fails.
+    """
+    key = f"<interface-name>{escape(interface)}</interface-name>" if interface else ""
+    messages = netconf_get_messages(INTERFACES_FILTER.format(key=key))
+    with device_session(ip, username, password, device) as connection:
+        try:
+            chunks = iter_netconf_reply(connection.iter_netconf_chunks(f"interfaces {interface or '*'}", messages))
+            return dict(iter_xml_records(chunks, INTERFACE_NS, "interface", "interface-xr", _interface_record))
+        except CommandError:
+            raise
+        except Exception as e:
+            print(f"Error executing command: {str(e)}")
+            raise CommandError(str(e)) from e
+
+
+def get_show_optics_data(ip, username, password, location=None, device=None, port=None):
+    """
+    Fetch the optics data of 'show controllers optics *', or of the port at ``location``, over
+    NETCONF and parse the XML reply as it streams in. Returns the same dict as
+    ``network.controllers_optics.get_show_optics_data``, without the threshold and vendor
+    details. Raises ``CommandError`` if the request fails.
+    """
+    key = f"<name>Optics{escape(location)}</name>" if location else ""
+    messages = netconf_get_messages(OPTICS_FILTER.format(key=key))
+    with device_session(ip, username, password, device) as connection:
+        try:
+            chunks = iter_netconf_reply(connection.iter_netconf_chunks(f"optics {location or '*'}", messages))
+            data = dict(iter_xml_records(chunks, OPTICS_NS, "optics-port", "optics-ports", _optics_record))
+        except CommandError:
+            raise
+        except Exception as e:
+            print(f"Error executing command: {str(e)}")
+            raise CommandError(str(e)) from e
+    if port and port not in data:
+        data[port] = {}
+    return data
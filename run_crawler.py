@@ -4,34 +4,27 @@ from app.models.core_device import CoreDevice
 from app.models.crawler_cycle import CrawlerCycle
 from app.models.link import Link
 from app.repositories.link_repository import LinkRepository
-from crawler import LinkService
 from crawler.sync_repos.sync_coredevice_repo import CoreDeviceRepository
 from crawler.sync_repos.sync_crawler_cycle_repo import CrawlerCycleRepository
-from concurrent.futures import ProcessPoolExecutor
-from time import time
+from time import sleep, time
 
 from crawler.create_alerts import create_alerts
-from network.spectrum_container import get_spectrum_container_data
+from crawler.circuit_breaker import DeviceCircuitBreaker
+from crawler.change_detection import ChangeDetector
+from crawler.cycle import CycleContext
+from crawler.config import change_detection, crawl_interval, polling_mode
+from crawler.engine import CrawlEngine
+from crawler.polling import InterfaceDetailCache
+from crawler.rate_limit import CrawlRateLimiter
+from network.recording import start_recording
+from network.spectrum_container import SpectrumContainerIndex, get_spectrum_container_data
+from network.ssh_pool import SSHConnectionPool
 from network.trino_getip import create_connection_instance, get_all_int_ips
 
 
-def crawl_core_device(ip, username, password, coredevice_id, core_devices, int_ips, spectrum_container_data, count):
-    try:
-        link_service = LinkService(ip, username, password, coredevice_id, core_devices, int_ips,
-                                   spectrum_container_data, count)
-        link_service.process_links()
-        print(f"Crawler finished for core device with IP {ip}")
-    except Exception as e:
-        print(f"Error occurred for core device with IP {ip}: {str(e)}")
-
-
-def main():
+def main(connection_pool=None, rate_limiter=None, interface_cache=None, change_detector=None):
     core_device_repo = CoreDeviceRepository()
     core_devices = core_device_repo.get_coredevices()
-    db = create_connection_instance()
-
-    int_ips = get_all_int_ips(db)
-    spectrum_container_data = get_spectrum_container_data()
 
     crawler_cycle_repo = CrawlerCycleRepository()
     crawler_cycle = crawler_cycle_repo.get_crawler_cycle()
@@ -46,16 +39,16 @@ def main():
         crawler_cycle = new_cycle
 
     count = crawler_cycle.count
+    start_recording(count + 1)
 
-    with ProcessPoolExecutor(max_workers=10) as executor:
-        futures = []
-        for core_device in core_devices:
-            future = executor.submit(crawl_core_device, core_device.ip, '{username}', "{password}",
-                                     core_device.id, core_devices, int_ips, spectrum_container_data, count + 1)
-            futures.append(future)
+    # Only the indexes are kept for the cycle, not the inventory rows
+    context = CycleContext.build(count + 1, core_devices, get_all_int_ips(create_connection_instance()),
+                                 SpectrumContainerIndex.from_response(get_spectrum_container_data()))
 
-        for future in futures:
-            future.result()
+    engine = CrawlEngine('{username}', "{password}", connection_pool=connection_pool,
+                         circuit_breaker=DeviceCircuitBreaker.load(), rate_limiter=rate_limiter or CrawlRateLimiter(),
+                         interface_cache=interface_cache, change_detector=change_detector)
+    engine.run(core_devices, context)
 
     create_alerts(next(get_db()))
 
@@ -66,10 +59,29 @@ def main():
     print(f"Crawler cycle count: {count}")
 
 
-if __name__ == "__main__":
+def run_cycle(connection_pool=None, rate_limiter=None, interface_cache=None, change_detector=None):
     start_time = time()
 
-    main()
+    main(connection_pool, rate_limiter, interface_cache, change_detector)
 
     duration = time() - start_time
-    print(f"\n\nCrawler cycle duration: {round(duration)} seconds")
\ No newline at end of file
+    print(f"\n\nCrawler cycle duration: {round(duration)} seconds")
+
+
+if __name__ == "__main__":
+    if crawl_interval:
+        # Run continuously, keeping authenticated SSH sessions warm between cycles
+        connection_pool = SSHConnectionPool()
+        rate_limiter = CrawlRateLimiter()
+        # Interface detail is only cached between cycles of the same process
+        interface_cache = InterfaceDetailCache() if polling_mode == "two_phase" else None
+        change_detector = ChangeDetector() if change_detection else None
+        try:
+            while True:
+                connection_pool.evict_idle()
+                run_cycle(connection_pool, rate_limiter, interface_cache, change_detector)
+                sleep(crawl_interval)
+        finally:
+            connection_pool.close_all()
+    else:
+        run_cycle()
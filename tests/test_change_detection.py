@@ -0,0 +1,177 @@
+"""
+Tests of ``ChangeDetector`` and of copying unchanged links forward with
+``LinkRepository.copy_links``, on an in-memory SQLite database.
+"""
+from dataclasses import replace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base
+from app.models.core_device import CoreDevice
+from app.models.core_site import CoreSite
+from app.models.link import Link
+from app.models.site import Site
+from crawler import LinkService
+from crawler.change_detection import ChangeDetector
+from crawler.neighbors import NeighborIndex
+from crawler.sync_repos.sync_link_repo import LinkRepository
+from network import simulator
+from network.records import InterfaceRecord
+from network.spectrum_container import SpectrumContainerIndex
+
+NEIGHBOR_COMMANDS = ["sh cdp n d", "show ip ospf nei det", "show mpls ldp neighbor"]
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add(CoreSite(id=1, name="lab"))
+    session.add_all([
+        CoreDevice(id=1, name="sim-core-00001", ip="127.1.0.2", coresite_id=1),
+        CoreDevice(id=2, name="sim-core-00002", ip="127.1.0.3", coresite_id=1),
+        CoreDevice(id=3, name="sim-core-00000", ip="127.1.0.1", coresite_id=1),
+        Site(id=7, name="lab-north", topology="", description=""),
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+class CountingLinkRepository(LinkRepository):
+    """A ``LinkRepository`` that keeps the names of the links it created one by one."""
+
+    def __init__(self, db):
+        super().__init__(db)
+        self.created = []
+
+    def create_link(self, link, *args, **kwargs):
+        self.created.append(link.name)
+        return super().create_link(link, *args, **kwargs)
+
+
+def cycle_links(db, count):
+    """The links stored in crawler cycle ``count``, as (neighbor core device id, site id, neighbor IP) by name."""
+    links = db.query(Link).filter(Link.crawler_cycle == count).order_by(Link.name)
+    return {link.name: (link.neighbor_coredevice_id, link.neighbor_site_id, link.neighbor_ip) for link in links}
+
+
+@pytest.mark.parametrize("command", NEIGHBOR_COMMANDS)
+def test_output_hash_ignores_volatile_fields(captured_device, command):
+    output = captured_device.render(command)
+    # An hour and a half later, with timers, uptimes and counters moved on
+    simulator.time.time = lambda: 1_700_005_417
+    simulator.time.monotonic = lambda: simulator._STARTED_AT + 9125.2
+
+    later = captured_device.render(command)
+
+    assert later != output
+    assert ChangeDetector.output_hash(later.splitlines()) == ChangeDetector.output_hash(output.splitlines())
+
+
+@pytest.mark.parametrize("command, before, after", [
+    ("show ip ospf nei det", "State is FULL", "State is INIT"),
+    ("sh cdp n d", "Device ID: sim-core-00002", "Device ID: sim-core-00009"),
+    ("show mpls ldp neighbor", "State: Oper", "State: Non Existent"),
+])
+def test_output_hash_sees_neighbor_changes(captured_device, command, before, after):
+    output = captured_device.render(command)
+
+    changed = output.replace(before, after)
+
+    assert changed != output
+    assert ChangeDetector.output_hash(changed.splitlines()) != ChangeDetector.output_hash(output.splitlines())
+
+
+def test_parse_reuses_the_result_of_unchanged_output(captured_device):
+    change_detector = ChangeDetector()
+    parsed = []
+
+    def parse(lines):
+        parsed.append(lines)
+        return list(lines)
+
+    first = change_detector.parse("127.1.0.2", "sh cdp n d", captured_device.render("sh cdp n d").splitlines(), parse)
+    simulator.time.time = lambda: 1_700_000_017
+    again = change_detector.parse("127.1.0.2", "sh cdp n d", captured_device.render("sh cdp n d").splitlines(), parse)
+    other_device = change_detector.parse("127.1.0.3", "sh cdp n d", again, parse)
+
+    assert again is first
+    assert other_device is not first
+    assert len(parsed) == 2
+
+
+def test_link_hash_covers_the_record_and_its_neighbor_values():
+    link = InterfaceRecord("TenGigE0/0/0/0", physical_status="up", input_rate=0)
+
+    digest = ChangeDetector.link_hash(link, 2, "lab-north", "127.1.0.3")
+
+    assert ChangeDetector.link_hash(replace(link), 2, "lab-north", "127.1.0.3") == digest
+    assert ChangeDetector.link_hash(replace(link, input_rate=1), 2, "lab-north", "127.1.0.3") != digest
+    assert ChangeDetector.link_hash(link, 3, "lab-north", "127.1.0.3") != digest
+    assert ChangeDetector.link_hash(link, 2, None, "127.1.0.3") != digest
+
+
+def test_unchanged_links():
+    change_detector = ChangeDetector()
+    assert change_detector.unchanged_links(1, {"Te0": b"a"}) == (None, [])
+
+    change_detector.store_links(1, 5, {"Te0": b"a", "Te1": b"b", "Te2": b"c"})
+
+    assert change_detector.unchanged_links(1, {"Te0": b"a", "Te1": b"x", "Te3": b"d"}) == (5, ["Te0"])
+    assert change_detector.unchanged_links(2, {"Te0": b"a"}) == (None, [])
+
+
+def test_copy_links_copies_only_the_given_links_with_this_cycles_neighbors(db):
+    repository = LinkRepository(db)
+    for name in ["Te0", "Te1", "Te2", "Te3"]:
+        repository.create_link(InterfaceRecord(name, description="core"), 1, 5, neighbor_coredevice_id=2,
+                               neighbor_ip="127.1.0.3")
+
+    copied = repository.copy_links(1, {"Te0": (2, None, "127.1.0.3"), "Te1": (3, "lab-north", "127.1.0.1"),
+                                       "Te2": (None, "lab-south", None)}, 5, 6)
+
+    assert copied == {"Te0", "Te1"}
+    assert cycle_links(db, 6) == {"Te0": (2, None, "127.1.0.3"), "Te1": (3, 7, "127.1.0.1")}
+    assert db.query(Link).filter(Link.crawler_cycle == 6, Link.name == "Te1").one().description == "core"
+    assert len(cycle_links(db, 5)) == 4
+
+
+def test_copy_links_of_links_missing_from_the_previous_cycle(db):
+    repository = LinkRepository(db)
+
+    assert repository.copy_links(1, {}, 5, 6) == set()
+    assert repository.copy_links(1, {"Te0": (None, None, None)}, 5, 6) == set()
+    assert cycle_links(db, 6) == {}
+
+
+def test_save_to_database_copies_unchanged_links_forward(db):
+    change_detector = ChangeDetector()
+    neighbors = NeighborIndex([CoreDevice(id=2, ip="127.1.0.3")], [("127.1.0.3", "sim-core-00002", "10.0.0.6")])
+
+    def store(count, links):
+        service = LinkService("127.1.0.2", "crawler", "secret", 1, None, None,
+                              SpectrumContainerIndex(by_ip={"127.1.0.3": ("lab-north",)}), count,
+                              change_detector=change_detector, neighbors=neighbors)
+        service.link_repository = CountingLinkRepository(db)
+        service.links = {(link.name, 1): {"link": link, "coredevice_id": 1} for link in links}
+        service.save_to_database()
+        return service.link_repository.created
+
+    down = InterfaceRecord("TenGigE0/0/0/2", physical_status="down", description="spare", input_rate=0)
+    linked = InterfaceRecord("TenGigE0/0/0/0", physical_status="up", description="core", input_rate=0,
+                             ospf_interface_address="10.0.0.6")
+    busy = InterfaceRecord("TenGigE0/0/0/4", physical_status="up", description="edge", input_rate=100)
+    assert store(1, [down, linked, busy]) == ["TenGigE0/0/0/2", "TenGigE0/0/0/0", "TenGigE0/0/0/4"]
+    created = {name: link_id for name, link_id in db.query(Link.name, Link.id).filter(Link.crawler_cycle == 1)}
+
+    # Only the link whose rate moved is created again
+    assert store(2, [replace(down), replace(linked), replace(busy, input_rate=200)]) == ["TenGigE0/0/0/4"]
+    assert cycle_links(db, 2) == {"TenGigE0/0/0/0": (2, 7, "127.1.0.3"), "TenGigE0/0/0/2": (None, None, None),
+                                  "TenGigE0/0/0/4": (None, None, None)}
+    assert db.query(Link.input_rate).filter(Link.crawler_cycle == 2, Link.name == "TenGigE0/0/0/4").scalar() == "200"
+    # The copies are new rows of cycle 2
+    assert not set(created.values()) & {link_id for link_id, in db.query(Link.id).filter(Link.crawler_cycle == 2)}
@@ -0,0 +1,103 @@
+"""Tests of ``DeviceCircuitBreaker``'s backoff and the state it keeps between crawler runs."""
+import json
+
+from crawler.circuit_breaker import DeviceCircuitBreaker
+
+IP = "127.1.0.1"
+
+
+def skipped_cycles(circuit_breaker, cycle):
+    """Return the cycles after ``cycle`` the device is skipped in."""
+    skipped = []
+    while circuit_breaker.should_skip(IP, cycle + len(skipped) + 1):
+        skipped.append(cycle + len(skipped) + 1)
+    return skipped
+
+
+def test_unknown_device_is_not_skipped():
+    assert not DeviceCircuitBreaker(None).should_skip(IP, 1)
+
+
+def test_backoff_doubles_with_each_failure_up_to_the_maximum():
+    circuit_breaker = DeviceCircuitBreaker(None, base_cycles=1, max_cycles=4)
+    backoff = []
+    cycle = 1
+    for _ in range(5):
+        circuit_breaker.record_failure(IP, cycle)
+        skipped = skipped_cycles(circuit_breaker, cycle)
+        backoff.append(len(skipped))
+        # The device is tried again in the first cycle after its backoff
+        cycle = cycle + len(skipped) + 1
+
+    assert backoff == [1, 2, 4, 4, 4]
+
+
+def test_device_is_skipped_in_the_failed_cycle_too():
+    circuit_breaker = DeviceCircuitBreaker(None, base_cycles=2, max_cycles=8)
+
+    circuit_breaker.record_failure(IP, 5)
+
+    assert [circuit_breaker.should_skip(IP, cycle) for cycle in range(5, 10)] == [True, True, True, False, False]
+
+
+def test_success_resets_the_backoff():
+    circuit_breaker = DeviceCircuitBreaker(None, base_cycles=1, max_cycles=8)
+    circuit_breaker.record_failure(IP, 1)
+    circuit_breaker.record_failure(IP, 3)
+
+    circuit_breaker.record_success(IP)
+    circuit_breaker.record_failure(IP, 10)
+
+    assert skipped_cycles(circuit_breaker, 10) == [11]
+
+
+def test_backoff_survives_a_restart(tmp_path):
+    state_file = str(tmp_path / "circuit_breaker.json")
+    circuit_breaker = DeviceCircuitBreaker(state_file, base_cycles=1, max_cycles=8)
+    circuit_breaker.record_failure(IP, 1)
+    circuit_breaker.record_failure(IP, 3)
+    circuit_breaker.save()
+
+    restarted = DeviceCircuitBreaker.load(state_file)
+    restarted.base_cycles, restarted.max_cycles = 1, 8
+
+    assert restarted.devices == circuit_breaker.devices
+    assert json.loads((tmp_path / "circuit_breaker.json").read_text()) == {IP: {"failures": 2, "retry_cycle": 6}}
+    assert skipped_cycles(restarted, 3) == [4, 5]
+    # A third failure after the restart keeps doubling the backoff
+    restarted.record_failure(IP, 6)
+    assert skipped_cycles(restarted, 6) == [7, 8, 9, 10]
+
+
+def test_device_recovers_after_a_restart(tmp_path):
+    state_file = str(tmp_path / "circuit_breaker.json")
+    circuit_breaker = DeviceCircuitBreaker(state_file, base_cycles=1, max_cycles=8)
+    circuit_breaker.record_failure(IP, 1)
+    circuit_breaker.save()
+
+    restarted = DeviceCircuitBreaker.load(state_file)
+    assert not restarted.should_skip(IP, 3)
+    restarted.record_success(IP)
+    restarted.save()
+
+    assert DeviceCircuitBreaker.load(state_file).devices == {}
+
+
+def test_load_without_state(tmp_path):
+    assert DeviceCircuitBreaker.load(str(tmp_path / "missing.json")).devices == {}
+    assert DeviceCircuitBreaker.load(None).devices == {}
+
+
+def test_load_of_a_corrupt_state_file_starts_over(tmp_path, capsys):
+    state_file = tmp_path / "circuit_breaker.json"
+    state_file.write_text('{"127.1.0.1": {"failures"')
+
+    assert DeviceCircuitBreaker.load(str(state_file)).devices == {}
+    assert "Could not load circuit breaker state" in capsys.readouterr().out
+
+
+def test_save_without_state_file():
+    circuit_breaker = DeviceCircuitBreaker(None)
+    circuit_breaker.record_failure(IP, 1)
+
+    circuit_breaker.save()
@@ -0,0 +1,108 @@
+"""
+Parity tests of the 'show controllers optics' parser against the parser it replaced.
+
+fixtures/simulator/show_controllers_optics.txt is the output of the ``captured_device`` simulated
+router, and show_controllers_optics.json what the original parser returned for it when it was
+captured. The two differ on purpose in the threshold table and the transceiver vendor details,
+which the original parser read from the wrong lines (see
+``test_sections_are_read_from_each_ports_own_lines``).
+"""
+import json
+from pathlib import Path
+
+from network.controllers_optics import OPTICS_FIELDS, parse_show_optics_output
+
+FIXTURES = Path(__file__).parent / "fixtures" / "simulator"
+
+# Fields read over several lines, after a header line
+SECTIONS = ('threshold_values', 'transceiver_vendor_details')
+
+THRESHOLD_ROWS = {
+    "         Rx Power Threshold(dBm)         ":
+        {'high_alarm': "1.50", 'low_alarm': "14.40", 'high_warning': "0.50", 'low_warning': "10.40"},
+    "         Tx Power Threshold(dBm)         ":
+        {'high_alarm': "1.50", 'low_alarm': "8.20", 'high_warning': "0.50", 'low_warning': "7.20"},
+    "         LBC Threshold(mA)              ":
+        {'high_alarm': "70.00", 'low_alarm': "5.00", 'high_warning': "68.00", 'low_warning': "8.00"},
+    "         Temp. Threshold(celsius)       ":
+        {'high_alarm': "75.00", 'low_alarm': "5.00", 'high_warning': "70.00", 'low_warning': "0.00"},
+}
+
+
+def read_fixture(name):
+    return (FIXTURES / name).read_text()
+
+
+def vendor_details(serial_number):
+    return {
+        "         Optics type            ": "SFP+ 10G LR",
+        "         Name                   ": "CISCO-FINISAR",
+        "         OUI Number             ": "00.90.65",
+        "         Part Number            ": "FTLX1471D3BCL-CS",
+        "         Rev Number             ": "A",
+        "         Serial Number          ": serial_number,
+        "         PID                    ": "SFP-10G-LR",
+        "         VID                    ": "V03",
+        "         Date Code(yy/mm/dd)    ": "18/03/17",
+    }
+
+
+def test_fixture_is_the_simulator_output(captured_device):
+    assert captured_device.render("show controllers optics *") == read_fixture("show_controllers_optics.txt")
+
+
+def test_parse_show_optics_output_matches_the_legacy_parser():
+    legacy = json.loads(read_fixture("show_controllers_optics.json"))
+    conversions = {key: convert for _, key, _, convert in OPTICS_FIELDS}
+
+    data = parse_show_optics_output(read_fixture("show_controllers_optics.txt"))
+
+    assert list(data) == list(legacy)
+    for port, fields in data.items():
+        # Measurements are floats now, the legacy parser kept the strings
+        assert {key: value for key, value in fields.items() if key not in SECTIONS} == \
+            {key: conversions[key](value) for key, value in legacy[port].items() if key not in SECTIONS}
+        assert set(fields) == set(legacy[port])
+
+
+def test_sections_are_read_from_each_ports_own_lines():
+    # The legacy parser found the rows after a header with lines.index(line), which gives the first
+    # of the identical lines in the output, and then looked up each row it had read in turn: every
+    # port got the rows of the first port, and only every other one of them
+    legacy = json.loads(read_fixture("show_controllers_optics.json"))
+    assert legacy["Optics0_0_0_11"]['transceiver_vendor_details']["         Serial Number          "] == \
+        "FNS00001000"
+    assert len(legacy["Optics0_0_0_11"]['threshold_values']) == 2
+
+    data = parse_show_optics_output(read_fixture("show_controllers_optics.txt"))
+
+    for port in range(12):
+        fields = data[f"Optics0_0_0_{port}"]
+        assert fields['threshold_values'] == THRESHOLD_ROWS
+        assert fields['transceiver_vendor_details'] == vendor_details(f"FNS0000{1000 + port}")
+
+
+def test_parse_show_optics_output_of_a_single_port(captured_device):
+    output = captured_device.render("show controllers optics 0/0/0/10")
+
+    data = parse_show_optics_output(output, port="Optics0_0_0_10")
+
+    whole = parse_show_optics_output(read_fixture("show_controllers_optics.txt"))
+    assert data == {"Optics0_0_0_10": whole["Optics0_0_0_10"]}
+
+
+def test_a_port_line_closes_an_open_section():
+    output = (
+        " Port: Optics0_0_0_0\n"
+        "         Form Factor            : SFP+\n"
+        "         Name                   : CISCO-FINISAR\n"
+        " Port: Optics0_0_0_1\n"
+        " Controller State: Down\n"
+    )
+
+    data = parse_show_optics_output(output)
+
+    assert data["Optics0_0_0_0"]['transceiver_vendor_details'] == {
+        "         Name                   ": "CISCO-FINISAR",
+    }
+    assert data["Optics0_0_0_1"] == {'controller_state': "Down"}
@@ -0,0 +1,33 @@
+"""Tests of ``CycleContext``, the data a crawl cycle's devices share."""
+from types import SimpleNamespace
+
+from crawler import LinkService
+from crawler.cycle import CycleContext
+from network.spectrum_container import SpectrumContainerIndex
+
+CORE_DEVICES = [SimpleNamespace(id=1, ip="127.1.0.1"), SimpleNamespace(id=3, ip="127.1.0.3")]
+INT_IPS = [("127.1.0.3", "sim-core-00002", "10.0.0.6"), ("127.1.0.1", "sim-core-00000", "10.0.0.1")]
+
+
+def test_build_indexes_the_cycle_data():
+    spectrum_containers = SpectrumContainerIndex(by_ip={"127.1.0.3": ("lab-north",)})
+
+    context = CycleContext.build(7, CORE_DEVICES, INT_IPS, spectrum_containers)
+
+    assert context.count == 7
+    assert context.spectrum_containers is spectrum_containers
+    assert context.neighbors.neighbor_ip("10.0.0.6") == "127.1.0.3"
+    assert context.neighbors.coredevice_id("127.1.0.3") == 3
+    assert not hasattr(context, "core_devices") and not hasattr(context, "int_ips")
+
+
+def test_link_services_share_the_cycle_indexes():
+    context = CycleContext.build(7, CORE_DEVICES, INT_IPS, SpectrumContainerIndex())
+
+    # The crawl engine hands a device only the indexes, not the rows they were built from
+    services = [LinkService(ip, "crawler", "secret", coredevice_id, None, None, context.spectrum_containers,
+                            context.count, neighbors=context.neighbors)
+                for coredevice_id, ip in [(1, "127.1.0.1"), (3, "127.1.0.3")]]
+
+    assert all(service.neighbors is context.neighbors for service in services)
+    assert services[0].neighbors.neighbor_ip("10.0.0.1") == "127.1.0.1"
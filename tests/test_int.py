@@ -0,0 +1,139 @@
+"""
+Parity tests of the 'show int' parser against the parser it replaced.
+
+fixtures/simulator/show_int.txt is the output of the ``captured_device`` simulated router, and
+show_int.json what the original regex-per-line parser returned for it, as strings, when it was
+captured.
+"""
+import json
+from pathlib import Path
+
+import pytest
+
+from network.int import merge_show_int_chunks, parse_show_int_chunk, parse_show_int_output, split_show_int_output
+from network.records import RECORD_FIELDS
+
+FIXTURES = Path(__file__).parent / "fixtures" / "simulator"
+
+
+def read_fixture(name):
+    return (FIXTURES / name).read_text()
+
+
+def legacy_columns(data):
+    """The legacy parser's fields of an interface as ``InterfaceRecord.columns`` gives them."""
+    return {field: data.get(field, "") for field in RECORD_FIELDS}
+
+
+def test_fixture_is_the_simulator_output(captured_device):
+    assert captured_device.render("show int") == read_fixture("show_int.txt")
+
+
+def test_parse_show_int_output_matches_the_legacy_parser():
+    legacy = json.loads(read_fixture("show_int.json"))
+
+    records = parse_show_int_output(read_fixture("show_int.txt"))
+
+    assert list(records) == list(legacy)
+    for name, record in records.items():
+        assert record.name == name
+        assert {field: value for field, value in record.columns().items() if field != "name"} == \
+            legacy_columns(legacy[name])
+
+
+def test_parse_show_int_output_of_an_up_interface():
+    record = parse_show_int_output(read_fixture("show_int.txt"))["TenGigE0/0/0/0"]
+
+    assert record.physical_status == "up"
+    assert record.protocol_status == "up"
+    assert record.description == "to-sim-core-00002"
+    assert record.interface_ip == "10.0.0.5"
+    assert record.media_type == "10GBASE-LR"
+    assert record.mtu == 9216
+    assert record.bw == 10000000
+    assert record.input_rate == 926605074
+    assert record.output_rate == 143145364
+    assert record.input_errors == 86
+    assert record.output_errors == 7
+    assert record.crc == 7
+
+
+@pytest.mark.parametrize("output, expected", [
+    # An explicit media type wins over the one of the duplex line
+    ("Gi0/0/0/0 is up, line protocol is up\n  Full-duplex, 1000Mb/s, 1000BASE-SX, link type is force-up\n"
+     "  media type is SFP,\n", "SFP"),
+    ("Gi0/0/0/0 is up, line protocol is up\n  Full-duplex, 1000Mb/s, 1000BASE-SX, link type is force-up\n",
+     "1000BASE-SX"),
+    ("Gi0/0/0/0 is up, line protocol is up\n  Full-duplex, 1000Mb/s, link type is force-up\n", None),
+])
+def test_parse_show_int_output_media_type(output, expected):
+    assert parse_show_int_output(output)["Gi0/0/0/0"].media_type == expected
+
+
+def test_parse_show_int_output_keeps_reading_into_the_current_interface_on_a_repeated_header():
+    output = (
+        "Gi0/0/0/0 is up, line protocol is up\n"
+        "  MTU 1514 bytes, BW 1000000 Kbit\n"
+        "Gi0/0/0/1 is down, line protocol is down\n"
+        "  MTU 9216 bytes, BW 1000000 Kbit\n"
+        "Gi0/0/0/0 is up, line protocol is up\n"
+        "  MTU 4470 bytes, BW 1000000 Kbit\n"
+    )
+
+    records = parse_show_int_output(output)
+
+    assert list(records) == ["Gi0/0/0/0", "Gi0/0/0/1"]
+    assert records["Gi0/0/0/0"].mtu == 1514
+    assert records["Gi0/0/0/1"].physical_status == "up"
+    assert records["Gi0/0/0/1"].mtu == 4470
+
+
+def parse_in_chunks(output, chunk_size):
+    return merge_show_int_chunks(parse_show_int_chunk(chunk) for chunk in split_show_int_output(output, chunk_size))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 100, 1000, 5000, 1 << 20])
+def test_parsing_in_chunks_matches_parsing_the_whole_output(chunk_size):
+    output = read_fixture("show_int.txt")
+
+    assert parse_in_chunks(output, chunk_size) == parse_show_int_output(output)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 1000])
+def test_split_show_int_output_splits_at_interface_headers(chunk_size):
+    output = read_fixture("show_int.txt")
+
+    chunks = split_show_int_output(output, chunk_size)
+
+    assert "".join(chunks) == output
+    assert all(len(chunk) >= chunk_size for chunk in chunks[:-1])
+    for chunk in chunks[1:]:
+        assert parse_show_int_chunk(chunk)[0][0] == chunk.split()[0]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 60, 120])
+def test_parsing_in_chunks_keeps_reading_into_the_current_interface_on_a_repeated_header(chunk_size):
+    output = (
+        "Gi0/0/0/0 is up, line protocol is up\n"
+        "  MTU 1514 bytes, BW 1000000 Kbit\n"
+        "Gi0/0/0/1 is down, line protocol is down\n"
+        "  MTU 9216 bytes, BW 1000000 Kbit\n"
+        "Gi0/0/0/0 is up, line protocol is up\n"
+        "  MTU 4470 bytes, BW 1000000 Kbit\n"
+        "Gi0/0/0/2 is up, line protocol is up\n"
+    )
+
+    assert parse_in_chunks(output, chunk_size) == parse_show_int_output(output)
+
+
+def test_split_show_int_output_only_splits_at_headers_the_parser_sees():
+    # The chunk pattern takes lines between "\n"s, so it finds this whole line as a header, but the
+    # parser also breaks lines at "\r" and reads one that starts with "  Last input": no split there
+    output = (
+        "Gi0/0/0/0 is up, line protocol is up\n"
+        "  MTU 1514 bytes\n"
+        "  Last input never\rGi0/0/0/1 is down, line protocol is down\n"
+        "  MTU 9216 bytes\n"
+    )
+
+    assert split_show_int_output(output, 10) == [output]
@@ -0,0 +1,69 @@
+"""Tests of the interface name forms the crawler's commands are joined on."""
+import pytest
+
+from network.interface_names import (
+    InterfaceIndex,
+    canonical_interface_name,
+    expand_interface_name,
+    interface_location,
+    location_numbers,
+)
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("Te0/0/0/1", "TenGigE0/0/0/1"),
+    ("Te0/0/0/1.100", "TenGigE0/0/0/1.100"),
+    ("Hu0/0/0/1", "HundredGigE0/0/0/1"),
+    ("BE10", "Bundle-Ether10"),
+    ("BE10.200", "Bundle-Ether10.200"),
+    ("Mg0/RP0/CPU0/0", "MgmtEth0/RP0/CPU0/0"),
+    ("TenGigE0/0/0/1", "TenGigE0/0/0/1"),
+    ("Bundle-Ether10", "Bundle-Ether10"),
+    ("Xy0/0/0/1", "Xy0/0/0/1"),
+    ("Null", "Null"),
+])
+def test_expand_interface_name(name, expected):
+    assert expand_interface_name(name) == expected
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("TenGigE0/0/0/1", "0/0/0/1"),
+    ("HundredGigE0/1/0/11", "0/1/0/11"),
+    ("Te0/0/0/1", "0/0/0/1"),
+    ("TenGigE0/0/0/1.100", None),
+    ("Bundle-Ether10", None),
+    ("Loopback0", None),
+])
+def test_interface_location(name, expected):
+    assert interface_location(name) == expected
+
+
+@pytest.mark.parametrize("name", [" Te0/0/0/1", "Te0/0/0/1 ", "TenGigE0/0/0/1", "  TenGigE0/0/0/1"])
+def test_canonical_interface_name(name):
+    assert canonical_interface_name(name) == "TenGigE0/0/0/1"
+
+
+def test_location_numbers():
+    assert location_numbers("0/0/0/11") == location_numbers("0_0_0_11") == (0, 0, 0, 11)
+
+
+def test_interface_index_names():
+    index = InterfaceIndex(["TenGigE0/0/0/0", "TenGigE0/0/0/0.1", "HundredGigE0/0/0/1"])
+
+    assert index.name("Te0/0/0/0") == "TenGigE0/0/0/0"
+    assert index.name("Te0/0/0/0.1") == "TenGigE0/0/0/0.1"
+    assert index.name(" HundredGigE0/0/0/1") == "HundredGigE0/0/0/1"
+    # Interfaces 'show int' did not list keep their canonical name
+    assert index.name("Te0/0/0/9") == "TenGigE0/0/0/9"
+
+
+def test_interface_index_optics_interface():
+    index = InterfaceIndex(["TenGigE0/0/0/1", "TenGigE0/0/0/1.1", "TenGigE0/0/0/10", "HundredGigE0/0/0/11",
+                            "Bundle-Ether1"])
+
+    assert index.optics_interface("Optics0_0_0_1") == "TenGigE0/0/0/1"
+    # Ports 10 and up are told apart from subinterfaces of port 1, and found
+    assert index.optics_interface("Optics0_0_0_10") == "TenGigE0/0/0/10"
+    assert index.optics_interface("Optics0_0_0_11") == "HundredGigE0/0/0/11"
+    assert index.optics_interface("Optics0_0_0_2") is None
+    assert index.optics_interface("Optics") is None
@@ -0,0 +1,137 @@
+"""
+Tests of how ``LinkService`` turns a device's parsed command outputs into links.
+
+fixtures/simulator/links.json is what the crawler's original ``sort_and_create_links`` built
+from the legacy parsers' results beside it (the .json file of each captured output), as the
+columns of each ``LinkCreate``, when the outputs were captured.
+"""
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+from crawler import LinkService
+from crawler.neighbors import NeighborIndex
+from network.controllers_optics import parse_show_optics_output
+from network.int import parse_show_int_output
+from network.records import InterfaceRecord
+from network.spectrum_container import SpectrumContainerIndex
+
+FIXTURES = Path(__file__).parent / "fixtures" / "simulator"
+
+
+def read_fixture(name):
+    return (FIXTURES / name).read_text()
+
+
+def link_service(show_int_data=None, show_optics_data=None, cdp_devices=(), ospf_neighbors=(),
+                 mpls_ldp_neighbors=()):
+    service = LinkService("127.1.0.2", "crawler", "secret", 1, [], [], None, 1)
+    service.show_int_data = show_int_data or {}
+    service.show_optics_data = show_optics_data or {}
+    service.cdp_devices = list(cdp_devices)
+    service.ospf_neighbors = list(ospf_neighbors)
+    service.mpls_ldp_neighbors = list(mpls_ldp_neighbors)
+    return service
+
+
+def captured_link_service():
+    return link_service(
+        show_int_data=parse_show_int_output(read_fixture("show_int.txt")),
+        show_optics_data=parse_show_optics_output(read_fixture("show_controllers_optics.txt")),
+        cdp_devices=json.loads(read_fixture("show_cdp_neighbors_detail.json")),
+        ospf_neighbors=json.loads(read_fixture("show_ospf_neighbors_detail.json")),
+        mpls_ldp_neighbors=json.loads(read_fixture("show_mpls_ldp_neighbor.json")),
+    )
+
+
+def link_columns(service):
+    return {value["link"].name: value["link"].columns() for value in service.links.values()}
+
+
+def test_sort_and_create_links_matches_the_legacy_links():
+    legacy = json.loads(read_fixture("links.json"))
+    service = captured_link_service()
+
+    service.sort_and_create_links()
+
+    links = link_columns(service)
+    assert list(links) == list(legacy)
+    for name, columns in links.items():
+        if name in ("TenGigE0/0/0/10", "HundredGigE0/0/0/11"):
+            continue
+        assert columns == legacy[name]
+
+
+def test_optics_of_ports_10_and_up_are_joined_onto_their_interface():
+    # The legacy lookup compared the port's numbers with the interface name's digits one by one,
+    # so "Optics0_0_0_10" never matched "TenGigE0/0/0/10" and those links had no powers
+    legacy = json.loads(read_fixture("links.json"))
+    assert (legacy["TenGigE0/0/0/10"]["tx"], legacy["TenGigE0/0/0/10"]["rx"]) == ("", "")
+    service = captured_link_service()
+
+    service.sort_and_create_links()
+
+    links = link_columns(service)
+    assert (links["TenGigE0/0/0/10"]["tx"], links["TenGigE0/0/0/10"]["rx"]) == ("-0.66", "-4.62")
+    assert (links["HundredGigE0/0/0/11"]["tx"], links["HundredGigE0/0/0/11"]["rx"]) == ("-1.71", "-6.58")
+    for name in ("TenGigE0/0/0/10", "HundredGigE0/0/0/11"):
+        assert dict(links[name], tx="", rx="") == legacy[name]
+
+
+def test_commands_spelling_an_interface_differently_merge_into_one_link():
+    service = link_service(
+        show_int_data={"TenGigE0/0/0/0": InterfaceRecord("TenGigE0/0/0/0", physical_status="up", mtu=9216)},
+        show_optics_data={"Optics0_0_0_0": {'actual_tx_power': -1.5, 'rx_power': -3.25}},
+        cdp_devices=[{"device_id": "pe1", "interface": "Te0/0/0/0"}],
+        ospf_neighbors=[{"interface": "Te0/0/0/0 ", "state": "FULL", "interface_address": "10.0.0.2"}],
+        mpls_ldp_neighbors=[{"ldp_discovery_sources": ["Te0/0/0/0"]}],
+    )
+
+    service.sort_and_create_links()
+
+    assert list(service.links) == [("TenGigE0/0/0/0", 1)]
+    assert service.links[("TenGigE0/0/0/0", 1)]["link"] == InterfaceRecord(
+        "TenGigE0/0/0/0", physical_status="up", mtu=9216, cdp="pe1", tx=-1.5, rx=-3.25, interface_ip="",
+        ospf="FULL", ospf_interface_address="10.0.0.2", mpls_ldp="up")
+
+
+def test_links_are_built_from_copies_of_the_show_int_records():
+    record = InterfaceRecord("TenGigE0/0/0/0", description="core")
+    service = link_service(show_int_data={"TenGigE0/0/0/0": record},
+                           ospf_neighbors=[{"interface": "TenGigE0/0/0/0", "state": "FULL",
+                                            "interface_address": "10.0.0.2"}])
+
+    service.sort_and_create_links()
+
+    assert service.links[("TenGigE0/0/0/0", 1)]["link"].ospf == "FULL"
+    assert record == InterfaceRecord("TenGigE0/0/0/0", description="core")
+
+
+class RecordingLinkRepository:
+    """Stands in for ``LinkRepository``, keeping the links it is asked to create."""
+
+    def __init__(self):
+        self.created = {}
+
+    def create_link(self, link, coredevice_id, count, neighbor_coredevice_id=None, container_name=None,
+                    neighbor_ip=None):
+        self.created[link.name] = (neighbor_coredevice_id, container_name, neighbor_ip)
+        return link
+
+
+def test_save_to_database_resolves_ospf_neighbors_through_the_cycle_indexes():
+    service = captured_link_service()
+    service.neighbors = NeighborIndex(
+        [SimpleNamespace(id=1, ip="127.1.0.1"), SimpleNamespace(id=3, ip="127.1.0.3")],
+        [("127.1.0.3", "sim-core-00002", "10.0.0.6"), ("127.1.0.1", "sim-core-00000", "10.0.0.1")])
+    service.spectrum_containers = SpectrumContainerIndex(by_ip={"127.1.0.3": ("lab-north",)})
+    service.link_repository = RecordingLinkRepository()
+    service.sort_and_create_links()
+
+    service.save_to_database()
+
+    created = service.link_repository.created
+    assert list(created) == list(link_columns(service))
+    assert created["TenGigE0/0/0/0"] == (3, "lab-north", "127.1.0.3")
+    assert created["HundredGigE0/0/0/1"] == (1, None, "127.1.0.1")
+    assert created["TenGigE0/0/0/2"] == (None, None, None)
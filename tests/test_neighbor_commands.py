@@ -0,0 +1,78 @@
+"""
+Parity tests of the CDP, OSPF and MPLS LDP neighbor parsers against the parsers they replaced.
+
+The outputs under fixtures/simulator are the ``captured_device`` simulated router's, and the
+.json file beside each is what the original parser returned for it when it was captured,
+including its quirks: the LLS options line also sets ``options``, and the text before the first
+LDP peer gives an empty neighbor.
+"""
+import json
+from pathlib import Path
+
+import pytest
+
+from network.cdp import parse_cdp_devices
+from network.mpls_ldp import parse_mpls_ldp_neighbors
+from network.ospf import parse_ospf_neighbors
+
+FIXTURES = Path(__file__).parent / "fixtures" / "simulator"
+
+COMMANDS = [
+    ("sh cdp n d", "show_cdp_neighbors_detail", parse_cdp_devices),
+    ("show ip ospf nei det", "show_ospf_neighbors_detail", parse_ospf_neighbors),
+    ("show mpls ldp neighbor", "show_mpls_ldp_neighbor", parse_mpls_ldp_neighbors),
+]
+
+
+def read_fixture(name):
+    return (FIXTURES / name).read_text()
+
+
+@pytest.mark.parametrize("command, name, parse", COMMANDS)
+def test_fixture_is_the_simulator_output(captured_device, command, name, parse):
+    assert captured_device.render(command) == read_fixture(f"{name}.txt")
+
+
+@pytest.mark.parametrize("command, name, parse", COMMANDS)
+def test_parser_matches_the_legacy_parser(command, name, parse):
+    assert parse(read_fixture(f"{name}.txt")) == json.loads(read_fixture(f"{name}.json"))
+
+
+@pytest.mark.parametrize("parse", [parse_cdp_devices, parse_ospf_neighbors])
+def test_parser_of_empty_output(parse):
+    assert parse("") == []
+
+
+def test_parse_cdp_devices():
+    devices = parse_cdp_devices(read_fixture("show_cdp_neighbors_detail.txt"))
+
+    assert devices == [
+        {'device_id': "sim-core-00002", 'ipv4_address': "10.0.0.6", 'platform': "cisco ASR9K Series",
+         'interface': "TenGigE0/0/0/0", 'port_id': "HundredGigE0/0/0/1"},
+        {'device_id': "sim-core-00000", 'ipv4_address': "10.0.0.1", 'platform': "cisco ASR9K Series",
+         'interface': "HundredGigE0/0/0/1", 'port_id': "TenGigE0/0/0/0"},
+    ]
+
+
+def test_parse_ospf_neighbors():
+    neighbors = parse_ospf_neighbors(read_fixture("show_ospf_neighbors_detail.txt"))
+
+    assert [(neighbor['neighbor_id'], neighbor['interface_address'], neighbor['interface'], neighbor['state'])
+            for neighbor in neighbors] == [
+        ("127.1.0.3", "10.0.0.6", "TenGigE0/0/0/0", "FULL"),
+        ("127.1.0.1", "10.0.0.1", "HundredGigE0/0/0/1", "FULL"),
+    ]
+    assert neighbors[0]['priority'] == 1
+    assert neighbors[0]['state_changes'] == 6
+
+
+def test_parse_mpls_ldp_neighbors():
+    neighbors = parse_mpls_ldp_neighbors(read_fixture("show_mpls_ldp_neighbor.txt"))
+
+    assert [(neighbor.get('ldp_identifier'), neighbor['ldp_discovery_sources'], neighbor['addresses'])
+            for neighbor in neighbors] == [
+        (None, [], []),
+        ("127.1.0.3", ["TenGigE0/0/0/0"], ["127.1.0.3", "10.0.0.6"]),
+        ("127.1.0.1", ["HundredGigE0/0/0/1"], ["127.1.0.1", "10.0.0.1"]),
+    ]
+    assert neighbors[1]['state'] == "Oper"
@@ -0,0 +1,71 @@
+"""
+Tests of ``NeighborIndex`` against the linear scans ``LinkService.save_to_database`` used to
+resolve a link's OSPF neighbor with: the first matching inventory row and core device win.
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from crawler.neighbors import NeighborIndex
+
+CORE_DEVICES = [
+    SimpleNamespace(id=1, ip="127.1.0.1"),
+    SimpleNamespace(id=2, ip="127.1.0.2"),
+    SimpleNamespace(id=3, ip="127.1.0.3"),
+    # A device listed twice, as a re-added device may be
+    SimpleNamespace(id=4, ip="127.1.0.3"),
+]
+
+# (ipv4, device_id, int_ip), newest first
+INT_IPS = [
+    ("127.1.0.3", "sim-core-00002", "10.0.0.6"),
+    ("127.1.0.1", "sim-core-00000", "10.0.0.1"),
+    ("127.1.0.9", "sim-core-00009", "10.0.0.1"),
+    ("192.0.2.1", "pe1", "10.9.0.1"),
+]
+
+
+def legacy_neighbor(interface_address, core_devices, int_ips):
+    """The neighbor IP and core device id as ``save_to_database`` looked them up before the index."""
+    neighbor_ip = None
+    neighbor_coredevice_id = None
+    filtered_neighbor_ips = list(filter(lambda ip: ip[2] == interface_address, int_ips))
+    if len(filtered_neighbor_ips) > 0:
+        neighbor_ip = filtered_neighbor_ips[0][0]
+    filtered_coredevices = list(filter(lambda device: device.ip == neighbor_ip, core_devices))
+    if len(filtered_coredevices) > 0:
+        neighbor_coredevice_id = filtered_coredevices[0].id
+    return neighbor_ip, neighbor_coredevice_id
+
+
+@pytest.mark.parametrize("interface_address", ["10.0.0.6", "10.0.0.1", "10.9.0.1", "10.0.0.2", ""])
+def test_neighbor_index_matches_the_linear_scans(interface_address):
+    index = NeighborIndex(CORE_DEVICES, INT_IPS)
+
+    neighbor_ip = index.neighbor_ip(interface_address)
+
+    assert (neighbor_ip, index.coredevice_id(neighbor_ip)) == \
+        legacy_neighbor(interface_address, CORE_DEVICES, INT_IPS)
+
+
+def test_neighbor_index_resolves_to_the_first_rows():
+    index = NeighborIndex(CORE_DEVICES, INT_IPS)
+
+    assert index.neighbor_ip("10.0.0.1") == "127.1.0.1"
+    assert index.coredevice_id("127.1.0.3") == 3
+
+
+def test_neighbor_index_of_unknown_addresses():
+    index = NeighborIndex(CORE_DEVICES, INT_IPS)
+
+    assert index.neighbor_ip("10.0.0.2") is None
+    # A neighbor in the inventory that is not a core device
+    assert index.coredevice_id("192.0.2.1") is None
+    assert index.coredevice_id(None) is None
+
+
+def test_neighbor_index_of_an_empty_inventory():
+    index = NeighborIndex([], [])
+
+    assert index.neighbor_ip("10.0.0.6") is None
+    assert index.coredevice_id("127.1.0.3") is None
@@ -0,0 +1,100 @@
+"""Tests of the per-device command token buckets."""
+import threading
+import time
+
+import pytest
+
+from crawler import rate_limit
+from crawler.rate_limit import CrawlRateLimiter, TokenBucket
+
+
+class FakeClock:
+    """A monotonic clock that only moves when the rate limiter sleeps, or a test advances it."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit, "time", clock)
+    return clock
+
+
+def acquire_times(bucket, clock, count):
+    times = []
+    for _ in range(count):
+        bucket.acquire()
+        times.append(clock.now - 1000.0)
+    return times
+
+
+def test_burst_is_taken_at_once_then_tokens_come_at_the_rate(clock):
+    bucket = TokenBucket(rate=4, capacity=3)
+
+    assert acquire_times(bucket, clock, 6) == pytest.approx([0, 0, 0, 0.25, 0.5, 0.75])
+
+
+def test_tokens_refill_while_idle_up_to_the_capacity(clock):
+    bucket = TokenBucket(rate=2, capacity=2)
+    acquire_times(bucket, clock, 2)
+
+    clock.now += 0.5
+    bucket.acquire()
+    assert clock.sleeps == []
+
+    clock.now += 60
+    assert acquire_times(bucket, clock, 3) == pytest.approx([60.5, 60.5, 61.0])
+
+
+def test_partial_refill_waits_only_for_the_rest_of_a_token(clock):
+    bucket = TokenBucket(rate=10, capacity=1)
+    bucket.acquire()
+
+    clock.now += 0.06
+    bucket.acquire()
+
+    assert clock.sleeps == pytest.approx([0.04])
+
+
+def test_capacity_is_at_least_one_token(clock):
+    bucket = TokenBucket(rate=1, capacity=0)
+
+    assert acquire_times(bucket, clock, 2) == pytest.approx([0, 1])
+
+
+def test_threads_share_the_rate():
+    bucket = TokenBucket(rate=50, capacity=1)
+    started = time.monotonic()
+
+    threads = [threading.Thread(target=bucket.acquire) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # One token at once, then five at 50 per second
+    assert time.monotonic() - started >= 5 / 50 - 0.01
+
+
+def test_command_bucket_is_kept_per_device():
+    limiter = CrawlRateLimiter(commands_per_second=5, command_burst=2)
+
+    bucket = limiter.command_bucket("127.1.0.1")
+
+    assert limiter.command_bucket("127.1.0.1") is bucket
+    assert limiter.command_bucket("127.1.0.2") is not bucket
+    assert (bucket.rate, bucket.capacity) == (5, 2)
+
+
+def test_commands_are_not_limited_without_a_rate():
+    assert CrawlRateLimiter(commands_per_second=0).command_bucket("127.1.0.1") is None
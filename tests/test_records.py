@@ -0,0 +1,84 @@
+"""
+Tests of ``InterfaceRecord``, which carries an interface through the crawler in place of the
+string-valued ``LinkCreate`` the crawler used to build.
+"""
+import json
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+from app.schemas.link import LinkCreate
+from network.controllers_optics import parse_show_optics_output
+from network.records import RECORD_FIELDS, InterfaceRecord
+
+FIXTURES = Path(__file__).parent / "fixtures" / "simulator"
+
+
+def read_fixture(name):
+    return (FIXTURES / name).read_text()
+
+
+def test_record_fields_are_the_link_columns():
+    assert ("name",) + RECORD_FIELDS == tuple(LinkCreate.model_fields)
+
+
+def test_record_has_slots():
+    record = InterfaceRecord("Te0/0/0/0")
+
+    assert not hasattr(record, "__dict__")
+    with pytest.raises(AttributeError):
+        record.speed = 10
+
+
+def test_columns_of_an_empty_record():
+    assert InterfaceRecord("Te0/0/0/0").columns() == dict({field: "" for field in RECORD_FIELDS}, name="Te0/0/0/0")
+
+
+def test_columns_are_strings():
+    record = InterfaceRecord("Te0/0/0/0", physical_status="up", bw=10000000, mtu=9216, input_rate=0, tx=-1.5,
+                             rx=-40.0, interface_ip="")
+
+    columns = record.columns()
+
+    assert LinkCreate(**columns).model_dump() == columns
+    assert columns["physical_status"] == "up"
+    assert columns["bw"] == "10000000"
+    assert columns["mtu"] == "9216"
+    assert columns["input_rate"] == "0"
+    assert columns["tx"] == "-1.50"
+    assert columns["rx"] == "-40.00"
+    assert columns["interface_ip"] == ""
+    assert columns["crc"] == ""
+
+
+def test_optics_powers_are_written_as_the_device_printed_them():
+    # The crawler used to store the optics parser's strings; the simulator, like IOS-XR, prints
+    # two decimals, which is how the float powers are written back
+    legacy = json.loads(read_fixture("show_controllers_optics.json"))
+
+    data = parse_show_optics_output(read_fixture("show_controllers_optics.txt"))
+
+    for port, fields in data.items():
+        record = InterfaceRecord(port, tx=fields['actual_tx_power'], rx=fields['rx_power'])
+        assert (record.columns()["tx"], record.columns()["rx"]) == \
+            (legacy[port]['actual_tx_power'], legacy[port]['rx_power'])
+
+
+def test_update_copies_only_the_fields_found():
+    record = InterfaceRecord("Te0/0/0/0", physical_status="up", mtu=1514, description="core")
+    later = InterfaceRecord("Te0/0/0/0", physical_status="down", mtu=9216, crc=0)
+
+    record.update(later)
+
+    assert record == InterfaceRecord("Te0/0/0/0", physical_status="down", mtu=9216, description="core", crc=0)
+
+
+def test_replace_copies_a_record():
+    record = InterfaceRecord("Te0/0/0/0", mtu=1514)
+
+    copy = replace(record, cdp="pe1")
+    copy.mtu = 9216
+
+    assert record == InterfaceRecord("Te0/0/0/0", mtu=1514)
+    assert copy == InterfaceRecord("Te0/0/0/0", mtu=9216, cdp="pe1")
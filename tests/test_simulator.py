@@ -0,0 +1,117 @@
+"""
+End-to-end tests of the crawler's fetch path against ``network.simulator``: a fleet of simulated
+routers is served over SSH on loopback addresses and ``LinkService`` fetches it like real devices.
+"""
+import functools
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import crawler
+from network import simulator
+from crawler import LinkService
+from crawler.pipeline import STAGED_COMMANDS, parse_outputs
+from crawler.polling import InterfaceDetailCache
+from network.paramiko_connection_CiscoDevices import create_device
+from network.simulator import SimulatedFleet
+
+USERNAME = "crawler"
+PASSWORD = "secret"
+
+
+@pytest.fixture(scope="module")
+def fleet():
+    with SimulatedFleet(devices=3, port=0, interfaces=4, subinterfaces=1, username=USERNAME,
+                        password=PASSWORD) as fleet:
+        yield fleet
+
+
+@pytest.fixture(autouse=True)
+def fleet_port(fleet, monkeypatch):
+    monkeypatch.setattr(crawler, "create_device", functools.partial(create_device, port=fleet.port))
+
+
+@pytest.fixture(autouse=True)
+def frozen_clock(monkeypatch):
+    # Neighbor timers and counters move between polls; stop them so two renders print the same
+    clock = SimpleNamespace(time=lambda: 1_700_000_000, monotonic=lambda: simulator._STARTED_AT + 3725,
+                            sleep=time.sleep)
+    monkeypatch.setattr(simulator, "time", clock)
+
+
+def link_service(ip, **kwargs):
+    return LinkService(ip, USERNAME, PASSWORD, 1, [], [], None, 1, **kwargs)
+
+
+def rendered(fleet, ip):
+    """Parse the output the device renders for each staged command, as the parse stage would."""
+    device = fleet.devices[ip]
+    return parse_outputs({name: device.render(command).encode("utf-8")
+                          for name, (command, _, _) in STAGED_COMMANDS.items()})
+
+
+def test_simulator_listens_only_on_the_device_addresses(fleet):
+    assert sorted(listener.getsockname() for listener in fleet._sockets) == \
+        sorted((ip, fleet.port) for ip in fleet.device_ips)
+
+
+def test_simulator_refuses_wrong_credentials(fleet):
+    with pytest.raises(Exception):
+        create_device(fleet.device_ips[0], USERNAME, "wrong", port=fleet.port)
+
+
+def test_fetch_data_matches_the_device_output(fleet):
+    ip = fleet.device_ips[1]
+    service = link_service(ip)
+
+    service.fetch_data()
+
+    expected = rendered(fleet, ip)
+    assert service.show_int_data == expected["show_int_data"]
+    assert service.show_optics_data == expected["show_optics_data"]
+    assert service.cdp_devices == expected["cdp_devices"]
+    assert service.ospf_neighbors == expected["ospf_neighbors"]
+    assert service.mpls_ldp_neighbors == expected["mpls_ldp_neighbors"]
+    assert len(service.show_int_data) == 8
+    # The ring links to the previous and next device
+    assert {device["device_id"] for device in service.cdp_devices} == {"sim-core-00000", "sim-core-00002"}
+
+
+def test_fetch_outputs_parse_like_fetch_data(fleet):
+    ip = fleet.device_ips[0]
+    streamed = link_service(ip)
+    streamed.fetch_data()
+    staged = link_service(ip)
+
+    staged.apply_parsed(parse_outputs(staged.fetch_outputs()))
+
+    for name in STAGED_COMMANDS:
+        assert getattr(staged, name) == getattr(streamed, name)
+
+
+def test_fetch_data_in_two_phases(fleet):
+    ip = fleet.device_ips[2]
+    cache = InterfaceDetailCache()
+    link_service(ip, interface_cache=cache).fetch_data()
+
+    service = link_service(ip, interface_cache=cache)
+    service.fetch_data()
+
+    expected = rendered(fleet, ip)
+    assert service.show_int_data == expected["show_int_data"]
+    assert service.show_optics_data == expected["show_optics_data"]
+
+
+def test_sort_and_create_links(fleet):
+    service = link_service(fleet.device_ips[1])
+    service.fetch_data()
+
+    service.sort_and_create_links()
+
+    links = {name: value["link"] for (name, _), value in service.links.items()}
+    assert links["TenGigE0/0/0/0"].cdp == "sim-core-00002"
+    assert links["HundredGigE0/0/0/1"].cdp == "sim-core-00000"
+    assert links["TenGigE0/0/0/0"].ospf == "FULL"
+    assert links["TenGigE0/0/0/0"].mpls_ldp == "up"
+    assert links["TenGigE0/0/0/0"].rx is not None
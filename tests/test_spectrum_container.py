@@ -0,0 +1,100 @@
+"""
+Tests of ``SpectrumContainerIndex`` against the per-lookup XML scan it replaced.
+
+fixtures/spectrum/devices.xml is a Spectrum devices response for the simulated fleet's addresses,
+written from the Spectrum REST response schema, with the address (0x12d7f) and location (0x129e7)
+attributes the crawler requests; it was not captured from a Spectrum server.
+"""
+import io
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from network.spectrum_container import NAMESPACE, SpectrumContainerIndex, find_container_from_ip
+
+FIXTURES = Path(__file__).parent / "fixtures" / "spectrum"
+
+
+def read_fixture(name):
+    return (FIXTURES / name).read_bytes()
+
+
+def legacy_find(ip_address, text):
+    """The containers of an address as ``find_container_from_ip`` found them before the index."""
+    root = ET.fromstring(text)
+    containers = set()
+    for model in root.findall(f'.//{NAMESPACE}model'):
+        attribute = model.find(f'.//{NAMESPACE}attribute[@id="0x12d7f"]')
+        location = model.find(f'.//{NAMESPACE}attribute[@id="0x129e7"]')
+        if attribute is not None and location is not None:
+            if len(ip_address.split('.')) == 3:
+                if ip_address + '.' in attribute.text:
+                    containers.add(location.text.split(':')[-1])
+            elif attribute.text == ip_address:
+                containers.add(location.text.split(':')[-1])
+    return containers
+
+
+def streamed_response(data):
+    """A streamed ``requests`` response, whose body can only be read once."""
+    response = SimpleNamespace(raw=io.BytesIO(data), closed=False)
+    response.close = lambda: setattr(response, "closed", True)
+    return response
+
+
+@pytest.mark.parametrize("ip_address", ["127.1.0.1", "127.1.0.2", "127.1.0.3", "127.1.0.4", "10.20.1.7",
+                                        "110.1.0.9", "127.1.0", "110.1.0", "10.20.1"])
+def test_index_matches_the_legacy_lookup(ip_address):
+    data = read_fixture("devices.xml")
+
+    index = SpectrumContainerIndex.from_xml(io.BytesIO(data))
+
+    assert set(index.find(ip_address)) == legacy_find(ip_address, data)
+
+
+def test_index_keeps_the_order_spectrum_lists_containers_in():
+    index = SpectrumContainerIndex.from_xml(io.BytesIO(read_fixture("devices.xml")))
+
+    assert index.find("127.1.0.1") == ["lab-south", "core"]
+    assert index.find("127.1.0.3") == ["lab-north"]
+    assert index.find("127.1.0") == ["lab-north", "lab-south", "core"]
+
+
+def test_index_matches_prefixes_on_whole_octets():
+    # The legacy lookup searched for the prefix anywhere in the address: "10.1.0" matched "110.1.0.9"
+    data = read_fixture("devices.xml")
+    assert legacy_find("10.1.0", data) == {"edge"}
+
+    index = SpectrumContainerIndex.from_xml(io.BytesIO(data))
+
+    assert index.find("10.1.0") == []
+
+
+def test_index_shares_container_names():
+    index = SpectrumContainerIndex.from_xml(io.BytesIO(read_fixture("devices.xml")))
+
+    assert index.find("127.1.0.2")[0] is index.find("127.1.0.3")[0]
+
+
+def test_from_response_reads_the_body_once_and_closes_it():
+    response = streamed_response(read_fixture("devices.xml"))
+
+    index = SpectrumContainerIndex.from_response(response)
+
+    assert response.closed
+    assert response.raw.decode_content is True
+    assert index.find("127.1.0.1") == ["lab-south", "core"]
+
+
+def test_from_response_of_a_failed_request():
+    assert SpectrumContainerIndex.from_response([]).find("127.1.0.1") == []
+
+
+def test_find_container_from_ip_takes_an_index_or_a_response():
+    index = SpectrumContainerIndex.from_xml(io.BytesIO(read_fixture("devices.xml")))
+
+    assert find_container_from_ip("127.1.0.1", index) == ["lab-south", "core"]
+    assert find_container_from_ip("127.1.0.1", streamed_response(read_fixture("devices.xml"))) == \
+        ["lab-south", "core"]
@@ -0,0 +1,162 @@
+"""Tests of ``SSHConnectionPool``'s reuse and discarding of sessions, on stand-in sessions."""
+import threading
+
+import pytest
+
+from network import ssh_pool
+from network.ssh_pool import SSHConnectionPool
+
+
+class FakeSession:
+    """A session as the pool sees it: a transport that is active until closed."""
+
+    def __init__(self, ip, username, password, **kwargs):
+        self.hostname = ip
+        self.kwargs = kwargs
+        self.command_limiter = kwargs.get("command_limiter")
+        self.active = True
+        self.closed = False
+
+    def is_active(self):
+        return self.active
+
+    def close_connection(self):
+        self.active = False
+        self.closed = True
+
+
+@pytest.fixture
+def created(monkeypatch):
+    """The sessions the pool opened, in order."""
+    sessions = []
+
+    def create_device(ip, username, password, **kwargs):
+        sessions.append(FakeSession(ip, username, password, **kwargs))
+        return sessions[-1]
+
+    monkeypatch.setattr(ssh_pool, "create_device", create_device)
+    return sessions
+
+
+def test_released_session_is_reused(created):
+    pool = SSHConnectionPool(keepalive_interval=15)
+
+    with pool.session("127.1.0.1", "crawler", "secret") as first:
+        pass
+    with pool.session("127.1.0.1", "crawler", "secret") as second:
+        pass
+
+    assert second is first
+    assert created == [first]
+    assert first.kwargs == {"keepalive_interval": 15}
+    assert not first.closed
+
+
+def test_sessions_are_not_shared_between_devices(created):
+    pool = SSHConnectionPool()
+
+    with pool.session("127.1.0.1", "crawler", "secret"):
+        pass
+    with pool.session("127.1.0.2", "crawler", "secret") as session:
+        pass
+
+    assert session.hostname == "127.1.0.2"
+    assert len(created) == 2
+
+
+def test_session_is_only_reused_under_the_settings_it_was_opened_with(created):
+    pool = SSHConnectionPool()
+
+    with pool.session("127.1.0.1", "crawler", "secret", compress=True) as compressed:
+        pass
+    with pool.session("127.1.0.1", "crawler", "secret") as plain:
+        pass
+    with pool.session("127.1.0.1", "crawler", "secret", compress=True) as reused:
+        pass
+
+    assert plain is not compressed
+    assert plain.kwargs.get("compress") is None
+    assert reused is compressed
+
+
+def test_reused_session_takes_the_command_limiter_it_is_checked_out_with(created):
+    pool = SSHConnectionPool()
+    limiter = object()
+
+    with pool.session("127.1.0.1", "crawler", "secret", command_limiter=limiter) as first:
+        pass
+    with pool.session("127.1.0.1", "crawler", "secret") as second:
+        assert second is first
+        assert second.command_limiter is None
+    with pool.session("127.1.0.1", "crawler", "secret", command_limiter=limiter) as third:
+        assert third is first
+        assert third.command_limiter is limiter
+
+
+def test_session_is_discarded_when_its_block_raises(created):
+    pool = SSHConnectionPool()
+
+    with pytest.raises(OSError):
+        with pool.session("127.1.0.1", "crawler", "secret"):
+            raise OSError("Socket is closed")
+    with pool.session("127.1.0.1", "crawler", "secret") as session:
+        pass
+
+    assert created[0].closed
+    assert session is created[1]
+
+
+def test_dead_session_is_closed_on_release(created):
+    pool = SSHConnectionPool()
+
+    with pool.session("127.1.0.1", "crawler", "secret") as first:
+        first.active = False
+    with pool.session("127.1.0.1", "crawler", "secret") as second:
+        pass
+
+    assert first.closed
+    assert second is not first
+
+
+def test_expired_idle_session_is_closed_instead_of_reused(created):
+    pool = SSHConnectionPool(max_idle=-1)
+
+    with pool.session("127.1.0.1", "crawler", "secret") as first:
+        pass
+    with pool.session("127.1.0.1", "crawler", "secret") as second:
+        pass
+
+    assert first.closed
+    assert second is not first
+
+
+def test_evict_idle(created):
+    pool = SSHConnectionPool()
+    with pool.session("127.1.0.1", "crawler", "secret"):
+        with pool.session("127.1.0.1", "crawler", "secret"):
+            pass
+    created[0].active = False
+
+    assert pool.evict_idle() == 1
+    assert created[0].closed and not created[1].closed
+    pool.close_all()
+    assert created[1].closed
+
+
+def test_checkouts_per_device_are_capped(created):
+    pool = SSHConnectionPool(max_per_host=1)
+    first = pool.acquire("127.1.0.1", "crawler", "secret")
+    checked_out = threading.Event()
+
+    def acquire():
+        pool.release(pool.acquire("127.1.0.1", "crawler", "secret"))
+        checked_out.set()
+
+    thread = threading.Thread(target=acquire)
+    thread.start()
+    assert not checked_out.wait(0.1)
+    pool.release(first)
+    thread.join(1)
+
+    assert checked_out.is_set()
+    assert created == [first]
@@ -0,0 +1,85 @@
+"""
+Tests of the parsers that read command output as it streams in from the SSH channel: fed the
+captured simulator outputs in chunks of any size, they give what parsing the whole output gives.
+"""
+import json
+from pathlib import Path
+
+import pytest
+
+from network.cdp import iter_cdp_devices, parse_cdp_devices
+from network.controllers_optics import iter_show_optics_records, parse_show_optics_output
+from network.description import iter_interface_descriptions, parse_interface_descriptions
+from network.int import iter_show_int_records, parse_show_int_output
+from network.mpls_ldp import iter_mpls_ldp_neighbors, parse_mpls_ldp_neighbors
+from network.ospf import iter_ospf_neighbors, parse_ospf_neighbors
+from network.paramiko_connection_CiscoDevices import iter_lines
+
+FIXTURES = Path(__file__).parent / "fixtures" / "simulator"
+
+# (fixture, whole-output parser, streaming parser and how to collect what it yields)
+PARSERS = [
+    ("show_int", parse_show_int_output, lambda lines: dict(iter_show_int_records(lines))),
+    ("show_controllers_optics", parse_show_optics_output, lambda lines: dict(iter_show_optics_records(lines))),
+    ("show_cdp_neighbors_detail", parse_cdp_devices, lambda lines: list(iter_cdp_devices(lines))),
+    ("show_ospf_neighbors_detail", parse_ospf_neighbors, lambda lines: list(iter_ospf_neighbors(lines))),
+    ("show_mpls_ldp_neighbor", parse_mpls_ldp_neighbors, lambda lines: list(iter_mpls_ldp_neighbors(lines))),
+    ("show_interface_description", parse_interface_descriptions,
+     lambda lines: list(iter_interface_descriptions(lines))),
+]
+
+
+def read_fixture(name):
+    return (FIXTURES / name).read_text()
+
+
+def split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 64, 4096])
+@pytest.mark.parametrize("name, parse, parse_stream", PARSERS)
+def test_streaming_parser_matches_the_whole_output_parser(name, parse, parse_stream, size):
+    output = read_fixture(f"{name}.txt")
+
+    assert parse_stream(iter_lines(split(output.encode("utf-8"), size))) == parse(output)
+
+
+def test_show_int_records_are_yielded_as_the_next_interface_starts():
+    lines = iter(read_fixture("show_int.txt").splitlines())
+    records = iter_show_int_records(lines)
+
+    name, record = next(records)
+
+    assert name == "TenGigE0/0/0/0"
+    assert record.mtu == 9216
+    # Only the lines up to the next interface's header were read
+    assert next(lines).startswith("  Interface state transitions")
+
+
+def test_interface_description_fixture_is_the_simulator_output(captured_device):
+    assert captured_device.render("show interface description") == read_fixture("show_interface_description.txt")
+
+
+def test_parse_interface_descriptions_matches_the_legacy_parser():
+    assert parse_interface_descriptions(read_fixture("show_interface_description.txt")) == \
+        json.loads(read_fixture("show_interface_description.json"))
+
+
+def test_parse_interface_descriptions_without_header_parses_every_line():
+    output = "Te0/0/0/0 up up to-core\nTe0/0/0/1 admin-down down\n"
+
+    assert parse_interface_descriptions(output) == [
+        {"interface": "Te0/0/0/0", "status": "up", "protocol": "up", "description": "to-core"},
+    ]
+
+
+@pytest.mark.parametrize("chunks, lines", [
+    ([b"a\r", b"\nb\n"], ["a", "b"]),
+    ([b"a\r", b"b"], ["a", "b"]),
+    ([b"a\n\n", b"b"], ["a", "", "b"]),
+    ([b"caf\xc3", b"\xa9\nx"], ["café", "x"]),
+    ([b"", b"a", b"", b"b\n"], ["ab"]),
+])
+def test_iter_lines_splits_like_splitlines(chunks, lines):
+    assert list(iter_lines(chunks)) == lines == b"".join(chunks).decode("utf-8").splitlines()
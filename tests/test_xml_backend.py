@@ -0,0 +1,175 @@
+"""
+Tests of the NETCONF backend against IOS-XR replies.
+
+The replies under fixtures/netconf are full NETCONF 1.0 channel streams (device hello, rpc-reply,
+close-session reply). They were written from the Cisco-IOS-XR-pfi-im-cmd-oper and
+Cisco-IOS-XR-controller-optics-oper YANG models of the IOS-XR 6.6.3 model bundle, with the
+element names, enumerations and units the models define; they were not captured from a router.
+Replace them with recordings (see SSH_RECORD_DIR) of a device when one is available.
+"""
+from pathlib import Path
+
+import pytest
+
+from network.paramiko_connection_CiscoDevices import CommandError
+from network.xml_backend import (
+    INTERFACE_NS,
+    OPTICS_NS,
+    _interface_record,
+    _optics_record,
+    iter_netconf_reply,
+    iter_xml_records,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures" / "netconf"
+
+
+def read_fixture(name):
+    return (FIXTURES / name).read_bytes()
+
+
+def split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def parse_interfaces(chunks):
+    return dict(iter_xml_records(iter_netconf_reply(chunks), INTERFACE_NS, "interface", "interface-xr",
+                                 _interface_record))
+
+
+def parse_optics(chunks):
+    return dict(iter_xml_records(iter_netconf_reply(chunks), OPTICS_NS, "optics-port", "optics-ports",
+                                 _optics_record))
+
+
+@pytest.mark.parametrize("size", [1, 5, 6, 7, 4096, 1 << 20])
+def test_iter_netconf_reply_yields_only_the_reply(size):
+    data = read_fixture("interfaces_reply.xml")
+    reply = b"".join(iter_netconf_reply(split(data, size)))
+
+    start = data.index(b"]]>]]>") + 6
+    assert reply == data[start:data.index(b"]]>]]>", start)]
+    assert reply.lstrip().startswith(b'<?xml version="1.0"?>\n<rpc-reply message-id="1"')
+
+
+def test_iter_netconf_reply_without_end_marker_yields_the_rest():
+    data = read_fixture("interfaces_reply.xml")
+    truncated = data[:data.rindex(b"</rpc-reply>", 0, data.index(b"<ok/>"))]
+
+    reply = b"".join(iter_netconf_reply(split(truncated, 7)))
+
+    assert reply == truncated[truncated.index(b"]]>]]>") + 6:]
+
+
+def test_iter_netconf_reply_without_reply_yields_nothing():
+    assert list(iter_netconf_reply([b"<hello/>]]>", b"]]>"])) == []
+
+
+@pytest.mark.parametrize("size", [1, 7, 4096])
+def test_iter_xml_records_yields_every_interface(size):
+    records = parse_interfaces(split(read_fixture("interfaces_reply.xml"), size))
+
+    assert list(records) == ["HundredGigE0/0/0/0", "TenGigE0/0/0/4.100", "Bundle-Ether10"]
+
+
+def test_iter_xml_records_clears_finished_records():
+    seen = []
+
+    def build(element):
+        seen.append(element)
+        return _interface_record(element)
+
+    chunks = iter_netconf_reply(split(read_fixture("interfaces_reply.xml"), 4096))
+    list(iter_xml_records(chunks, INTERFACE_NS, "interface", "interface-xr", build))
+
+    assert len(seen) == 3
+    assert all(len(element) == 0 for element in seen)
+
+
+def test_iter_xml_records_raises_on_rpc_error():
+    chunks = iter_netconf_reply(split(read_fixture("error_reply.xml"), 7))
+
+    with pytest.raises(CommandError, match="The requested path is not supported"):
+        list(iter_xml_records(chunks, OPTICS_NS, "optics-port", "optics-ports", _optics_record))
+
+
+def test_interface_record_of_an_up_interface():
+    record = parse_interfaces([read_fixture("interfaces_reply.xml")])["HundredGigE0/0/0/0"]
+
+    assert record.physical_status == "up"
+    assert record.protocol_status == "up"
+    assert record.description == "to-pe2.lab Hu0/0/0/3 <core>"
+    assert record.interface_ip == "10.20.1.1"
+    assert record.media_type == "100GBASE-LR4"
+    assert record.mtu == 9216
+    assert record.bw == 100000000
+    # Rates are reported in 1000's of bps, 'show int' prints bits/sec
+    assert record.input_rate == 48312456000
+    assert record.output_rate == 51210087000
+    assert record.input_errors == 17
+    assert record.output_errors == 2
+    assert record.crc == 15
+    assert record.mpls_ldp is None and record.ospf is None and record.cdp is None
+
+
+def test_interface_record_of_a_down_subinterface():
+    record = parse_interfaces([read_fixture("interfaces_reply.xml")])["TenGigE0/0/0/4.100"]
+
+    assert record.physical_status == "down"
+    assert record.protocol_status == "down"
+    assert record.description is None
+    assert record.interface_ip is None
+    assert record.media_type is None
+    assert record.mtu == 1518
+    assert record.input_rate == 0
+    assert record.input_errors == 0
+
+
+def test_interface_record_with_basic_statistics():
+    record = parse_interfaces([read_fixture("interfaces_reply.xml")])["Bundle-Ether10"]
+
+    assert record.physical_status == "administratively down"
+    assert record.protocol_status == "administratively down"
+    assert record.description == "spare bundle"
+    assert record.bw == 0
+    assert record.input_errors == 0
+    assert record.output_errors == 0
+    assert record.crc is None
+
+
+def test_optics_record_of_a_single_lane_port():
+    data = parse_optics(split(read_fixture("optics_reply.xml"), 7))["Optics0_0_0_4"]
+
+    assert data == {
+        'controller_state': "Up",
+        'transport_admin_state': "In Service",
+        'laser_state': "On",
+        'led_state': "Green",
+        'optics_type': "10G LR",
+        'actual_tx_power': -1.23,
+        'rx_power': -4.56,
+        'temperature': 28.43,
+        'voltage': 3.28,
+    }
+
+
+def test_optics_record_of_a_multi_lane_port_reads_the_first_lane():
+    data = parse_optics([read_fixture("optics_reply.xml")])["Optics0_0_0_10"]
+
+    assert data == {
+        'controller_state': "Down",
+        'transport_admin_state': "Out of Service",
+        'laser_state': "Off",
+        'led_state': "Red",
+        'optics_type': "100G QSFP28 LR4",
+        'actual_tx_power': 1.12,
+        'rx_power': -40.0,
+        'temperature': -1.5,
+        'voltage': 3.31,
+    }
+
+
+def test_optics_record_leaves_out_states_the_cli_parsers_do_not_give():
+    data = parse_optics([read_fixture("optics_reply.xml")])["Optics0_0_0_11"]
+
+    assert data == {}